@@ -1,19 +1,28 @@
 from fastapi import FastAPI, Query
+from fastapi.responses import PlainTextResponse
 from typing import List, Optional
 import aiosqlite
 import json
+from utils.metrics import REGISTRY
 
 
 app = FastAPI(title="Coiney Scraper API")
 
 DB_PATH = "./exports/dataset.db"
 
+QUERY_SECONDS = REGISTRY.histogram("api_query_seconds", "SQLite query latency per endpoint", ("endpoint",))
+
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/pages", response_model=List[dict])
 async def list_pages(
     domain: Optional[str] = None,
@@ -36,17 +45,18 @@ async def list_pages(
     sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
     params.extend([limit, offset])
     rows: List[dict] = []
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute(sql, params) as cursor:
-            async for url, dom, title, text, meta, scrape_meta in cursor:
-                rows.append({
-                    "url": url,
-                    "domain": dom,
-                    "title": title,
-                    "text": text,
-                    "meta": json.loads(meta or "{}"),
-                    "scrape_meta": json.loads(scrape_meta or "{}"),
-                })
+    with QUERY_SECONDS.time(endpoint="pages"):
+        async with aiosqlite.connect(DB_PATH) as db:
+            async with db.execute(sql, params) as cursor:
+                async for url, dom, title, text, meta, scrape_meta in cursor:
+                    rows.append({
+                        "url": url,
+                        "domain": dom,
+                        "title": title,
+                        "text": text,
+                        "meta": json.loads(meta or "{}"),
+                        "scrape_meta": json.loads(scrape_meta or "{}"),
+                    })
     return rows
 
 # To run: uvicorn api.server:app --reload --port 8000
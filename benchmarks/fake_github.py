@@ -0,0 +1,186 @@
+import base64
+import hashlib
+import json
+import random
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+from benchmarks.synthetic_site import WORDS, RequestStats
+
+
+def git_blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class FakeRepo:
+    def __init__(self, owner: str, name: str, files: Dict[str, bytes], stars: int = 0, branch: str = "main"):
+        self.owner = owner
+        self.name = name
+        self.files = files
+        self.stars = stars
+        self.branch = branch
+
+    def meta(self, base_url: str) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "full_name": f"{self.owner}/{self.name}",
+            "owner": {"login": self.owner},
+            "html_url": f"{base_url}/{self.owner}/{self.name}",
+            "description": f"fixture repo {self.name}",
+            "default_branch": self.branch,
+            "stargazers_count": self.stars,
+            "forks_count": 0,
+            "languages_url": f"{base_url}/repos/{self.owner}/{self.name}/languages",
+            "license": {"spdx_id": "MIT"},
+        }
+
+
+def make_repos(
+    repos: int = 3,
+    files_per_repo: int = 50,
+    file_size: int = 2000,
+    binary_files: int = 1,
+    oversized_files: int = 1,
+    oversized_size: int = 1_000_000,
+    seed: int = 1,
+) -> List[FakeRepo]:
+    """
+    Fixed repositories: mostly text source files, plus binary blobs and
+    oversized files that a scraper is expected to skip.
+    """
+    out: List[FakeRepo] = []
+    for r in range(repos):
+        rng = random.Random(f"{seed}:{r}")
+        files: Dict[str, bytes] = {}
+        for i in range(files_per_repo):
+            lines: List[str] = []
+            size = 0
+            while size < file_size:
+                comment = " ".join(rng.choice(WORDS) for _ in range(6))
+                line = f"def {rng.choice(WORDS)}_{i}_{len(lines)}():  # {comment}"
+                lines.append(line)
+                size += len(line) + 1
+            files[f"pkg{i % 5}/mod_{i}.py"] = ("\n".join(lines) + "\n").encode("utf-8")
+        for i in range(binary_files):
+            files[f"data/blob_{i}.py"] = bytes(rng.randrange(256) for _ in range(file_size)) + b"\x00"
+        for i in range(oversized_files):
+            files[f"big/huge_{i}.py"] = b"x = 1\n" * (oversized_size // 6)
+        files["README.md"] = b"# fixture\n"
+        out.append(FakeRepo("bench", f"repo{r}", files, stars=1000 - r))
+    return out
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for api.github.com and raw.githubusercontent.com. API
+    routes are served at the root, raw content under /raw, so point a
+    GitHubCodeScraper at base_api=<base_url> and raw_base=<base_url>/raw.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, repos: List[FakeRepo], host: str = "127.0.0.1", port: int = 0, raw_fail: bool = False):
+        super().__init__((host, port), _GitHubHandler)
+        self.repos = {(r.owner, r.name): r for r in repos}
+        self.raw_fail = raw_fail
+        self.stats = RequestStats()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def raw_base(self) -> str:
+        return f"{self.base_url}/raw"
+
+
+class _GitHubHandler(BaseHTTPRequestHandler):
+    server: FakeGitHubServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, kind: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # client aborted the transfer early
+            pass
+        self.server.stats.record(kind, len(body))
+
+    def _json(self, data: Any, kind: str, status: int = 200) -> None:
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json", kind)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        srv = self.server
+        base = srv.base_url
+
+        if parts[:2] == ["search", "repositories"]:
+            per_page = int(query.get("per_page", ["10"])[0])
+            page = int(query.get("page", ["1"])[0])
+            repos = sorted(srv.repos.values(), key=lambda r: -r.stars)
+            items = [r.meta(base) for r in repos[(page - 1) * per_page:page * per_page]]
+            return self._json({"total_count": len(repos), "items": items}, "search")
+
+        if parts and parts[0] == "raw" and len(parts) >= 5:
+            repo = srv.repos.get((parts[1], parts[2]))
+            path = "/".join(parts[4:])
+            if srv.raw_fail or repo is None or path not in repo.files:
+                return self._send(404, b"404: Not Found", "text/plain", "raw_404")
+            return self._send(200, repo.files[path], "text/plain; charset=utf-8", "raw")
+
+        if parts and parts[0] == "repos" and len(parts) >= 3:
+            repo = srv.repos.get((parts[1], parts[2]))
+            if repo is None:
+                return self._json({"message": "Not Found"}, "404", status=404)
+            rest = parts[3:]
+            if not rest:
+                return self._json(repo.meta(base), "repo")
+            if rest[:2] == ["git", "trees"]:
+                tree = [
+                    {"path": p, "type": "blob", "size": len(b), "sha": git_blob_sha(b)}
+                    for p, b in sorted(repo.files.items())
+                ]
+                return self._json({"tree": tree, "truncated": False}, "tree")
+            if rest[0] == "contents":
+                path = "/".join(rest[1:])
+                if path not in repo.files:
+                    return self._json({"message": "Not Found"}, "404", status=404)
+                data = repo.files[path]
+                return self._json(
+                    {
+                        "path": path,
+                        "size": len(data),
+                        "encoding": "base64",
+                        "content": base64.b64encode(data).decode("ascii"),
+                    },
+                    "contents",
+                )
+        return self._json({"message": "Not Found"}, "404", status=404)
+
+
+@contextmanager
+def serve_github(
+    repos: Optional[List[FakeRepo]] = None,
+    port: int = 0,
+    raw_fail: bool = False,
+) -> Iterator[FakeGitHubServer]:
+    server = FakeGitHubServer(repos if repos is not None else make_repos(), port=port, raw_fail=raw_fail)
+    thread = threading.Thread(target=server.serve_forever, name="fake-github", daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.synthetic_site import SiteSpec
+from crawler.url_filter import UrlFilter
+from parser.html_parser import parse_html
+from pipeline.cleaner import BatchCleaner, clean_text
+from storage.json_saver import JSONLWriter
+from storage.sqlite_db import SQLiteStore
+
+
+def summarize(timings: List[float], units: int = 1) -> Dict[str, Any]:
+    """
+    timings: seconds per iteration; units: items processed per iteration.
+    """
+    total = sum(timings)
+    ordered = sorted(timings)
+    return {
+        "iterations": len(timings),
+        "total_s": round(total, 6),
+        "ops_per_s": round(len(timings) * units / total, 2) if total else None,
+        "p50_ms": round(statistics.median(ordered) * 1000, 4),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 4),
+    }
+
+
+def bench_sync(fn: Callable[[], Any], iterations: int, warmup: int = 2) -> Dict[str, Any]:
+    for _ in range(warmup):
+        fn()
+    timings: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+async def bench_async(fn: Callable[[], Awaitable[Any]], iterations: int) -> Dict[str, Any]:
+    timings: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def _record(spec: SiteSpec, n: int) -> Dict[str, Any]:
+    url = f"http://bench.local/page/{n}"
+    parsed: Dict[str, Any] = parse_html(url, spec.render_page(n))
+    parsed["scrape_meta"] = {"url": url, "depth": 0, "timestamp": 0, "api_hits": [], "schema_version": "1.0"}
+    return parsed
+
+
+def bench_parse_html(spec: SiteSpec, iterations: int) -> Dict[str, Any]:
+    pages = [spec.render_page(n) for n in range(min(spec.pages, 50))]
+    state = {"i": 0}
+
+    def one() -> None:
+        i = state["i"] = (state["i"] + 1) % len(pages)
+        parse_html(f"http://bench.local/page/{i}", pages[i])
+
+    out = bench_sync(one, iterations)
+    out["page_bytes"] = len(pages[0])
+    return out
+
+
+def bench_url_filter(spec: SiteSpec, iterations: int, links_per_page: int = 2000) -> Dict[str, Any]:
+    """Admission cost for one link-heavy page (relative, absolute, external, asset and fragment links)."""
+    kinds = ["/page/{n}", "http://bench.local/page/{n}#c", "https://other.example/{n}", "/static/{n}.png", "?p={n}"]
+    links = [kinds[i % len(kinds)].format(n=i % spec.pages) for i in range(links_per_page)]
+    url_filter = UrlFilter.from_config({"crawl": {"exclude_patterns": [r"^/logout", r"[?&]sid="]}})
+    out = bench_sync(lambda: url_filter.filter_links(links, "http://bench.local/page/0"), iterations)
+    out["links_per_s"] = round(links_per_page * out["iterations"] / out["total_s"], 1) if out["total_s"] else None
+    return out
+
+
+def bench_clean_text(iterations: int, sizes=(10_000, 1_000_000)) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for size in sizes:
+        chunk = "lorem  ipsum\t\tdolor\x00sit \n\n amet\x07 "
+        text = (chunk * (size // len(chunk) + 1))[:size]
+        out = bench_sync(lambda: clean_text(text), iterations)
+        out["mb_per_s"] = round(size * out["iterations"] / out["total_s"] / 1e6, 2) if out["total_s"] else None
+        results[f"{size}_chars"] = out
+    return results
+
+
+def bench_cleaner(iterations: int, records: int = 200, text_chars: int = 50_000) -> Dict[str, Any]:
+    """Batched cleaner chain over large page bodies, in a thread (the crawl's default)."""
+    chunk = "Share on X\nlorem  ipsum\t\tdolor sit \u00a0amet,\n\n consectetur\x07 "
+    text = (chunk * (text_chars // len(chunk) + 1))[:text_chars]
+    cleaner = BatchCleaner(
+        [{"boilerplate": {"patterns": ["Share on .*"]}}, "unicode", "whitespace", {"length": {"min_chars": 100}}],
+        batch_size=64,
+    )
+
+    async def once() -> None:
+        await cleaner.clean([{"title": " t ", "text": text, "meta": {}} for _ in range(records)])
+
+    async def run() -> Dict[str, Any]:
+        return await bench_async(once, iterations)
+
+    try:
+        out = asyncio.run(run())
+    finally:
+        cleaner.close()
+    if out["total_s"]:
+        out["records_per_s"] = round(records * out["iterations"] / out["total_s"], 1)
+        out["mb_per_s"] = round(text_chars * records * out["iterations"] / out["total_s"] / 1e6, 2)
+    return out
+
+
+async def bench_storage(spec: SiteSpec, workdir: Path, records: int) -> Dict[str, Any]:
+    recs = [_record(spec, n % spec.pages) for n in range(records)]
+    for i, r in enumerate(recs):
+        r["url"] = f"{r['url']}?v={i}"
+
+    writer = JSONLWriter(str(workdir / "bench.jsonl"))
+    it = iter(recs)
+    jsonl = await bench_async(lambda: writer.write(next(it)), records)
+
+    store = SQLiteStore(str(workdir / "bench.db"))
+    await store.initialize()
+    it2 = iter(recs)
+    try:
+        sqlite = await bench_async(lambda: store.insert(next(it2)), records)
+    finally:
+        await store.close()
+    return {"jsonl_write": jsonl, "sqlite_insert": sqlite}
+
+
+async def bench_api_queries(workdir: Path, iterations: int) -> Dict[str, Any]:
+    """Runs the /pages handler directly against the database filled by bench_storage."""
+    import api.server as server
+
+    server.DB_PATH = str(workdir / "bench.db")
+    return {
+        "pages_latest": await bench_async(
+            lambda: server.list_pages(domain=None, q=None, limit=50, offset=0), iterations
+        ),
+        "pages_by_domain": await bench_async(
+            lambda: server.list_pages(domain="bench.local", q=None, limit=50, offset=0), iterations
+        ),
+        "pages_search": await bench_async(
+            lambda: server.list_pages(domain=None, q="frontier", limit=50, offset=0), iterations
+        ),
+    }
+
+
+def run_micro(spec: SiteSpec, workdir: Path, iterations: int = 200, records: int = 1000) -> Dict[str, Any]:
+    os.makedirs(workdir, exist_ok=True)
+    results: Dict[str, Any] = {
+        "parse_html": bench_parse_html(spec, iterations),
+        "url_filter": bench_url_filter(spec, max(iterations // 4, 10)),
+        "clean_text": bench_clean_text(max(iterations // 10, 5)),
+        "cleaner": bench_cleaner(max(iterations // 40, 3)),
+    }
+    results.update(asyncio.run(bench_storage(spec, workdir, records)))
+    results["api"] = asyncio.run(bench_api_queries(workdir, max(iterations // 4, 10)))
+    return results
@@ -0,0 +1,286 @@
+"""
+Offline benchmark harness.
+
+    python -m benchmarks.run --suite all --out bench_results/baseline.json
+    python -m benchmarks.run --suite micro --compare bench_results/baseline.json
+
+Everything runs against local servers (a synthetic site graph and a fake
+GitHub API/raw host); no external network is touched. The crawl suite needs
+Playwright's Chromium to be installed.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.fake_github import make_repos, serve_github
+from benchmarks.micro import run_micro
+from benchmarks.synthetic_site import SiteSpec, serve_site
+from utils.metrics import REGISTRY, quantile_from_buckets
+
+# Metric keys where a larger number is an improvement; everything else numeric is "lower is better".
+HIGHER_IS_BETTER = ("ops_per_s", "pages_per_s", "files_per_s", "mb_per_s", "links_per_s", "records_per_s")
+# peak_python_rss_mb_cumulative is the process-lifetime peak and says nothing about the suite it is attached to.
+IGNORED_KEYS = (
+    "iterations", "total_s", "page_bytes", "pages", "files_saved", "seconds", "peak_python_rss_mb_cumulative"
+)
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS mark so the next `peak_rss_mb` covers only what runs after it.
+
+    Only Linux supports this (writing 5 to /proc/self/clear_refs resets VmHWM); returns False elsewhere.
+    """
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this Python process only; browser processes are sampled separately (see bench_crawl)."""
+    try:
+        status = Path("/proc/self/status").read_text()
+        match = re.search(r"^VmHWM:\s+(\d+) kB", status, re.MULTILINE)
+        if match:
+            return round(int(match.group(1)) / 1024, 1)
+    except OSError:
+        pass
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS; it never goes down
+    return round(usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024, 1)
+
+
+async def sample_children_rss(peak: List[int], interval: float = 0.25) -> None:
+    """Keep peak[0] at the largest RSS seen across this process's children (Playwright driver, Chromium)."""
+    from crawler.lifecycle import process_tree_rss
+
+    while True:
+        rss = await asyncio.to_thread(process_tree_rss)
+        if rss:
+            peak[0] = max(peak[0], rss)
+        await asyncio.sleep(interval)
+
+
+def _stage_quantiles(stage: str) -> Dict[str, Optional[float]]:
+    data = REGISTRY.export().get("crawler_stage_seconds")
+    if not data:
+        return {"p50_ms": None, "p99_ms": None}
+    counts: List[int] = [0] * (len(data["buckets"]) + 1)
+    for labelvalues, (bucket_counts, _, _) in data["values"]:
+        if labelvalues[0] == stage:
+            counts = [a + b for a, b in zip(counts, bucket_counts)]
+    return {
+        "p50_ms": round(quantile_from_buckets(data["buckets"], counts, 0.5) * 1000, 2),
+        "p99_ms": round(quantile_from_buckets(data["buckets"], counts, 0.99) * 1000, 2),
+    }
+
+
+async def bench_github(workdir: Path, repos: int, files_per_repo: int) -> Dict[str, Any]:
+    from crawler.github_code_scraper import GitHubCodeScraper
+
+    with serve_github(make_repos(repos=repos, files_per_repo=files_per_repo)) as srv:
+        scraper = GitHubCodeScraper(
+            output_dir=str(workdir / "github_code"),
+            extensions=[".py"],
+            max_file_size=200_000,
+            concurrency=8,
+            base_api=srv.base_url,
+            raw_base=srv.raw_base,
+        )
+        start = time.perf_counter()
+        found = await scraper.search_repos(query="bench", per_page=repos, pages=1)
+        saved = 0
+        for repo in found:
+            out = await scraper.repo_to_jsonl(
+                repo["owner"]["login"], repo["name"], jsonl_path=str(workdir / "code.jsonl")
+            )
+            saved += len(out)
+        elapsed = time.perf_counter() - start
+        stats = srv.stats.to_dict()
+    return {
+        "files_saved": saved,
+        "seconds": round(elapsed, 3),
+        "files_per_s": round(saved / elapsed, 2) if elapsed else None,
+        "requests": stats["requests"],
+        "bytes_served": stats["bytes_sent"],
+        "requests_by_kind": stats["by_kind"],
+    }
+
+
+async def bench_crawl(
+    workdir: Path, spec: SiteSpec, concurrency: int, max_pages_depth: int, http_cache: bool = False
+) -> Dict[str, Any]:
+    from crawler.frontend_scraper import run_crawl
+    from storage.json_saver import JSONLWriter
+    from storage.sqlite_db import SQLiteStore
+
+    with serve_site(spec) as srv:
+        cfg: Dict[str, Any] = {
+            "start_urls": [f"{srv.base_url}/page/0"],
+            "max_depth": max_pages_depth,
+            "concurrency": concurrency,
+            "headless": True,
+            "output": {"snapshots_dir": str(workdir / "snapshots")},
+            "crawl": {"respect_robots": False, "wait_after_load": 0, "max_retries": 0},
+            "rate_limit": {"delay_seconds": 0},
+            "http_cache": {"enabled": http_cache, "dir": str(workdir / "http_cache")},
+        }
+        json_writer = JSONLWriter(str(workdir / "crawl.jsonl"))
+        store = SQLiteStore(str(workdir / "crawl.db"))
+        await store.initialize()
+        browser_peak = [0]
+        sampler = asyncio.create_task(sample_children_rss(browser_peak))
+        start = time.perf_counter()
+        try:
+            await run_crawl(cfg, json_writer, store)
+        finally:
+            sampler.cancel()
+            await store.close()
+        elapsed = time.perf_counter() - start
+        stats = srv.stats.to_dict()
+
+    with open(workdir / "crawl.jsonl", "r", encoding="utf-8") as f:
+        pages = sum(1 for _ in f)
+    out: Dict[str, Any] = {
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 2) if elapsed else None,
+        "requests": stats["requests"],
+        "requests_by_kind": stats["by_kind"],
+        # /static/ bytes the site served; what --http-cache is meant to cut
+        "static_bytes": stats["bytes_by_kind"].get("static", 0),
+        # where a crawl's memory actually goes; None where /proc is unavailable
+        "peak_browser_rss_mb": round(browser_peak[0] / (1024 * 1024), 1) if browser_peak[0] else None,
+    }
+    out.update(_stage_quantiles("navigate"))
+    return out
+
+
+def _flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    if isinstance(data, dict):
+        for k, v in data.items():
+            flat.update(_flatten(v, f"{prefix}.{k}" if prefix else str(k)))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix] = float(data)
+    return flat
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+) -> List[Tuple[str, float, float, bool]]:
+    """
+    Returns (metric, baseline, current, regressed) for every numeric result
+    present in both runs.
+    """
+    cur = _flatten(current.get("results", {}))
+    base = _flatten(baseline.get("results", {}))
+    rows: List[Tuple[str, float, float, bool]] = []
+    for key in sorted(set(cur) & set(base)):
+        leaf = key.rsplit(".", 1)[-1]
+        if leaf in IGNORED_KEYS or "by_kind" in key or base[key] == 0:
+            continue
+        change = (cur[key] - base[key]) / abs(base[key])
+        if leaf in HIGHER_IS_BETTER:
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        rows.append((key, base[key], cur[key], regressed))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Coiney Scraper offline benchmarks")
+    parser.add_argument("--suite", choices=["micro", "github", "crawl", "all"], default="micro")
+    parser.add_argument("--out", default=None, help="Write results JSON here (default bench_results/<ts>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--records", type=int, default=1000, help="Records for storage benchmarks")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=4000)
+    parser.add_argument("--js-fraction", type=float, default=0.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.0)
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    parser.add_argument("--xhr-per-page", type=int, default=0)
+    parser.add_argument("--assets", type=int, default=0, help="Shared cacheable scripts/stylesheets per page")
+    parser.add_argument("--http-cache", action="store_true", help="Crawl suite: enable the disk HTTP cache")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--repos", type=int, default=3)
+    parser.add_argument("--files-per-repo", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    spec = SiteSpec(
+        pages=args.pages,
+        fanout=args.fanout,
+        page_size=args.page_size,
+        js_fraction=args.js_fraction,
+        slow_fraction=args.slow_fraction,
+        slow_delay=args.slow_delay,
+        xhr_per_page=args.xhr_per_page,
+        assets=args.assets,
+    )
+    suites = ["micro", "github", "crawl"] if args.suite == "all" else [args.suite]
+    workdir = Path(tempfile.mkdtemp(prefix="coiney-bench-"))
+    results: Dict[str, Any] = {}
+    try:
+        for suite in suites:
+            start = time.perf_counter()
+            per_suite = reset_peak_rss()
+            if suite == "micro":
+                results[suite] = run_micro(spec, workdir / "micro", args.iterations, args.records)
+            elif suite == "github":
+                results[suite] = asyncio.run(bench_github(workdir, args.repos, args.files_per_repo))
+            else:
+                results[suite] = asyncio.run(
+                    bench_crawl(workdir, spec, args.concurrency, args.max_depth, args.http_cache)
+                )
+            # without a reset the peak is the whole run's so far, so label it rather than compare it
+            key = "peak_python_rss_mb" if per_suite else "peak_python_rss_mb_cumulative"
+            results[suite][key] = peak_rss_mb()
+            print(f"[bench] {suite} done in {time.perf_counter() - start:.2f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "site_spec": spec.to_dict(),
+        "results": results,
+    }
+    out_path = Path(args.out or f"bench_results/{report['timestamp']}.json")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(results, indent=2))
+    print(f"[bench] results written to {out_path}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        rows = compare(report, baseline, args.threshold)
+        regressions = [r for r in rows if r[3]]
+        for key, old, new, regressed in rows:
+            flag = "REGRESSION" if regressed else ""
+            print(f"{key:55s} {old:14.3f} -> {new:14.3f} {flag}")
+        if regressions:
+            print(f"[bench] {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+WORDS = (
+    "crawler browser page link data model python async queue storage parser "
+    "network latency render script index token cache frontier domain request"
+).split()
+
+
+class SiteSpec:
+    """
+    Shape of a generated site. The link graph and page contents are a pure
+    function of (seed, page number), so every run serves identical bytes.
+    """
+
+    def __init__(
+        self,
+        pages: int = 200,
+        fanout: int = 8,
+        page_size: int = 4000,
+        js_fraction: float = 0.0,
+        slow_fraction: float = 0.0,
+        slow_delay: float = 0.5,
+        xhr_per_page: int = 0,
+        assets: int = 0,
+        seed: int = 1,
+    ):
+        self.pages = pages
+        self.fanout = fanout
+        self.page_size = page_size
+        self.js_fraction = js_fraction
+        self.slow_fraction = slow_fraction
+        self.slow_delay = slow_delay
+        self.xhr_per_page = xhr_per_page
+        # shared, cacheable /static/ scripts and stylesheets every page links to
+        self.assets = assets
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SiteSpec":
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    def _rng(self, n: int, salt: str = "") -> random.Random:
+        return random.Random(f"{self.seed}:{salt}:{n}")
+
+    def links(self, n: int) -> List[int]:
+        rng = self._rng(n, "links")
+        k = min(self.fanout, self.pages)
+        return rng.sample(range(self.pages), k)
+
+    def is_js(self, n: int) -> bool:
+        return self._rng(n, "js").random() < self.js_fraction
+
+    def is_slow(self, n: int) -> bool:
+        return self._rng(n, "slow").random() < self.slow_fraction
+
+    def text(self, n: int) -> str:
+        rng = self._rng(n, "text")
+        out: List[str] = []
+        size = 0
+        while size < self.page_size:
+            para = " ".join(rng.choice(WORDS) for _ in range(40))
+            out.append(para)
+            size += len(para) + 7
+        return "\n".join(f"<p>{p}</p>" for p in out)
+
+    def render_page(self, n: int) -> str:
+        title = f"Synthetic page {n}"
+        xhr = "".join(
+            f"fetch('/api/item/{n}/{i}.json');" for i in range(self.xhr_per_page)
+        )
+        if self.is_js(n):
+            # content and links only exist after the script runs
+            return (
+                f"<html><head><title>{title}</title>{self.asset_tags()}</head><body><div id='app'></div>"
+                f"<script>{xhr}fetch('/api/page/{n}.json').then(r => r.json()).then(d => {{"
+                "const app = document.getElementById('app');"
+                "app.innerHTML = d.body + d.links.map(l => `<a href=\"${l}\">${l}</a>`).join(' ');"
+                "});</script></body></html>"
+            )
+        links = " ".join(f'<a href="/page/{m}">page {m}</a>' for m in self.links(n))
+        script = f"<script>{xhr}</script>" if xhr else ""
+        return (
+            f"<html><head><title>{title}</title><meta name='description' content='page {n}'>{self.asset_tags()}</head>"
+            f"<body><nav>{links}</nav><main>{self.text(n)}</main>{script}</body></html>"
+        )
+
+    def asset_tags(self) -> str:
+        return "".join(
+            f"<script src='/static/asset{i}.js'></script>" if i % 2 == 0
+            else f"<link rel='stylesheet' href='/static/asset{i}.css'>"
+            for i in range(self.assets)
+        )
+
+    def asset_body(self, name: str) -> bytes:
+        rng = self._rng(0, name)
+        if name.endswith(".css"):
+            return "".join(f".c{i} {{ margin: {rng.randint(0, 9)}px; }}\n" for i in range(400)).encode("utf-8")
+        return "".join(f"var v{i} = {rng.randint(0, 999)};\n" for i in range(400)).encode("utf-8")
+
+    def page_json(self, n: int) -> Dict[str, Any]:
+        return {"body": self.text(n), "links": [f"/page/{m}" for m in self.links(n)]}
+
+
+class RequestStats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.by_kind: Dict[str, int] = {}
+        self.bytes_by_kind: Dict[str, int] = {}
+        self.bytes_sent = 0
+
+    def record(self, kind: str, nbytes: int) -> None:
+        with self.lock:
+            self.requests += 1
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+            self.bytes_by_kind[kind] = self.bytes_by_kind.get(kind, 0) + nbytes
+            self.bytes_sent += nbytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "by_kind": dict(self.by_kind),
+                "bytes_by_kind": dict(self.bytes_by_kind),
+                "bytes_sent": self.bytes_sent,
+            }
+
+
+class SyntheticSiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, spec: SiteSpec, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _SiteHandler)
+        self.spec = spec
+        self.stats = RequestStats()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    server: SyntheticSiteServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, kind: str, cache_control: str = "") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if cache_control:
+            self.send_header("Cache-Control", cache_control)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.server.stats.record(kind, len(body))
+
+    def do_GET(self) -> None:
+        spec = self.server.spec
+        path = self.path.split("?")[0]
+        parts = [p for p in path.split("/") if p]
+        try:
+            if not parts:
+                self._send(200, spec.render_page(0).encode("utf-8"), "text/html; charset=utf-8", "page")
+            elif parts[0] == "page" and len(parts) == 2:
+                n = int(parts[1])
+                if not 0 <= n < spec.pages:
+                    raise ValueError(n)
+                if spec.is_slow(n):
+                    time.sleep(spec.slow_delay)
+                self._send(200, spec.render_page(n).encode("utf-8"), "text/html; charset=utf-8", "page")
+            elif parts[0] == "api" and parts[1] == "page":
+                n = int(parts[2].split(".")[0])
+                body = json.dumps(spec.page_json(n)).encode("utf-8")
+                self._send(200, body, "application/json", "api")
+            elif parts[0] == "static" and len(parts) == 2:
+                name = parts[1]
+                if not name.startswith("asset") or int(name[5:].split(".")[0]) >= spec.assets:
+                    raise ValueError(name)
+                ctype = "text/css" if name.endswith(".css") else "application/javascript"
+                self._send(200, spec.asset_body(name), ctype, "static", "max-age=3600")
+            elif parts[0] == "api" and parts[1] == "item":
+                body = json.dumps({"item": "/".join(parts[2:])}).encode("utf-8")
+                self._send(200, body, "application/json", "xhr")
+            else:
+                raise ValueError(path)
+        except (ValueError, IndexError):
+            self._send(404, b"not found", "text/plain", "404")
+
+
+@contextmanager
+def serve_site(spec: Optional[SiteSpec] = None, port: int = 0) -> Iterator[SyntheticSiteServer]:
+    """Run a synthetic site on a background thread for the duration of the block."""
+    server = SyntheticSiteServer(spec or SiteSpec(), port=port)
+    thread = threading.Thread(target=server.serve_forever, name="synthetic-site", daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
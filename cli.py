@@ -1,14 +1,19 @@
 import asyncio
 import yaml
 import os
+import time
 import argparse
 from typing import Any, Dict
 
 from crawler.frontend_scraper import run_crawl
+from crawler.sharded import run_sharded_crawl
 from storage.json_saver import JSONLWriter
 from storage.sqlite_db import SQLiteStore
 from crawler.github_code_scraper import GitHubCodeScraper
+from pipeline.reprocess import run_reprocess
 from utils.logger import get_logger
+from utils.metrics import REGISTRY, start_metrics_server
+from utils.profiling import PROFILERS, LoopProfiler
 
 CONFIG_PATH = "config.yaml"
 logger = get_logger(__name__)
@@ -25,40 +30,49 @@ async def run_github_mode(cfg: Dict[str, Any], json_writer: JSONLWriter, sqlite_
         extensions=gh_cfg.get("extensions"),
         max_file_size=gh_cfg.get("max_file_size", 200_000),
         concurrency=gh_cfg.get("concurrency", 6),
+        base_api=gh_cfg.get("base_api", "https://api.github.com"),
+        raw_base=gh_cfg.get("raw_base", "https://raw.githubusercontent.com"),
+        output_format=gh_cfg.get("output_format", "files"),
+        sidecars=bool(gh_cfg.get("sidecars", True)),
+        jsonl_text=bool(gh_cfg.get("jsonl_text", True)),
+        shard_max_mb=float(gh_cfg.get("shard_max_mb", 256)),
     )
-
-    repos = await gh_scraper.search_repos(
-        query=gh_cfg.get("query", "machine learning"),
-        per_page=gh_cfg.get("per_page", 5),
-        pages=gh_cfg.get("pages", 1),
-    )
-    for repo in repos:
-        owner = repo["owner"]["login"]
-        name = repo["name"]
-        logger.info(f"Processing {owner}/{name}")
-        saved = await gh_scraper.repo_to_jsonl(
-            owner,
-            name,
-            jsonl_path=cfg["output"]["jsonl"],
-            max_files=gh_cfg.get("max_files_per_repo"),
-        )
-        await sqlite_store.insert(
-            {
-                "url": repo["html_url"],
-                "domain": "github.com",
-                "title": repo["full_name"],
-                "text": repo.get("description") or "",
-                "meta": {
-                    "stars": repo.get("stargazers_count"),
-                    "forks": repo.get("forks_count"),
-                    "languages_url": repo.get("languages_url"),
-                },
-                "scrape_meta": {
-                    "source": "github_code_scraper",
-                    "files_saved": len(saved),
-                },
-            }
+    try:
+        repos = await gh_scraper.search_repos(
+            query=gh_cfg.get("query", "machine learning"),
+            per_page=gh_cfg.get("per_page", 5),
+            pages=gh_cfg.get("pages", 1),
         )
+        for repo in repos:
+            owner = repo["owner"]["login"]
+            name = repo["name"]
+            logger.info(f"Processing {owner}/{name}")
+            saved = await gh_scraper.repo_to_jsonl(
+                owner,
+                name,
+                jsonl_path=cfg["output"]["jsonl"],
+                max_files=gh_cfg.get("max_files_per_repo"),
+            )
+            await sqlite_store.insert(
+                {
+                    "url": repo["html_url"],
+                    "domain": "github.com",
+                    "title": repo["full_name"],
+                    "text": repo.get("description") or "",
+                    "meta": {
+                        "stars": repo.get("stargazers_count"),
+                        "forks": repo.get("forks_count"),
+                        "languages_url": repo.get("languages_url"),
+                    },
+                    "scrape_meta": {
+                        "source": "github_code_scraper",
+                        "files_saved": len(saved),
+                    },
+                }
+            )
+    finally:
+        # flush and close packed shards, if any
+        await gh_scraper.close()
 
 
 async def main():
@@ -66,9 +80,9 @@ async def main():
     parser.add_argument("--config", default=CONFIG_PATH, help="Path to config.yaml")
     parser.add_argument(
         "--mode",
-        choices=["crawl", "github", "both"],
+        choices=["crawl", "github", "both", "reprocess"],
         default="both",
-        help="Which pipeline to run",
+        help="Which pipeline to run (reprocess rebuilds the dataset from stored snapshots, offline)",
     )
     parser.add_argument(
         "--headless",
@@ -83,6 +97,50 @@ async def main():
         action="store_false",
         help="Run browser with UI",
     )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Crawl with N processes, sharding domains across them (default 1); "
+        "for reprocess, parser processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--snapshots-dir",
+        default=None,
+        help="Snapshot store to reprocess (default output.snapshots_dir)",
+    )
+    parser.add_argument(
+        "--out-dir",
+        default=None,
+        help="Fresh output directory for reprocess (default exports/reprocessed/<timestamp>)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics on this port while running (overrides metrics.port)",
+    )
+    parser.add_argument(
+        "--control-port",
+        type=int,
+        default=None,
+        help="Serve the runtime control API on this port during a crawl (overrides control.port)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="loop",
+        choices=PROFILERS,
+        default=None,
+        help="Log slow event-loop callbacks and loop lag and write a report at exit; "
+        "'sampling' adds a stack sampler, 'cprofile' a deterministic profiler (default: loop)",
+    )
+    parser.add_argument(
+        "--slow-callback-ms",
+        type=float,
+        default=None,
+        help="Slow-callback threshold for --profile (overrides profile.slow_callback_ms)",
+    )
     args = parser.parse_args()
 
     with open(args.config, "r") as f:
@@ -90,20 +148,61 @@ async def main():
 
     # CLI overrides
     cfg["headless"] = args.headless
+    if args.control_port is not None:
+        cfg["control"] = {**(cfg.get("control") or {}), "port": args.control_port}
 
     os.makedirs("exports", exist_ok=True)
 
+    profiler = None
+    if args.profile:
+        profiler = LoopProfiler.from_config(cfg, args.profile, slow_callback_ms=args.slow_callback_ms)
+        profiler.start()
+    try:
+        await run_mode(args, cfg)
+    finally:
+        if profiler is not None:
+            await profiler.stop()
+            profiler.write_report()
+
+
+async def run_mode(args: argparse.Namespace, cfg: Dict[str, Any]) -> None:
+    if args.mode == "reprocess":
+        await run_reprocess(
+            args.snapshots_dir or cfg.get("output", {}).get("snapshots_dir", "exports/snapshots"),
+            args.out_dir or f"exports/reprocessed/{int(time.time())}",
+            processes=args.processes,
+            batch_size=int(cfg.get("reprocess", {}).get("batch_size", 200)),
+            normalizers=(cfg.get("cleaner", {}) or {}).get("normalizers"),
+        )
+        if (cfg.get("metrics", {}) or {}).get("summary", True):
+            logger.info(REGISTRY.summary())
+        return
+
     json_writer = JSONLWriter(cfg["output"]["jsonl"])
     sqlite_store = SQLiteStore(cfg["output"]["sqlite"])
     await sqlite_store.initialize()
 
+    metrics_cfg = cfg.get("metrics", {}) or {}
+    metrics_port = args.metrics_port if args.metrics_port is not None else int(metrics_cfg.get("port", 0) or 0)
+    metrics_server = None
+    if metrics_port:
+        metrics_server = await start_metrics_server(metrics_port, host=metrics_cfg.get("host", "127.0.0.1"))
+
     try:
         if args.mode in ("crawl", "both"):
-            await run_crawl(cfg, json_writer, sqlite_store)
+            if (args.processes or 1) > 1:
+                await run_sharded_crawl(cfg, args.processes, json_writer, sqlite_store)
+            else:
+                await run_crawl(cfg, json_writer, sqlite_store)
         if args.mode in ("github", "both") and cfg.get("github"):
             await run_github_mode(cfg, json_writer, sqlite_store)
     finally:
         await sqlite_store.close()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+        if metrics_cfg.get("summary", True):
+            logger.info(REGISTRY.summary())
 
 
 if __name__ == "__main__":
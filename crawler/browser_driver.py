@@ -1,26 +1,80 @@
+import asyncio
 from playwright.async_api import async_playwright
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from crawler.http_cache import HttpCache
+
+logger = get_logger(__name__)
+
+BROWSER_RESTARTS = REGISTRY.counter("crawler_browser_restarts_total", "Browser relaunches after a crash/disconnect")
 
 
 class BrowserDriver:
-    def __init__(self, user_agent: Optional[str] = None, headless: bool = True, proxy: Optional[Dict[str, Any]] = None):
+    def __init__(
+        self,
+        user_agent: Optional[str] = None,
+        headless: bool = True,
+        proxy: Optional[Dict[str, Any]] = None,
+        http_cache: Optional["HttpCache"] = None,
+    ):
         self.user_agent = user_agent
         self.headless = headless
         self.proxy = proxy
-        self.playwright = None
-        self.browser = None
+        self.http_cache = http_cache
+        self.playwright: Any = None
+        self.browser: Any = None
+        self.restarts = 0
+        self._restart_lock = asyncio.Lock()
 
     async def __aenter__(self):
+        if self.http_cache is not None:
+            await self.http_cache.open()
         self.playwright = await async_playwright().start()
-        launch_kwargs = {"headless": self.headless}
+        await self._launch()
+        return self
+
+    async def _launch(self) -> None:
+        launch_kwargs: Dict[str, Any] = {"headless": self.headless}
         if self.proxy:
             launch_kwargs["proxy"] = self.proxy
         self.browser = await self.playwright.chromium.launch(**launch_kwargs)
-        return self
+
+    @property
+    def connected(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+    async def restart(self) -> None:
+        """Relaunch the browser if it died. Concurrent callers share one relaunch."""
+        async with self._restart_lock:
+            if self.connected:
+                return
+            logger.warning("browser disconnected; relaunching")
+            try:
+                if self.browser is not None:
+                    await self.browser.close()
+            except Exception:
+                pass
+            await self._launch()
+            self.restarts += 1
+            BROWSER_RESTARTS.inc()
 
     async def new_context(self):
-        return await self.browser.new_context(user_agent=self.user_agent or "")
+        if not self.connected:
+            await self.restart()
+        ctx = await self.browser.new_context(user_agent=self.user_agent or "")
+        if self.http_cache is not None:
+            # one disk cache behind every context (and every run); only static asset URLs are routed
+            await ctx.route(self.http_cache.route_pattern(), self.http_cache.handle)
+        return ctx
 
     async def __aexit__(self, exc_type, exc, tb):
-        await self.browser.close()
+        try:
+            await self.browser.close()
+        except Exception as e:
+            logger.debug(f"browser close failed: {e}")
         await self.playwright.stop()
+        if self.http_cache is not None:
+            await self.http_cache.close()
@@ -0,0 +1,247 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+DOMAIN_LIMIT = REGISTRY.gauge("crawler_domain_concurrency_limit", "Current adaptive concurrency limit", ("domain",))
+DOMAIN_ACTIVE = REGISTRY.gauge("crawler_domain_active", "Pages currently holding a domain slot", ("domain",))
+LIMIT_CHANGES = REGISTRY.counter(
+    "crawler_domain_limit_changes_total", "Adaptive concurrency decisions", ("domain", "direction", "reason")
+)
+
+
+class AdjustableSemaphore:
+    """
+    Semaphore whose limit can be changed while tasks hold or wait for it.
+    Lowering the limit never preempts holders; it just stops handing out
+    slots until enough are released.
+    """
+
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for w in self._waiters if not w.done())
+
+    async def acquire(self) -> None:
+        if self._active < self._limit and not self._waiters:
+            self._active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # slot was handed over just as we were cancelled
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self) -> None:
+        self._active -= 1
+        self._wake()
+
+    def set_limit(self, limit: int) -> None:
+        self._limit = limit
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._active < self._limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self._active += 1
+                fut.set_result(None)
+
+
+class _DomainState:
+    def __init__(self, limit: int):
+        self.sem = AdjustableSemaphore(limit)
+        self.latency_ewma: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.last_decrease = 0.0
+        self.ceiling: Optional[int] = None
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease concurrency per domain.
+
+    Every `limit` consecutive healthy responses (one "window") raise the
+    domain's limit by `increase`, up to `max_limit`. A timeout, 429, 5xx, or
+    smoothed latency above `latency_target` cuts it by `decrease_factor`
+    (at most once per `cooldown` seconds, so one burst of concurrent failures
+    counts as a single congestion signal), never below `min_limit`. Other
+    navigation errors (DNS failures, aborted navigations, refused
+    connections, page crashes) say nothing about load and are ignored.
+    Domains start at `initial`, by default the ceiling, so AIMD only ever
+    lowers throughput below the fixed per-domain limit when a site pushes back.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        initial: Optional[int] = None,
+        min_limit: int = 1,
+        increase: int = 1,
+        decrease_factor: float = 0.5,
+        latency_target: float = 10.0,
+        cooldown: float = 5.0,
+        ewma_alpha: float = 0.3,
+    ):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        start = self.max_limit if initial is None else initial
+        self.initial = min(max(start, self.min_limit), self.max_limit)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.alpha = ewma_alpha
+        self._domains: Dict[str, _DomainState] = {}
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "AIMDController":
+        rate = cfg.get("rate_limit", {}) or {}
+        adaptive = rate.get("adaptive", {}) or {}
+        ceiling = int(rate.get("per_domain_concurrency", 0) or 0) or int(cfg.get("concurrency", 2))
+        return cls(
+            max_limit=int(adaptive.get("max_concurrency", ceiling)),
+            initial=int(adaptive.get("initial_concurrency", 0) or 0) or None,
+            min_limit=int(adaptive.get("min_concurrency", 1)),
+            increase=int(adaptive.get("increase", 1)),
+            decrease_factor=float(adaptive.get("decrease_factor", 0.5)),
+            latency_target=float(adaptive.get("latency_target_seconds", 10.0)),
+            cooldown=float(adaptive.get("cooldown_seconds", 5.0)),
+        )
+
+    def _state(self, domain: str) -> _DomainState:
+        st = self._domains.get(domain)
+        if st is None:
+            st = _DomainState(self.initial)
+            self._domains[domain] = st
+            DOMAIN_LIMIT.set(self.initial, domain=domain)
+        return st
+
+    async def acquire(self, domain: str) -> None:
+        st = self._state(domain)
+        await st.sem.acquire()
+        DOMAIN_ACTIVE.set(st.sem.active, domain=domain)
+
+    def release(self, domain: str) -> None:
+        st = self._state(domain)
+        st.sem.release()
+        DOMAIN_ACTIVE.set(st.sem.active, domain=domain)
+
+    def limit(self, domain: str) -> int:
+        return self._state(domain).sem.limit
+
+    def _ceiling(self, st: _DomainState) -> int:
+        return st.ceiling if st.ceiling is not None else self.max_limit
+
+    def set_max_limit(self, max_limit: int) -> None:
+        """
+        Change the default ceiling. Domains without their own ceiling that
+        are above it drop to it at once (holders are not preempted).
+        """
+        self.max_limit = max(1, max_limit)
+        self.min_limit = min(self.min_limit, self.max_limit)
+        self.initial = min(self.initial, self.max_limit)
+        for domain, st in self._domains.items():
+            if st.ceiling is None:
+                self.set_limit(domain, min(st.sem.limit, self.max_limit), "control")
+
+    def set_ceiling(self, domain: str, ceiling: Optional[int]) -> None:
+        """
+        Per-domain override of `max_limit` (None restores it). The limit
+        moves to the new ceiling now; AIMD keeps adapting below it.
+        """
+        st = self._state(domain)
+        st.ceiling = max(1, ceiling) if ceiling is not None else None
+        self.set_limit(domain, self._ceiling(st), "control")
+
+    def set_limit(self, domain: str, limit: int, reason: str = "manual") -> None:
+        st = self._state(domain)
+        new = min(max(limit, self.min_limit), self._ceiling(st))
+        old = st.sem.limit
+        if new == old:
+            return
+        st.sem.set_limit(new)
+        DOMAIN_LIMIT.set(new, domain=domain)
+        direction = "up" if new > old else "down"
+        LIMIT_CHANGES.inc(domain=domain, direction=direction, reason=reason)
+        log = logger.info if direction == "down" else logger.debug
+        log(f"[aimd] {domain}: concurrency {old} -> {new} ({reason})")
+
+    def record(
+        self,
+        domain: str,
+        latency: float,
+        status: Optional[int] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Feed one navigation outcome back into the domain's limit."""
+        timed_out = error is not None and (isinstance(error, asyncio.TimeoutError) or "timeout" in str(error).lower())
+        if error is not None and not timed_out:
+            return
+        st = self._state(domain)
+        st.latency_ewma = latency if st.latency_ewma is None else (
+            self.alpha * latency + (1 - self.alpha) * st.latency_ewma
+        )
+        reason = None
+        if timed_out:
+            reason = "timeout"
+        elif status == 429:
+            reason = "429"
+        elif status is not None and status >= 500:
+            reason = "5xx"
+        elif st.latency_ewma > self.latency_target:
+            reason = "latency"
+
+        if reason is not None:
+            st.failures += 1
+            st.successes = 0
+            now = time.monotonic()
+            if now - st.last_decrease >= self.cooldown:
+                st.last_decrease = now
+                self.set_limit(domain, math.floor(st.sem.limit * self.decrease_factor), reason)
+            return
+
+        st.successes += 1
+        if st.successes >= st.sem.limit and st.sem.limit < self._ceiling(st):
+            st.successes = 0
+            self.set_limit(domain, st.sem.limit + self.increase, "healthy")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            d: {
+                "limit": st.sem.limit,
+                "ceiling": self._ceiling(st),
+                "active": st.sem.active,
+                "waiting": st.sem.waiting,
+                "latency_ewma": round(st.latency_ewma, 3) if st.latency_ewma is not None else None,
+                "failures": st.failures,
+            }
+            for d, st in self._domains.items()
+        }
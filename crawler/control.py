@@ -0,0 +1,330 @@
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+from crawler.concurrency import AIMDController, AdjustableSemaphore
+from crawler.frontier import FrontierItem, PriorityFrontier
+from crawler.url_filter import UrlFilter
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+from utils.sidecar import start_sidecar_server
+
+logger = get_logger(__name__)
+
+CONTROL_ACTIONS = REGISTRY.counter("crawler_control_actions_total", "Runtime control requests applied", ("action",))
+WORKERS = REGISTRY.gauge("crawler_workers", "Fetch workers the crawl is running with")
+PARKED = REGISTRY.gauge("crawler_parked_urls", "Dequeued URLs held back for paused domains")
+
+_UNLIMITED = sys.maxsize
+_MAX_BODY = 1024 * 1024
+
+
+class CrawlControl:
+    """
+    Live knobs for a running crawl: fetch worker count, per-domain delay
+    and concurrency, paused domains, allow/deny domains and seed URLs.
+    run_crawl consults it for every domain slot; start_control_server
+    exposes it over HTTP.
+
+    URLs of a paused domain are parked when a worker dequeues them and go
+    back to the frontier on resume. They stay unfinished meanwhile, so a
+    crawl does not end while one of its domains is paused.
+    """
+
+    def __init__(
+        self,
+        frontier: PriorityFrontier,
+        url_filter: UrlFilter,
+        aimd: Optional[AIMDController] = None,
+        per_domain_delay: float = 0.0,
+        per_domain_concurrency: int = 0,
+    ):
+        self.frontier = frontier
+        self.url_filter = url_filter
+        self.aimd = aimd
+        self.per_domain_delay = per_domain_delay
+        self.per_domain_concurrency = per_domain_concurrency
+        self.delays: Dict[str, float] = {}
+        self.concurrency: Dict[str, int] = {}
+        self.paused: Set[str] = set()
+        self._parked: Dict[str, List[FrontierItem]] = {}
+        self._semaphores: Dict[str, AdjustableSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._spawn: Optional[Callable[[str], Coroutine[Any, Any, None]]] = None
+        self._seed: Optional[Callable[[str, int], Awaitable[Optional[bool]]]] = None
+        self.tasks: List[asyncio.Task] = []
+        self.target = 0
+
+    # -- used by the crawl loop --
+
+    def delay_for(self, domain: str) -> float:
+        return self.delays.get(domain, self.per_domain_delay)
+
+    def reserve_start(self, domain: str) -> float:
+        """
+        Book the domain's next page start, `delay_for(domain)` after the
+        previous one, and return how long the caller should sleep first.
+        Synchronous, so concurrent callers each get their own turn.
+        """
+        delay = self.delay_for(domain)
+        if delay <= 0:
+            return 0.0
+        now = time.monotonic()
+        start = max(now, self._next_start.get(domain, now))
+        self._next_start[domain] = start + delay
+        return start - now
+
+    def _limit_for(self, domain: str) -> int:
+        return self.concurrency.get(domain, self.per_domain_concurrency) or _UNLIMITED
+
+    def semaphore(self, domain: str) -> AdjustableSemaphore:
+        """Per-domain slot when AIMD is off; unlimited unless a concurrency is configured or set."""
+        sem = self._semaphores.get(domain)
+        if sem is None:
+            sem = self._semaphores[domain] = AdjustableSemaphore(self._limit_for(domain))
+        return sem
+
+    def park(self, item: FrontierItem) -> bool:
+        """Hold a dequeued item back if its domain is paused; the caller must not task_done() it."""
+        url = item[0]
+        if not self.paused or url is None:
+            return False
+        dom = urlsplit(url).netloc
+        if dom not in self.paused:
+            return False
+        self._parked.setdefault(dom, []).append(item)
+        PARKED.inc()
+        return True
+
+    def start_workers(
+        self,
+        spawn: Callable[[str], Coroutine[Any, Any, None]],
+        seed: Callable[[str, int], Awaitable[Optional[bool]]],
+        count: int,
+    ) -> None:
+        """Start `count` fetch workers from `spawn(name)`; `seed(url, depth)` queues injected URLs."""
+        self._spawn = spawn
+        self._seed = seed
+        self.add_workers(count)
+
+    async def stop_workers(self) -> None:
+        """One stop sentinel per remaining worker, then wait for all of them (retired ones included)."""
+        for _ in range(self.target):
+            await self.frontier.put((None, None))
+        self.target = 0
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        WORKERS.set(0)
+
+    # -- control actions --
+
+    def add_workers(self, n: int) -> int:
+        assert self._spawn is not None, "start_workers() first"
+        for _ in range(max(0, n)):
+            self.tasks.append(asyncio.create_task(self._spawn(f"w{len(self.tasks)}")))
+            self.target += 1
+        WORKERS.set(self.target)
+        return self.target
+
+    async def remove_workers(self, n: int) -> int:
+        """
+        Retire up to n workers (at least one is kept). Stop sentinels leave
+        the frontier before any URL, so each is taken by the next worker
+        that finishes its current page.
+        """
+        n = min(max(0, n), self.target - 1)
+        for _ in range(n):
+            await self.frontier.put((None, None))
+        self.target -= n
+        WORKERS.set(self.target)
+        return self.target
+
+    async def set_workers(self, count: int) -> int:
+        if count > self.target:
+            return self.add_workers(count - self.target)
+        return await self.remove_workers(self.target - count)
+
+    def set_domain(
+        self,
+        domain: str,
+        delay: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        reset: bool = False,
+    ) -> None:
+        """
+        Change one domain's delay (seconds between page starts) and/or
+        concurrency; "*" changes the defaults for domains without their own
+        setting. With AIMD on, concurrency is the domain's ceiling. `reset`
+        drops the domain's overrides first.
+        """
+        if domain == "*":
+            if delay is not None:
+                self.per_domain_delay = max(0.0, delay)
+            if concurrency is not None:
+                self.per_domain_concurrency = max(0, concurrency)
+                if self.aimd is not None and concurrency > 0:
+                    self.aimd.set_max_limit(concurrency)
+                for dom, sem in self._semaphores.items():
+                    if dom not in self.concurrency:
+                        sem.set_limit(self._limit_for(dom))
+            return
+        if reset:
+            self.delays.pop(domain, None)
+            if self.concurrency.pop(domain, None) is not None:
+                if self.aimd is not None:
+                    self.aimd.set_ceiling(domain, None)
+                elif domain in self._semaphores:
+                    self._semaphores[domain].set_limit(self._limit_for(domain))
+        if delay is not None:
+            self.delays[domain] = max(0.0, delay)
+        if concurrency is not None:
+            self.concurrency[domain] = max(1, concurrency)
+            if self.aimd is not None:
+                self.aimd.set_ceiling(domain, self.concurrency[domain])
+            else:
+                self.semaphore(domain).set_limit(self.concurrency[domain])
+        logger.info(
+            f"[control] {domain}: delay={self.delay_for(domain)}s "
+            f"concurrency={self.concurrency.get(domain, self.per_domain_concurrency) or 'unlimited'}"
+        )
+
+    def pause(self, domain: str) -> None:
+        self.paused.add(domain)
+        logger.info(f"[control] paused {domain}")
+
+    def resume(self, domain: str) -> int:
+        """Unpause a domain and put its parked URLs back in the frontier; returns how many."""
+        self.paused.discard(domain)
+        parked = self._parked.pop(domain, [])
+        for item in parked:
+            self.frontier.requeue(item)
+            # the parked item was never finished; the requeued copy replaces it
+            self.frontier.task_done()
+        PARKED.dec(len(parked))
+        logger.info(f"[control] resumed {domain} ({len(parked)} parked URLs requeued)")
+        return len(parked)
+
+    def set_filters(self, allow: Optional[Iterable[str]] = None, deny: Optional[Iterable[str]] = None) -> None:
+        """Queued URLs are checked again when dequeued, so newly denied domains stop at once."""
+        self.url_filter.set_domains(allow, deny)
+        logger.info(f"[control] allow_domains={self.url_filter.allow_rules} deny_domains={self.url_filter.deny_rules}")
+
+    async def add_seeds(self, urls: Iterable[str], depth: int = 0) -> Dict[str, int]:
+        """
+        The seed callable returns True if the URL was queued, False if the
+        frontier dropped it (duplicate, depth, budget) and None if it went to
+        another shard, whose frontier decides.
+        """
+        assert self._seed is not None, "start_workers() first"
+        counts = {"accepted": 0, "dropped": 0, "forwarded": 0, "rejected": 0}
+        for url in urls:
+            if urlsplit(url).scheme not in ("http", "https") or not self.url_filter.admit(url):
+                counts["rejected"] += 1
+                continue
+            queued = await self._seed(url, depth)
+            counts["forwarded" if queued is None else "accepted" if queued else "dropped"] += 1
+        return counts
+
+    # -- inspection --
+
+    def domain_state(self, domain: str, served: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        if served is None:
+            served = self.frontier.snapshot(top=0)["served_by_domain"]
+        state: Dict[str, Any] = {
+            "delay": self.delay_for(domain),
+            "paused": domain in self.paused,
+            "parked": len(self._parked.get(domain, [])),
+            "served": served.get(domain, 0),
+        }
+        if self.aimd is not None:
+            state.update(self.aimd.snapshot().get(domain, {"limit": None}))
+        else:
+            sem = self._semaphores.get(domain)
+            limit = self._limit_for(domain) if sem is None else sem.limit
+            state.update({
+                "limit": None if limit == _UNLIMITED else limit,
+                "active": sem.active if sem is not None else 0,
+                "waiting": sem.waiting if sem is not None else 0,
+            })
+        return state
+
+    def snapshot(self) -> Dict[str, Any]:
+        frontier = self.frontier.snapshot()
+        domains: Set[str] = set(frontier["served_by_domain"]) | self.paused | set(self._parked)
+        domains |= set(self.delays) | set(self.concurrency) | set(self._semaphores)
+        if self.aimd is not None:
+            domains |= set(self.aimd.snapshot())
+        return {
+            "workers": {"target": self.target, "running": sum(1 for t in self.tasks if not t.done())},
+            "frontier": frontier,
+            "defaults": {"delay": self.per_domain_delay, "concurrency": self.per_domain_concurrency},
+            "filters": {"allow_domains": self.url_filter.allow_rules, "deny_domains": self.url_filter.deny_rules},
+            "domains": {d: self.domain_state(d, frontier["served_by_domain"]) for d in sorted(domains)},
+        }
+
+    async def handle(self, method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        """Route one control request; returns (HTTP status, JSON-able body)."""
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if method == "GET" and parts == ["state"]:
+            return 200, self.snapshot()
+        if len(parts) == 2 and parts[0] == "domains":
+            domain = parts[1]
+            if method == "GET":
+                return 200, self.domain_state(domain)
+            if method == "POST":
+                delay = body.get("delay")
+                concurrency = body.get("concurrency")
+                self.set_domain(
+                    domain,
+                    delay=float(delay) if delay is not None else None,
+                    concurrency=int(concurrency) if concurrency is not None else None,
+                    reset=bool(body.get("reset", False)),
+                )
+                if "paused" in body and domain != "*":
+                    if body["paused"]:
+                        self.pause(domain)
+                    else:
+                        self.resume(domain)
+                CONTROL_ACTIONS.inc(action="domain")
+                return 200, self.domain_state(domain) if domain != "*" else self.snapshot()["defaults"]
+        if method == "POST" and parts == ["workers"]:
+            if "count" in body:
+                target = await self.set_workers(int(body["count"]))
+            else:
+                delta = int(body.get("add", 0)) - int(body.get("remove", 0))
+                target = self.add_workers(delta) if delta >= 0 else await self.remove_workers(-delta)
+            CONTROL_ACTIONS.inc(action="workers")
+            logger.info(f"[control] fetch workers -> {target}")
+            return 200, {"target": target}
+        if method == "POST" and parts == ["seeds"]:
+            urls = body.get("urls") or []
+            if not isinstance(urls, list):
+                raise ValueError("urls must be a list")
+            result = await self.add_seeds([str(u) for u in urls], int(body.get("depth", 0)))
+            CONTROL_ACTIONS.inc(action="seeds")
+            return 200, result
+        if method == "POST" and parts == ["filters"]:
+            self.set_filters(body.get("allow_domains"), body.get("deny_domains"))
+            CONTROL_ACTIONS.inc(action="filters")
+            return 200, self.snapshot()["filters"]
+        return 404, {"error": f"no route for {method} /{'/'.join(parts)}"}
+
+
+async def start_control_server(control: CrawlControl, port: int, host: str = "127.0.0.1"):
+    """
+    Sidecar HTTP server for CrawlControl (JSON in and out), built like the
+    metrics server. Returns the asyncio server; close it with server.close().
+    Bind it to localhost only: it has no authentication.
+    """
+
+    async def handle(method: str, path: str, raw: bytes) -> Tuple[int, bytes]:
+        body = json.loads(raw) if raw.strip() else {}
+        if not isinstance(body, dict):
+            raise ValueError("request body must be a JSON object")
+        status, payload = await control.handle(method, path, body)
+        return status, (json.dumps(payload, indent=2) + "\n").encode("utf-8")
+
+    server = await start_sidecar_server(handle, port, host=host, content_type="application/json", max_body=_MAX_BODY)
+    logger.info(f"Serving crawl control on http://{host}:{port}/state")
+    return server
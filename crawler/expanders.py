@@ -0,0 +1,311 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+EXPANSION_ITEMS = REGISTRY.counter("crawler_expansion_items_total", "Items gained by deep-crawl expansion", ("kind",))
+EXPANSION_STEPS = REGISTRY.counter(
+    "crawler_expansion_steps_total", "Scroll/click iterations by expander and stop reason", ("kind", "stopped")
+)
+
+# Counts feed items (item selector) or, without one, every element under <body>.
+_MEASURE = """
+(itemSel) => ({
+  height: document.body ? document.body.scrollHeight : 0,
+  items: itemSel ? document.querySelectorAll(itemSel).length
+                 : (document.body ? document.body.getElementsByTagName('*').length : 0),
+})
+"""
+
+# Resolves once the page grew, or the load-more button went away / got disabled.
+_CHANGED = """
+([itemSel, prevItems, prevHeight, buttonSel]) => {
+  if (buttonSel) {
+    const el = document.querySelector(buttonSel);
+    if (!el || el.disabled || el.getAttribute('aria-disabled') === 'true' || el.offsetParent === null) {
+      return 'button_gone';
+    }
+  }
+  const items = itemSel ? document.querySelectorAll(itemSel).length
+                        : (document.body ? document.body.getElementsByTagName('*').length : 0);
+  if (items !== prevItems) return 'items';
+  if (document.body && document.body.scrollHeight !== prevHeight) return 'height';
+  return false;
+}
+"""
+
+# After the first change, let the batch finish rendering (uses the readiness observer when present).
+_SETTLED = """
+(quiet) => {
+  const st = window.__coineyReady;
+  return !st || performance.now() - st.lastMutation >= quiet;
+}
+"""
+
+
+class ApiActivity:
+    """XHR/fetch traffic from the sniffer, matched to requests by URL so expanders ignore background noise."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._event = asyncio.Event()
+        self._issued: Dict[str, Deque[float]] = {}
+        # issue time of each answered request (-inf when it was never seen going out)
+        self._answered: Deque[float] = deque(maxlen=1024)
+
+    def request_issued(self, url: str) -> None:
+        self._issued.setdefault(url, deque(maxlen=32)).append(time.monotonic())
+
+    def notify(self, url: Optional[str] = None) -> None:
+        started = float("-inf")
+        issued = self._issued.get(url) if url else None
+        if url and issued:
+            started = issued.popleft()
+            if not issued:
+                del self._issued[url]
+        self._answered.append(started)
+        self.count += 1
+        self._event.set()
+
+    def answered_since(self, since: float) -> int:
+        """Responses so far to requests issued at or after `since` (a time.monotonic() value)."""
+        return sum(1 for t in self._answered if t >= since)
+
+    async def wait_beyond(self, count: int) -> None:
+        while self.count <= count:
+            self._event.clear()
+            await self._event.wait()
+
+
+class ExpansionBudget:
+    """Wall-clock budget shared by every expander run on one page."""
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+
+async def _measure(page, item_selector: Optional[str]) -> Dict[str, int]:
+    result: Dict[str, int] = await page.evaluate(_MEASURE, item_selector)
+    return result
+
+
+async def _wait_for_change(
+    page,
+    before: Dict[str, int],
+    timeout: float,
+    item_selector: Optional[str],
+    button_selector: Optional[str],
+    activity: Optional[ApiActivity],
+    issued_after: float,
+    api_grace: float,
+    settle_ms: float,
+) -> Optional[str]:
+    """
+    Wait up to `timeout` (plus `api_grace` after each triggered API response) for the DOM to grow.
+    Returns "items", "height", "button_gone", "api" or None.
+    """
+    if timeout <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    dom_task = asyncio.create_task(
+        page.wait_for_function(
+            _CHANGED,
+            arg=[item_selector, before["items"], before["height"], button_selector],
+            polling=50,
+            timeout=(timeout + api_grace) * 1000,
+        )
+    )
+    fresh = 0
+    try:
+        while not dom_task.done():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            api_task: Optional[asyncio.Task] = None
+            waiters: List[asyncio.Future] = [dom_task]
+            if activity is not None:
+                api_task = asyncio.create_task(activity.wait_beyond(activity.count))
+                waiters.append(api_task)
+            await asyncio.wait(waiters, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if api_task is not None and activity is not None:
+                api_task.cancel()
+                await asyncio.gather(api_task, return_exceptions=True)
+                answered = activity.answered_since(issued_after)
+                if answered > fresh:
+                    fresh = answered
+                    deadline = max(deadline, loop.time() + api_grace)
+    finally:
+        if not dom_task.done():
+            dom_task.cancel()
+        await asyncio.gather(dom_task, return_exceptions=True)
+
+    signal: Optional[str] = None
+    if not dom_task.cancelled():
+        try:
+            handle = dom_task.result()
+            signal = await handle.json_value()
+        except Exception:
+            signal = None  # timed out with no change
+    if signal is None and fresh:
+        signal = "api"
+    if signal in ("items", "height") and settle_ms > 0:
+        try:
+            await page.wait_for_function(_SETTLED, arg=settle_ms, polling=50, timeout=min(timeout, 2.0) * 1000)
+        except Exception:
+            pass
+    return signal
+
+
+def _low_gain(gains: List[int], min_gain: int, patience: int) -> bool:
+    tail = gains[-patience:]
+    return len(tail) >= patience and all(g < min_gain for g in tail)
+
+
+async def infinite_scroll(
+    page,
+    max_iterations: int,
+    wait_seconds: float,
+    budget: Optional[ExpansionBudget] = None,
+    item_selector: Optional[str] = None,
+    activity: Optional[ApiActivity] = None,
+    min_gain: int = 1,
+    patience: int = 2,
+    api_grace: float = 0.4,
+    settle_ms: float = 150,
+) -> Dict[str, Any]:
+    """
+    Scroll until `patience` steps gain fewer than `min_gain` items or the budget runs out.
+    Returns {"iterations", "gains", "stopped"}.
+    """
+    gains: List[int] = []
+    stopped = "max_iterations"
+    before = await _measure(page, item_selector)
+    for _ in range(max_iterations):
+        if budget is not None and budget.remaining() <= 0:
+            stopped = "budget"
+            break
+        issued_after = time.monotonic()
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        timeout = wait_seconds if budget is None else min(wait_seconds, budget.remaining())
+        signal = await _wait_for_change(
+            page, before, timeout, item_selector, None, activity, issued_after, api_grace, settle_ms
+        )
+        after = await _measure(page, item_selector)
+        gains.append(max(0, after["items"] - before["items"]))
+        # an "api" signal alone is not growth: it may have been a beacon fired after the scroll
+        grew = signal in ("items", "height") or after != before
+        before = after
+        if not grew:
+            stopped = "no_growth"
+            break
+        if _low_gain(gains, min_gain, patience):
+            stopped = "diminishing"
+            break
+    EXPANSION_ITEMS.inc(sum(gains), kind="scroll")
+    EXPANSION_STEPS.inc(len(gains), kind="scroll", stopped=stopped)
+    logger.debug(f"infinite_scroll: {len(gains)} steps, gains={gains}, stopped={stopped}")
+    return {"iterations": len(gains), "gains": gains, "stopped": stopped}
+
+
+async def click_more(
+    page,
+    selectors: List[str],
+    max_clicks: int,
+    wait_seconds: float,
+    budget: Optional[ExpansionBudget] = None,
+    item_selector: Optional[str] = None,
+    activity: Optional[ApiActivity] = None,
+    min_gain: int = 1,
+    patience: int = 2,
+    api_grace: float = 0.4,
+    settle_ms: float = 150,
+) -> Dict[str, Any]:
+    """
+    Click "load more" until it goes away, stops adding items, or the budget runs out.
+    Returns {"iterations", "gains", "stopped"}.
+    """
+    gains: List[int] = []
+    stopped = "exhausted"
+    clicks = 0
+    for sel in selectors:
+        button = page.locator(sel).first
+        gains_for_sel: List[int] = []
+        while clicks < max_clicks:
+            if budget is not None and budget.remaining() <= 0:
+                stopped = "budget"
+                break
+            try:
+                if not await button.is_visible() or not await button.is_enabled():
+                    break
+                before = await _measure(page, item_selector)
+                issued_after = time.monotonic()
+                await button.click(timeout=min(wait_seconds, 5.0) * 1000)
+            except Exception:
+                break
+            clicks += 1
+            timeout = wait_seconds if budget is None else min(wait_seconds, budget.remaining())
+            signal = await _wait_for_change(
+                page, before, timeout, item_selector, sel, activity, issued_after, api_grace, settle_ms
+            )
+            after = await _measure(page, item_selector)
+            gain = max(0, after["items"] - before["items"])
+            gains.append(gain)
+            gains_for_sel.append(gain)
+            if signal == "button_gone":
+                break
+            if _low_gain(gains_for_sel, min_gain, patience):
+                stopped = "diminishing"
+                break
+        if clicks >= max_clicks:
+            stopped = "max_clicks"
+        if stopped in ("budget", "max_clicks"):
+            break
+    EXPANSION_ITEMS.inc(sum(gains), kind="click")
+    EXPANSION_STEPS.inc(len(gains), kind="click", stopped=stopped)
+    logger.debug(f"click_more: {len(gains)} clicks, gains={gains}, stopped={stopped}")
+    return {"iterations": len(gains), "gains": gains, "stopped": stopped}
+
+
+async def submit_form(
+    page,
+    fields: Dict[str, str],
+    submit_selector: Optional[str],
+    wait_seconds: float,
+    item_selector: Optional[str] = None,
+    activity: Optional[ApiActivity] = None,
+    api_grace: float = 0.4,
+    settle_ms: float = 150,
+) -> Optional[str]:
+    """Fill `fields` (selector -> value), submit, and return the signal that showed the results, or None."""
+    for selector, value in fields.items():
+        try:
+            el = await page.wait_for_selector(selector, timeout=3000)
+            await el.fill(value)
+        except Exception as e:
+            logger.debug(f"form fill failed for {selector}: {e}")
+    before = await _measure(page, item_selector)
+    issued_after = time.monotonic()
+    if submit_selector:
+        try:
+            el = await page.query_selector(submit_selector)
+            if el:
+                await el.click()
+        except Exception as e:
+            logger.debug(f"form submit failed for {submit_selector}: {e}")
+    signal = await _wait_for_change(
+        page, before, wait_seconds, item_selector, None, activity, issued_after, api_grace, settle_ms
+    )
+    try:
+        # a GET/POST submit navigates; make sure the results document is in before reading it
+        await page.wait_for_load_state("domcontentloaded", timeout=max(wait_seconds, 1.0) * 1000)
+    except Exception:
+        pass
+    return signal
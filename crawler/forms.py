@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urldefrag
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Form seeds travel through the frontier as the action URL plus this fragment.
+# Crawled links are defragmented, so the keys never collide with real pages,
+# while the netloc keeps per-domain politeness and fairness working.
+FORM_FRAGMENT = "coiney-form="
+
+
+@dataclass
+class FormTask:
+    """One query to submit on one configured search form."""
+
+    key: str
+    url: str
+    query: str
+    fields: Dict[str, str] = field(default_factory=dict)
+    submit_selector: Optional[str] = None
+    wait_seconds: float = 5.0
+    max_results: int = 20
+
+
+def _queries(action: Dict[str, Any]) -> Optional[List[str]]:
+    q_inline = action.get("queries")
+    q_file = action.get("queries_file")
+    if isinstance(q_inline, list):
+        return [str(x) for x in q_inline]
+    if isinstance(q_file, str):
+        try:
+            with open(q_file, "r", encoding="utf-8") as f:
+                return [line.strip() for line in f if line.strip()]
+        except Exception as e:
+            logger.warning(f"Failed to read queries_file: {e}")
+            return None
+    return [""]
+
+
+def load_form_tasks(cfg: Dict[str, Any], owns: Optional[Callable[[str], bool]] = None) -> List[FormTask]:
+    """Expand deep_crawl.forms into one task per (form, query)."""
+    forms_cfg = (cfg.get("deep_crawl", {}) or {}).get("forms") or []
+    tasks: List[FormTask] = []
+    for i, action in enumerate(forms_cfg):
+        url = action.get("url")
+        if not url or (owns is not None and not owns(url)):
+            continue
+        queries = _queries(action)
+        if queries is None:
+            continue
+        base, _ = urldefrag(url)
+        fields: Dict[str, str] = action.get("fields", {}) or {}
+        for j, q in enumerate(queries):
+            tasks.append(FormTask(
+                key=f"{base}#{FORM_FRAGMENT}{i}.{j}",
+                url=url,
+                query=q,
+                fields={sel: str(value).replace("{query}", q) for sel, value in fields.items()},
+                submit_selector=action.get("submit_selector"),
+                wait_seconds=float(action.get("wait_after_submit", 5.0)),
+                max_results=int(action.get("max_results_per_query", 20)),
+            ))
+    return tasks
@@ -1,118 +1,95 @@
 import asyncio
 import time
-from typing import Any, Dict, Optional, Set, Tuple, List
-from urllib.parse import urljoin, urldefrag, urlparse
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set, Tuple, List
+from urllib.parse import urljoin, urldefrag, urlparse, urlsplit
 from crawler.browser_driver import BrowserDriver
-from crawler.api_sniffer import attach_sniffer
+from crawler.api_sniffer import attach_sniffer, is_api_request
+from crawler.concurrency import AIMDController
+from crawler.control import CrawlControl, start_control_server
+from crawler.frontier import PriorityFrontier
+from crawler.http_cache import HttpCache
+from crawler.lifecycle import MemoryGuard, PageSlot
+from crawler.expanders import ApiActivity, ExpansionBudget, click_more, infinite_scroll, submit_form
+from crawler.readiness import READINESS_INIT_SCRIPT, ReadinessTracker, wait_until_ready
 from parser.html_parser import parse_html
-from pipeline.cleaner import normalize_parsed
+from crawler.forms import FormTask, load_form_tasks
+from pipeline.cleaner import BatchCleaner
+from pipeline.records import build_record
 from crawler.robots import RobotsCache
+from crawler.sitemaps import fetch_sitemap_urls
+from crawler.stages import BatchStage, Stage
+from crawler.url_filter import UrlFilter
+from storage.snapshot_store import SnapshotStore
 from utils.logger import get_logger
-from pathlib import Path
+from utils.metrics import REGISTRY
 
+if TYPE_CHECKING:
+    from crawler.sharded import ShardLink
 
 logger = get_logger(__name__)
 
-
-async def infinite_scroll(page, max_iterations: int, wait_seconds: float) -> None:
-    prev_height = -1
-    for _ in range(max_iterations):
-        height = await page.evaluate("document.body.scrollHeight")
-        if height == prev_height:
-            break
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        await asyncio.sleep(wait_seconds)
-        prev_height = height
-
-
-async def click_more(page, selectors: List[str], max_clicks: int, wait_seconds: float) -> None:
-    clicks = 0
-    for sel in selectors:
-        while clicks < max_clicks:
-            try:
-                btn = await page.query_selector(sel)
-                if not btn:
-                    break
-                await btn.click()
-                clicks += 1
-                await asyncio.sleep(wait_seconds)
-            except Exception:
-                break
-
-
-async def seed_from_forms(cfg: Dict[str, Any], drv: BrowserDriver, queue: asyncio.Queue) -> None:
-    forms_cfg = (cfg.get("deep_crawl", {}) or {}).get("forms") or []
-    if not forms_cfg:
-        return
-    ctx = await drv.new_context()
-    page = await ctx.new_page()
-    for action in forms_cfg:
-        try:
-            url = action.get("url")
-            if not url:
-                continue
-            await page.goto(url, wait_until="domcontentloaded")
-            # gather queries from inline list or file
-            queries: List[str] = []
-            q_inline = action.get("queries")
-            q_file = action.get("queries_file")
-            if isinstance(q_inline, list):
-                queries = [str(x) for x in q_inline]
-            elif isinstance(q_file, str):
-                try:
-                    with open(q_file, "r", encoding="utf-8") as f:
-                        queries = [line.strip() for line in f if line.strip()]
-                except Exception as e:
-                    logger.warning(f"Failed to read queries_file: {e}")
-                    continue
-            else:
-                queries = [""]
-            fields: Dict[str, str] = action.get("fields", {})
-            submit_selector: Optional[str] = action.get("submit_selector")
-            wait_after_submit: float = float(action.get("wait_after_submit", 1.0))
-            max_results_per_query: int = int(action.get("max_results_per_query", 20))
-
-            for q in queries:
-                for selector, value in fields.items():
-                    v = value.replace("{query}", q)
-                    try:
-                        el = await page.wait_for_selector(selector, timeout=3000)
-                        await el.fill(v)
-                    except Exception as e:
-                        logger.debug(f"form fill failed for {selector}: {e}")
-                if submit_selector:
-                    try:
-                        el = await page.query_selector(submit_selector)
-                        if el:
-                            await el.click()
-                    except Exception:
-                        pass
-                await asyncio.sleep(wait_after_submit)
-                html = await page.content()
-                parsed = parse_html(page.url, html)
-                count = 0
-                for link in parsed.get("links", []):
-                    normalized = normalize_url(link, page.url)
-                    if normalized:
-                        await queue.put((normalized, 0))
-                        count += 1
-                        if count >= max_results_per_query:
-                            break
-        except Exception as e:
-            logger.warning(f"form seed error: {e}")
-    await ctx.close()
-
-
-async def run_crawl(cfg: Dict[str, Any], json_writer, sqlite_store) -> None:
+STAGE_SECONDS = REGISTRY.histogram("crawler_stage_seconds", "Time spent per crawl stage", ("stage", "domain"))
+PAGES = REGISTRY.counter("crawler_pages_total", "Pages processed", ("domain", "outcome"))
+WORKER_PAGES = REGISTRY.counter("crawler_worker_pages_total", "Pages processed per worker", ("worker", "outcome"))
+RETRIES = REGISTRY.counter("crawler_retries_total", "Navigation retries", ("domain",))
+BYTES_CAPTURED = REGISTRY.counter("crawler_bytes_captured_total", "HTML bytes captured", ("domain",))
+API_HITS = REGISTRY.counter("crawler_api_hits_total", "XHR/fetch/GraphQL responses captured", ("domain",))
+FRONTIER_SIZE = REGISTRY.gauge("crawler_frontier_size", "URLs waiting in the frontier")
+IN_FLIGHT = REGISTRY.gauge("crawler_in_flight_pages", "Pages currently being processed")
+FORM_SEEDS = REGISTRY.counter("crawler_form_seeds_total", "Form queries submitted", ("domain", "outcome"))
+
+
+@dataclass
+class FetchedPage:
+    """What the fetch stage hands to parse/store once the browser page is free again."""
+
+    url: str
+    depth: int
+    domain: str
+    html: str
+    fetched_at: float
+    api_hits: List[Any] = field(default_factory=list)
+    expansion: Dict[str, Any] = field(default_factory=dict)
+    screenshot: Optional[bytes] = None
+
+
+async def run_crawl(cfg: Dict[str, Any], json_writer, sqlite_store, shard: Optional["ShardLink"] = None) -> None:
+    """
+    Crawl start_urls as a fetch -> parse -> clean -> store pipeline. Fetch
+    workers own the browser pages and hand the captured HTML to parse workers,
+    which extract and enqueue links; the clean stage runs the cleaner chain
+    over batches of records; store workers write them. Stages are
+    joined by bounded queues (see crawler.stages), so storage backpressure
+    throttles fetching instead of growing memory. When `shard` is given the
+    crawl runs as one process of a sharded group (see crawler.sharded): it only
+    visits domains it owns and routes other links to their owning shard.
+    """
     start_urls = cfg.get("start_urls", [])
     if not start_urls:
         logger.warning("No start_urls configured; skipping crawl")
         return
 
-    concurrency: int = cfg.get("concurrency", 2)
-    queue: asyncio.Queue[Tuple[Optional[str], Optional[int]]] = asyncio.Queue()
+    pipeline_cfg = cfg.get("pipeline", {}) or {}
+    concurrency = int(pipeline_cfg.get("fetch_workers") or cfg.get("concurrency", 2))
+    parse_in_thread = bool(pipeline_cfg.get("parse_in_thread", True))
+    queue = PriorityFrontier.from_config(cfg)
     for url in start_urls:
-        await queue.put((url, 0))
+        if shard is None or shard.owns(url):
+            await queue.put((url, 0))
+    # form queries are frontier items too, so they run across the worker pool with page visits
+    form_tasks: Dict[str, FormTask] = {}
+    for task in load_form_tasks(cfg, owns=shard.owns if shard is not None else None):
+        form_tasks[task.key] = task
+        await queue.put((task.key, 0))
+    FRONTIER_SIZE.set(queue.qsize())
+
+    async def enqueue(url: str, depth: int) -> None:
+        if shard is None or shard.owns(url):
+            await queue.put((url, depth))
+            FRONTIER_SIZE.set(queue.qsize())
+        else:
+            shard.forward(url, depth)
 
     visited: Set[str] = set()
     respect_robots = cfg.get("crawl", {}).get("respect_robots", False)
@@ -121,87 +98,232 @@ async def run_crawl(cfg: Dict[str, Any], json_writer, sqlite_store) -> None:
     headless: bool = bool(cfg.get("headless", True))
     proxy = cfg.get("proxy")
 
-    allow_domains = set(cfg.get("crawl", {}).get("allow_domains", []) or [])
-    deny_domains = set(cfg.get("crawl", {}).get("deny_domains", []) or [])
-    deny_extensions = set(
-        cfg.get("crawl", {}).get(
-            "deny_extensions",
-            [
-                ".jpg",
-                ".jpeg",
-                ".png",
-                ".gif",
-                ".svg",
-                ".webp",
-                ".ico",
-                ".pdf",
-                ".zip",
-                ".gz",
-                ".tar",
-                ".rar",
-                ".7z",
-                ".mp3",
-                ".mp4",
-            ],
-        )
-    )
+    url_filter = UrlFilter.from_config(cfg)
+
+    sitemap_cfg = cfg.get("crawl", {}).get("sitemaps", {}) or {}
+    if sitemap_cfg.get("enabled", False):
+        for start in start_urls:
+            if shard is not None and not shard.owns(start):
+                continue
+            entries = await fetch_sitemap_urls(
+                start,
+                sitemap_cfg.get("urls") or None,
+                max_urls=int(sitemap_cfg.get("max_urls", 5000)),
+                user_agent=cfg.get("user_agent"),
+            )
+            lastmods = {loc: lastmod for loc, lastmod in entries if lastmod is not None}
+            for loc in url_filter.filter_links([loc for loc, _ in entries], start, robots):
+                if loc in lastmods:
+                    queue.hint_lastmod(loc, lastmods[loc])
+                await enqueue(loc, 1)
 
     per_domain_delay = float(cfg.get("rate_limit", {}).get("per_domain_delay_seconds", 0))
     per_domain_concurrency = int(cfg.get("rate_limit", {}).get("per_domain_concurrency", 0))
+    adaptive_cfg = cfg.get("rate_limit", {}).get("adaptive", {}) or {}
+    aimd = AIMDController.from_config(cfg) if adaptive_cfg.get("enabled", True) else None
 
-    domain_semaphores: Dict[str, asyncio.Semaphore] = {}
-    domain_last_access: Dict[str, float] = {}
-    domain_lock = asyncio.Lock()
+    # per-domain delay/concurrency and paused domains can be changed while the crawl runs
+    control = CrawlControl(queue, url_filter, aimd, per_domain_delay, per_domain_concurrency)
 
-    snapshots_dir = Path(cfg.get("output", {}).get("snapshots_dir", "exports/snapshots"))
     save_html = bool(cfg.get("crawl", {}).get("save_html_snapshot", False))
     save_screenshot = bool(cfg.get("crawl", {}).get("save_screenshot", False))
+    save_api = bool(cfg.get("crawl", {}).get("snapshot_api_payloads", True))
+    snapshots: Optional[SnapshotStore] = None
     if save_html or save_screenshot:
-        snapshots_dir.mkdir(parents=True, exist_ok=True)
+        snapshots = SnapshotStore(
+            cfg.get("output", {}).get("snapshots_dir", "exports/snapshots"),
+            compression_level=int(cfg.get("crawl", {}).get("snapshot_compression_level", 6)),
+            shard=shard.index if shard is not None else None,
+        )
+
+    readiness = ReadinessTracker(cfg.get("crawl", {}).get("readiness", {}) or {})
 
     deep_cfg = cfg.get("deep_crawl", {}) or {}
     infinite_cfg = deep_cfg.get("infinite_scroll", {}) or {}
     click_more_selectors = deep_cfg.get("click_more_selectors", []) or []
+    expand_opts: Dict[str, Any] = {
+        "item_selector": deep_cfg.get("item_selector") or None,
+        "min_gain": int(deep_cfg.get("min_gain", 1)),
+        "patience": int(deep_cfg.get("patience", 2)),
+        "api_grace": float(deep_cfg.get("api_grace_seconds", 0.4)),
+    }
+    expand_budget = float(deep_cfg.get("time_budget", 20.0))
+
+    lifecycle_cfg = cfg.get("browser_lifecycle", {}) or {}
+    memory_guard = MemoryGuard(
+        max_rss_mb=float(lifecycle_cfg.get("max_browser_rss_mb", 0) or 0),
+        interval=float(lifecycle_cfg.get("check_interval_seconds", 30)),
+    )
 
-    async def acquire_domain_slot(domain: str):
-        if per_domain_concurrency > 0:
-            async with domain_lock:
-                if domain not in domain_semaphores:
-                    domain_semaphores[domain] = asyncio.Semaphore(per_domain_concurrency)
-            sem = domain_semaphores[domain]
+    async def acquire_domain_slot(domain: str) -> None:
+        if aimd is not None:
+            await aimd.acquire(domain)
+        else:
+            await control.semaphore(domain).acquire()
+        # the start time is reserved without awaiting, so a slow domain never holds up the others
+        wait = control.reserve_start(domain)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def release_domain_slot(domain: str) -> None:
+        if aimd is not None:
+            aimd.release(domain)
         else:
-            sem = None
-
-        if sem:
-            await sem.acquire()
-        if per_domain_delay > 0:
-            now = time.time()
-            async with domain_lock:
-                last = domain_last_access.get(domain)
-                if last is not None:
-                    wait = per_domain_delay - (now - last)
-                    if wait > 0:
-                        await asyncio.sleep(wait)
-                domain_last_access[domain] = time.time()
-        return sem
-
-    def release_domain_slot(domain: str, sem: Optional[asyncio.Semaphore]):
-        if sem:
-            sem.release()
-
-    async with BrowserDriver(user_agent=cfg.get("user_agent"), headless=headless, proxy=proxy) as drv:
-        await seed_from_forms(cfg, drv, queue)
+            control.semaphore(domain).release()
+
+    async with BrowserDriver(
+        user_agent=cfg.get("user_agent"), headless=headless, proxy=proxy, http_cache=HttpCache.from_config(cfg)
+    ) as drv:
+        async def seed_form(name: str, form: FormTask, dom: str, slot: PageSlot, activity: ApiActivity) -> None:
+            """Submit one form query on the worker's page and enqueue the result links."""
+            with STAGE_SECONDS.time(stage="domain_slot", domain=dom):
+                await acquire_domain_slot(dom)
+            IN_FLIGHT.inc()
+            outcome = "error"
+            try:
+                logger.info(f"[{name}] Form seed {form.url} (query={form.query!r})")
+                page = await slot.acquire()
+                nav_start = time.perf_counter()
+                try:
+                    with STAGE_SECONDS.time(stage="navigate", domain=dom):
+                        response = await page.goto(form.url, wait_until="domcontentloaded")
+                except Exception as nav_err:
+                    if aimd is not None:
+                        aimd.record(dom, time.perf_counter() - nav_start, error=nav_err)
+                    raise
+                if aimd is not None:
+                    aimd.record(
+                        dom, time.perf_counter() - nav_start, status=response.status if response is not None else None
+                    )
+                with STAGE_SECONDS.time(stage="form_submit", domain=dom):
+                    await submit_form(
+                        page,
+                        form.fields,
+                        form.submit_selector,
+                        form.wait_seconds,
+                        item_selector=expand_opts["item_selector"],
+                        activity=activity,
+                        api_grace=expand_opts["api_grace"],
+                    )
+                    html = await page.content()
+                results_url = page.url
+                await slot.after_page()
+                parsed = await asyncio.to_thread(parse_html, results_url, html)
+                with STAGE_SECONDS.time(stage="enqueue_links", domain=dom):
+                    links = url_filter.filter_links(parsed.get("links", []), results_url, robots)
+                    for link in links[:form.max_results]:
+                        await enqueue(link, 0)
+                outcome = "ok"
+            except Exception as e:
+                slot.report_error(e)
+                logger.warning(f"[{name}] form seed error for {form.url} (query={form.query!r}): {e}")
+            finally:
+                IN_FLIGHT.dec()
+                release_domain_slot(dom)
+                FORM_SEEDS.inc(domain=dom, outcome=outcome)
+                queue.task_done()
+
+        def parse_record(fp: FetchedPage) -> Dict[str, Any]:
+            return build_record(
+                fp.url, fp.html, fp.depth, fp.fetched_at, fp.api_hits, fp.expansion, STAGE_SECONDS, fp.domain,
+                normalize=False,
+            )
+
+        async def parse_page(fp: FetchedPage) -> None:
+            # the frontier item stays unfinished until its links are enqueued
+            try:
+                try:
+                    parsed = await asyncio.to_thread(parse_record, fp) if parse_in_thread else parse_record(fp)
+                except Exception:
+                    PAGES.inc(domain=fp.domain, outcome="parse_error")
+                    raise
+                with STAGE_SECONDS.time(stage="enqueue_links", domain=fp.domain):
+                    for link in url_filter.filter_links(parsed.get("links", []), fp.url, robots):
+                        await enqueue(link, fp.depth + 1)
+                await clean_stage.put((fp, parsed))
+            finally:
+                queue.task_done()
+
+        async def clean_pages(items: List[Tuple[FetchedPage, Dict[str, Any]]]) -> None:
+            cleaned = await cleaner.clean([parsed for _, parsed in items])
+            for (fp, _), record in zip(items, cleaned):
+                await store_stage.put((fp, record))
+
+        async def store_page(item: Tuple[FetchedPage, Optional[Dict[str, Any]]]) -> None:
+            fp, parsed = item
+            try:
+                # records dropped by a cleaner filter still get their snapshots
+                if parsed is not None:
+                    with STAGE_SECONDS.time(stage="store", domain=fp.domain):
+                        await json_writer.write(parsed)
+                        await sqlite_store.insert(parsed)
+                if snapshots is not None and save_html:
+                    with STAGE_SECONDS.time(stage="snapshot_html", domain=fp.domain):
+                        # enough to rebuild the record offline (see pipeline.reprocess)
+                        extra: Dict[str, Any] = {"depth": fp.depth}
+                        if fp.expansion:
+                            extra["expansion"] = fp.expansion
+                        if fp.api_hits and save_api:
+                            api_entry = await snapshots.put_api(fp.url, fp.api_hits, fp.fetched_at)
+                            extra["api_blob"] = api_entry["blob"]
+                            extra["api_encoding"] = api_entry["encoding"]
+                        await snapshots.put_html(fp.url, fp.html, fp.fetched_at, extra)
+                if snapshots is not None and fp.screenshot is not None:
+                    with STAGE_SECONDS.time(stage="snapshot_screenshot", domain=fp.domain):
+                        await snapshots.put_screenshot(fp.url, fp.screenshot, fp.fetched_at)
+            except Exception:
+                PAGES.inc(domain=fp.domain, outcome="store_error")
+                raise
+            PAGES.inc(domain=fp.domain, outcome="ok" if parsed is not None else "filtered")
+
+        parse_stage = Stage(
+            "parse",
+            parse_page,
+            int(pipeline_cfg.get("parse_workers", 2)),
+            int(pipeline_cfg.get("parse_queue_size") or concurrency * 2),
+        )
+        cleaner_cfg = cfg.get("cleaner", {}) or {}
+        cleaner = BatchCleaner.from_config(cfg)
+        clean_stage = BatchStage(
+            "clean",
+            clean_pages,
+            1,
+            int(cleaner_cfg.get("queue_size") or 64),
+            batch_size=cleaner.batch_size,
+            max_wait=float(cleaner_cfg.get("max_wait_seconds", 0.05)),
+        )
+        store_stage = Stage(
+            "store",
+            store_page,
+            int(pipeline_cfg.get("store_workers", 1)),
+            int(pipeline_cfg.get("store_queue_size") or 64),
+        )
 
         async def worker(name: str) -> None:
-            ctx = await drv.new_context()
-            page = await ctx.new_page()
-            api_hits = []
+            api_hits: List[Any] = []
+            activity = ApiActivity()
 
             async def on_api(data):
                 api_hits.append(data)
-
-            if cfg.get("crawl", {}).get("intercept_api", True):
-                await attach_sniffer(page, on_api)
+                activity.notify(data.get("url"))
+
+            async def setup_page(page: Any) -> None:
+                if cfg.get("crawl", {}).get("intercept_api", True):
+                    # issue times let expanders ignore responses to requests sent before their action
+                    page.on("request", lambda req: activity.request_issued(req.url) if is_api_request(req) else None)
+                    await attach_sniffer(page, on_api)
+                if readiness.adaptive:
+                    await page.add_init_script(READINESS_INIT_SCRIPT)
+
+            slot = PageSlot(
+                drv,
+                setup_page,
+                max_navigations=int(lifecycle_cfg.get("max_navigations", 0) or 0),
+                max_js_heap_mb=float(lifecycle_cfg.get("max_js_heap_mb", 0) or 0),
+                heap_check_every=int(lifecycle_cfg.get("heap_check_every", 10)),
+                generation=lambda: memory_guard.generation,
+            )
+            wait_until = "domcontentloaded" if readiness.adaptive else "networkidle"
 
             max_retries: int = int(cfg.get("crawl", {}).get("max_retries", 2))
             backoff_base: float = float(cfg.get("crawl", {}).get("backoff_base", 0.75))
@@ -209,42 +331,60 @@ async def run_crawl(cfg: Dict[str, Any], json_writer, sqlite_store) -> None:
             try:
                 while True:
                     url, depth = await queue.get()
+                    FRONTIER_SIZE.set(queue.qsize())
                     if url is None:
                         queue.task_done()
                         break
+                    if control.park((url, depth)):
+                        continue
 
-                    if (url in visited) or (depth is not None and depth > cfg.get("max_depth", 2)):
-                        queue.task_done()
+                    form = form_tasks.pop(url, None)
+                    if form is not None:
+                        # a form query is not a page: keep it out of the page budgets
+                        if not queue.charge(url, page=False):
+                            queue.task_done()
+                            continue
+                        await seed_form(name, form, urlparse(url).netloc, slot, activity)
+                        await asyncio.sleep(cfg.get("rate_limit", {}).get("delay_seconds", 0.5))
                         continue
 
-                    parsed_url = urlparse(url)
-                    dom = parsed_url.netloc
-                    if allow_domains and dom not in allow_domains:
+                    if (url in visited) or (depth is not None and depth > cfg.get("max_depth", 2)):
                         queue.task_done()
                         continue
-                    if dom in deny_domains:
+
+                    if not url_filter.admit(url) or not queue.charge(url):
                         queue.task_done()
                         continue
-                    skip_due_to_ext = False
-                    for ext in deny_extensions:
-                        if parsed_url.path.lower().endswith(ext):
-                            queue.task_done()
-                            skip_due_to_ext = True
-                            break
-                    if skip_due_to_ext:
-                        continue
+                    dom = urlparse(url).netloc
 
                     visited.add(url)
 
-                    domain_sem = await acquire_domain_slot(dom)
+                    with STAGE_SECONDS.time(stage="domain_slot", domain=dom):
+                        await acquire_domain_slot(dom)
+                    holding_slot = True
+                    IN_FLIGHT.inc()
+                    fetched: Optional[FetchedPage] = None
+                    api_hits.clear()
                     try:
                         logger.info(f"[{name}] Visiting {url} (depth={depth})")
+                        page = await slot.acquire()
                         attempt = 0
                         while True:
+                            nav_start = time.perf_counter()
                             try:
-                                await page.goto(url, wait_until="networkidle")
+                                with STAGE_SECONDS.time(stage="navigate", domain=dom):
+                                    response = await page.goto(url, wait_until=wait_until)
+                                if aimd is not None:
+                                    aimd.record(
+                                        dom,
+                                        time.perf_counter() - nav_start,
+                                        status=response.status if response is not None else None,
+                                    )
                                 break
                             except Exception as nav_err:
+                                slot.report_error(nav_err)
+                                if aimd is not None:
+                                    aimd.record(dom, time.perf_counter() - nav_start, error=nav_err)
                                 if attempt >= max_retries:
                                     raise nav_err
                                 sleep_s = backoff_base * (2 ** attempt)
@@ -252,73 +392,118 @@ async def run_crawl(cfg: Dict[str, Any], json_writer, sqlite_store) -> None:
                                     f"[{name}] goto failed (attempt {attempt + 1}/{max_retries + 1}): {nav_err}; "
                                     f"retrying in {sleep_s:.2f}s",
                                 )
+                                RETRIES.inc(domain=dom)
+                                # don't hold the domain slot while backing off
+                                release_domain_slot(dom)
+                                holding_slot = False
                                 await asyncio.sleep(sleep_s)
+                                await acquire_domain_slot(dom)
+                                holding_slot = True
+                                # a crashed page is swapped for a fresh one before the retry
+                                page = await slot.acquire()
                                 attempt += 1
 
-                        await asyncio.sleep(cfg.get("crawl", {}).get("wait_after_load", 1.0))
+                        if readiness.adaptive:
+                            with STAGE_SECONDS.time(stage="readiness", domain=dom):
+                                await wait_until_ready(page, readiness, dom)
+                        else:
+                            with STAGE_SECONDS.time(stage="wait_after_load", domain=dom):
+                                await asyncio.sleep(cfg.get("crawl", {}).get("wait_after_load", 1.0))
 
+                        budget = ExpansionBudget(expand_budget)
+                        expansion: Dict[str, Any] = {}
                         if infinite_cfg.get("enabled", False):
-                            await infinite_scroll(
-                                page,
-                                int(infinite_cfg.get("max_iterations", 8)),
-                                float(infinite_cfg.get("wait_seconds", 0.8)),
-                            )
+                            with STAGE_SECONDS.time(stage="infinite_scroll", domain=dom):
+                                expansion["scroll"] = await infinite_scroll(
+                                    page,
+                                    int(infinite_cfg.get("max_iterations", 8)),
+                                    float(infinite_cfg.get("wait_seconds", 3.0)),
+                                    budget=budget,
+                                    activity=activity,
+                                    **expand_opts,
+                                )
                         if click_more_selectors:
-                            await click_more(
-                                page,
-                                click_more_selectors,
-                                int(deep_cfg.get("max_clicks", 10)),
-                                float(deep_cfg.get("click_wait_seconds", 0.8)),
-                            )
-
-                        html = await page.content()
-                        parsed = parse_html(url, html)
-
-                        parsed['scrape_meta'] = {
-                            "url": url,
-                            "depth": depth,
-                            "timestamp": int(time.time()),
-                            "api_hits": api_hits.copy(),
-                            "schema_version": "1.0",
-                        }
-
-                        parsed = normalize_parsed(parsed)
-                        await json_writer.write(parsed)
-                        await sqlite_store.insert(parsed)
+                            with STAGE_SECONDS.time(stage="click_more", domain=dom):
+                                expansion["click"] = await click_more(
+                                    page,
+                                    click_more_selectors,
+                                    int(deep_cfg.get("max_clicks", 10)),
+                                    float(deep_cfg.get("click_wait_seconds", 3.0)),
+                                    budget=budget,
+                                    activity=activity,
+                                    **expand_opts,
+                                )
 
-                        ts = parsed['scrape_meta']["timestamp"]
-                        base_name = f"{parsed_url.netloc}_{ts}"
-                        if save_html:
-                            (snapshots_dir / f"{base_name}.html").write_text(html, encoding="utf-8")
-                        if save_screenshot:
+                        with STAGE_SECONDS.time(stage="content", domain=dom):
+                            html = await page.content()
+                        fetched = FetchedPage(url, depth or 0, dom, html, time.time(), api_hits.copy(), expansion)
+                        BYTES_CAPTURED.inc(len(html.encode("utf-8")), domain=dom)
+                        API_HITS.inc(len(api_hits), domain=dom)
+
+                        if snapshots is not None and save_screenshot:
                             try:
-                                await page.screenshot(
-                                    path=str(snapshots_dir / f"{base_name}.png"),
-                                    full_page=True,
-                                )
+                                with STAGE_SECONDS.time(stage="screenshot", domain=dom):
+                                    fetched.screenshot = await page.screenshot(full_page=True)
                             except Exception as ss_err:
                                 logger.debug(f"screenshot failed: {ss_err}")
-
-                        for link in parsed.get("links", []):
-                            normalized = normalize_url(link, url)
-                            if normalized and should_follow(normalized, cfg, url, robots):
-                                await queue.put((normalized, (depth or 0) + 1))
-
-                        api_hits.clear()
-                        await asyncio.sleep(cfg.get("rate_limit", {}).get("delay_seconds", 0.5))
+                        await slot.after_page()
                     except Exception as e:
+                        slot.report_error(e)
                         logger.error(f"[{name}] crawl error for {url}: {e}")
                     finally:
-                        release_domain_slot(dom, domain_sem)
-                        queue.task_done()
-            finally:
-                await ctx.close()
+                        IN_FLIGHT.dec()
+                        WORKER_PAGES.inc(worker=name, outcome="ok" if fetched is not None else "error")
+                        if holding_slot:
+                            release_domain_slot(dom)
+                        if fetched is None:
+                            PAGES.inc(domain=dom, outcome="error")
+                            queue.task_done()
 
-        workers = [asyncio.create_task(worker(f"w{i}")) for i in range(concurrency)]
-        await queue.join()
-        for _ in range(concurrency):
-            await queue.put((None, None))
-        await asyncio.gather(*workers, return_exceptions=True)
+                    if fetched is not None:
+                        # blocks while parse is saturated; parse_page finishes the frontier item
+                        await parse_stage.put(fetched)
+                        await asyncio.sleep(cfg.get("rate_limit", {}).get("delay_seconds", 0.5))
+            finally:
+                await slot.close()
+
+        parse_stage.start()
+        clean_stage.start()
+        store_stage.start()
+        memory_guard.start()
+
+        async def inject_seed(url: str, depth: int) -> Optional[bool]:
+            # routed through the shard inbox, which keeps the group's idle bookkeeping right
+            if shard is not None:
+                shard.forward(url, depth)
+                return None
+            queued = queue.offer((url, depth))
+            FRONTIER_SIZE.set(queue.qsize())
+            return queued
+
+        control.start_workers(worker, inject_seed, concurrency)
+        control_cfg = cfg.get("control", {}) or {}
+        control_port = int(control_cfg.get("port", 0) or 0)
+        control_server = None
+        if control_port:
+            # each shard process gets its own endpoint on the next port
+            control_server = await start_control_server(
+                control, control_port + (shard.index if shard is not None else 0), control_cfg.get("host", "127.0.0.1")
+            )
+        try:
+            if shard is None:
+                await queue.join()
+            else:
+                await shard.run_until_stopped(queue)
+        finally:
+            if control_server is not None:
+                control_server.close()
+                await control_server.wait_closed()
+        await control.stop_workers()
+        await memory_guard.stop()
+        await parse_stage.close()
+        await clean_stage.close()
+        await store_stage.close()
+        cleaner.close()
 
 
 def normalize_url(href: str, base: str) -> Optional[str]:
@@ -334,16 +519,16 @@ def normalize_url(href: str, base: str) -> Optional[str]:
 
 
 def should_follow(url: str, cfg: Dict[str, Any], base_url: str, robots: Optional[RobotsCache] = None) -> bool:
-    if not cfg.get("crawl", {}).get("follow_external", False):
-        base_dom = urlparse(base_url).netloc
-        if urlparse(url).netloc != base_dom:
+    """
+    Single-link check kept for callers outside the crawl loop; it compiles the
+    filter on every call, so use UrlFilter.filter_links for whole pages.
+    """
+    url_filter = UrlFilter.from_config(cfg)
+    try:
+        parts = urlsplit(url)
+        if url_filter.check_link(url, parts, urlsplit(base_url).netloc) is not None:
             return False
-    allow_domains = set(cfg.get("crawl", {}).get("allow_domains", []) or [])
-    deny_domains = set(cfg.get("crawl", {}).get("deny_domains", []) or [])
-    dom = urlparse(url).netloc
-    if allow_domains and dom not in allow_domains:
-        return False
-    if dom in deny_domains:
+    except ValueError:
         return False
     if robots is not None:
         try:
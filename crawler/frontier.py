@@ -0,0 +1,226 @@
+import asyncio
+import heapq
+import math
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Pattern, Set, Tuple
+from urllib.parse import urlsplit
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+FRONTIER_DROPPED = REGISTRY.counter("crawler_frontier_dropped_total", "URLs not admitted to the frontier", ("reason",))
+BUDGET_REJECTED = REGISTRY.counter(
+    "crawler_budget_rejected_total", "Dequeued URLs skipped by a crawl budget", ("budget",)
+)
+
+FrontierItem = Tuple[Optional[str], Optional[int]]
+
+
+class PriorityFrontier(asyncio.Queue):
+    """
+    Best-first crawl frontier with crawl budgets.
+
+    A drop-in for the (url, depth) asyncio.Queue used by run_crawl: get/put,
+    task_done/join and the (None, None) stop sentinel behave the same, but
+    items come out lowest score first:
+
+        score = depth_weight * depth
+              + fairness_weight * (pages served + queued for the domain)
+              - sum(weights of matching URL patterns)
+              - inlink_weight * log2(1 + times the URL was discovered)
+              - lastmod_weight * freshness (sitemap lastmod, 1.0 = today)
+
+    URLs are de-duplicated on put; rediscovering a queued URL raises its
+    inlink count and re-scores it. Budgets (global pages, pages per domain,
+    wall-clock seconds) are charged when a worker takes a URL, so they are
+    spent on the best URLs found so far rather than the first ones queued.
+    Form seeds are charged with page=False: only the time budget applies.
+    """
+
+    def __init__(
+        self,
+        strategy: str = "best_first",
+        max_depth: Optional[int] = None,
+        depth_weight: float = 1.0,
+        fairness_weight: float = 0.05,
+        inlink_weight: float = 0.5,
+        lastmod_weight: float = 1.0,
+        lastmod_horizon_days: float = 30.0,
+        patterns: Optional[Dict[str, float]] = None,
+        max_pages: int = 0,
+        max_pages_per_domain: int = 0,
+        time_budget: float = 0.0,
+    ):
+        super().__init__()
+        self.best_first = strategy != "fifo"
+        self.max_depth = max_depth
+        self.depth_weight = depth_weight
+        self.fairness_weight = fairness_weight
+        self.inlink_weight = inlink_weight
+        self.lastmod_weight = lastmod_weight
+        self.lastmod_horizon = lastmod_horizon_days * 86400
+        self.patterns: List[Tuple[Pattern[str], float]] = [
+            (re.compile(p), float(w)) for p, w in (patterns or {}).items()
+        ]
+        self.max_pages = max_pages
+        self.max_pages_per_domain = max_pages_per_domain
+        self.deadline = time.monotonic() + time_budget if time_budget > 0 else None
+        self.pages = 0
+        self._exhausted_logged: Set[str] = set()
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "PriorityFrontier":
+        fcfg = cfg.get("frontier", {}) or {}
+        return cls(
+            strategy=str(fcfg.get("strategy", "best_first")),
+            max_depth=cfg.get("max_depth", 2),
+            depth_weight=float(fcfg.get("depth_weight", 1.0)),
+            fairness_weight=float(fcfg.get("fairness_weight", 0.05)),
+            inlink_weight=float(fcfg.get("inlink_weight", 0.5)),
+            lastmod_weight=float(fcfg.get("lastmod_weight", 1.0)),
+            lastmod_horizon_days=float(fcfg.get("lastmod_horizon_days", 30)),
+            patterns=fcfg.get("patterns") or {},
+            max_pages=int(fcfg.get("max_pages", 0) or 0),
+            max_pages_per_domain=int(fcfg.get("max_pages_per_domain", 0) or 0),
+            time_budget=float(fcfg.get("time_budget_seconds", 0) or 0),
+        )
+
+    # asyncio.Queue storage hooks (same extension point PriorityQueue uses)
+    def _init(self, maxsize: int) -> None:
+        self._heap: List[List[Any]] = []
+        self._entries: Dict[str, List[Any]] = {}
+        self._stops: Deque[FrontierItem] = deque()
+        self._seen: Set[str] = set()
+        self._inlinks: Dict[str, int] = {}
+        self._lastmod: Dict[str, float] = {}
+        # live queued entries per domain; pages served are in _served
+        self._domain_load: Dict[str, int] = {}
+        self._served: Dict[str, int] = {}
+        self._seq = 0
+
+    def qsize(self) -> int:
+        # the heap also holds stale (re-scored) entries, so count live ones
+        return len(self._entries) + len(self._stops)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def _put(self, item: FrontierItem) -> None:
+        url, depth = item
+        if url is None:
+            self._stops.append(item)
+            return
+        dom = urlsplit(url).netloc
+        self._domain_load[dom] = self._domain_load.get(dom, 0) + 1
+        self._push(url, depth or 0, dom)
+
+    def _get(self) -> FrontierItem:
+        # stop sentinels go first so a worker can be retired while URLs are queued
+        if self._stops:
+            return self._stops.popleft()
+        while True:
+            _, _, url, depth, dom = heapq.heappop(self._heap)
+            if url is not None:
+                del self._entries[url]
+                self._domain_load[dom] -= 1
+                return url, depth
+
+    def _push(self, url: str, depth: int, dom: str) -> None:
+        self._seq += 1
+        score = self.score(url, depth, dom) if self.best_first else 0.0
+        entry = [score, self._seq, url, depth, dom]
+        self._entries[url] = entry
+        heapq.heappush(self._heap, entry)
+
+    def put_nowait(self, item: FrontierItem) -> None:
+        self.offer(item)
+
+    def offer(self, item: FrontierItem) -> bool:
+        """put_nowait() that returns False when the item was dropped (too deep, duplicate or over budget)."""
+        url, depth = item
+        if url is None:
+            super().put_nowait(item)
+            return True
+        if self.max_depth is not None and depth is not None and depth > self.max_depth:
+            FRONTIER_DROPPED.inc(reason="depth")
+            return False
+        self._inlinks[url] = self._inlinks.get(url, 0) + 1
+        if url in self._seen:
+            entry = self._entries.get(url)
+            if entry is not None and self.best_first:
+                # re-score with the extra inlink (and the shallower depth, if any); the old entry goes stale
+                entry[2] = None
+                self._push(url, min(entry[3], depth or 0), entry[4])
+            FRONTIER_DROPPED.inc(reason="duplicate")
+            return False
+        if self._budget_exhausted(urlsplit(url).netloc) is not None:
+            FRONTIER_DROPPED.inc(reason="budget")
+            return False
+        self._seen.add(url)
+        super().put_nowait(item)
+        return True
+
+    def requeue(self, item: FrontierItem) -> None:
+        """Put a dequeued (url, depth) back without the duplicate check, e.g. one parked for a paused domain."""
+        super().put_nowait(item)
+
+    def score(self, url: str, depth: int, dom: str) -> float:
+        load = self._served.get(dom, 0) + self._domain_load.get(dom, 0)
+        s = self.depth_weight * depth + self.fairness_weight * load
+        for pattern, weight in self.patterns:
+            if pattern.search(url):
+                s -= weight
+        s -= self.inlink_weight * math.log2(1 + self._inlinks.get(url, 1))
+        lastmod = self._lastmod.get(url)
+        if lastmod is not None and self.lastmod_horizon > 0:
+            age = max(0.0, time.time() - lastmod)
+            s -= self.lastmod_weight * max(0.0, 1.0 - age / self.lastmod_horizon)
+        return s
+
+    def hint_lastmod(self, url: str, lastmod: float) -> None:
+        """Record a sitemap lastmod (unix time) for a URL before it is queued."""
+        self._lastmod[url] = lastmod
+
+    def _budget_exhausted(self, dom: str, page: bool = True) -> Optional[str]:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "time"
+        if not page:
+            return None
+        if self.max_pages and self.pages >= self.max_pages:
+            return "pages"
+        if self.max_pages_per_domain and self._served.get(dom, 0) >= self.max_pages_per_domain:
+            return "domain"
+        return None
+
+    def charge(self, url: str, page: bool = True) -> bool:
+        """
+        Called by a worker before visiting a dequeued URL. Returns False when
+        a budget is used up; the caller should task_done() and skip it. With
+        page=False (form seeds) only the time budget is checked and nothing
+        is counted against the page budgets.
+        """
+        dom = urlsplit(url).netloc
+        budget = self._budget_exhausted(dom, page)
+        if budget is not None:
+            BUDGET_REJECTED.inc(budget=budget)
+            key = dom if budget == "domain" else budget
+            if key not in self._exhausted_logged:
+                self._exhausted_logged.add(key)
+                logger.info(f"[frontier] {budget} budget exhausted" + (f" for {dom}" if budget == "domain" else ""))
+            return False
+        if page:
+            self.pages += 1
+            self._served[dom] = self._served.get(dom, 0) + 1
+        return True
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        best = heapq.nsmallest(top, (e for e in self._heap if e[2] is not None))
+        return {
+            "queued": len(self._entries),
+            "pages": self.pages,
+            "served_by_domain": dict(self._served),
+            "next": [{"url": e[2], "depth": e[3], "score": round(e[0], 3)} for e in best],
+        }
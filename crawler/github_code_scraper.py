@@ -1,12 +1,15 @@
 import os
 import asyncio
+import codecs
 import httpx
 import time
 import base64
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
+from storage.code_shards import CodeShardWriter
 from utils.logger import get_logger
+from utils.metrics import REGISTRY
 
 DEFAULT_EXTENSIONS = [
     ".py",
@@ -38,6 +41,61 @@ DEFAULT_EXTENSIONS = [
 
 logger = get_logger(__name__)
 
+REQUESTS = REGISTRY.counter("github_requests_total", "GitHub HTTP requests", ("endpoint", "status"))
+REQUEST_SECONDS = REGISTRY.histogram("github_request_seconds", "GitHub HTTP request latency", ("endpoint",))
+RATE_LIMIT_SLEEPS = REGISTRY.counter("github_rate_limit_sleeps_total", "Rate-limit sleeps taken")
+RATE_LIMIT_SLEEP_SECONDS = REGISTRY.counter("github_rate_limit_sleep_seconds_total", "Seconds slept on rate limits")
+FILES = REGISTRY.counter("github_files_total", "Candidate files by outcome", ("outcome",))
+BYTES_DOWNLOADED = REGISTRY.counter("github_bytes_downloaded_total", "Bytes of source saved")
+BYTES_DISCARDED = REGISTRY.counter(
+    "github_bytes_discarded_total", "Bytes read from rejected (binary, non-UTF-8, oversized) files before aborting"
+)
+
+# git's own binary heuristic: a NUL byte in the first 8000 bytes
+SNIFF_BYTES = 8000
+
+
+class FileRejected(Exception):
+    """A file was skipped on its content; `reason` is the github_files_total outcome."""
+
+    def __init__(self, reason: str, bytes_read: int = 0):
+        super().__init__(reason)
+        self.reason = reason
+        self.bytes_read = bytes_read
+
+
+class TextBody:
+    """
+    Incremental UTF-8 body reader. Each chunk is checked before the next
+    one is read: a NUL byte in the first SNIFF_BYTES means binary, invalid
+    UTF-8 anywhere means a non-UTF-8 encoding, and passing max_bytes means
+    too large. The raw bytes are kept so the file can be written and sized
+    without re-encoding the decoded text.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._raw: List[bytes] = []
+        self._text: List[str] = []
+        self._decoder = codecs.getincrementaldecoder("utf-8")("strict")
+
+    def feed(self, chunk: bytes, final: bool = False) -> None:
+        if self.size < SNIFF_BYTES and b"\x00" in chunk[:SNIFF_BYTES - self.size]:
+            raise FileRejected("binary", self.size + len(chunk))
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise FileRejected("too_large", self.size)
+        try:
+            self._text.append(self._decoder.decode(chunk, final))
+        except UnicodeDecodeError:
+            raise FileRejected("encoding", self.size)
+        self._raw.append(chunk)
+
+    def finish(self) -> Tuple[bytes, str]:
+        self.feed(b"", final=True)
+        return b"".join(self._raw), "".join(self._text)
+
 
 class GitHubCodeScraper:
     def __init__(
@@ -47,14 +105,25 @@ class GitHubCodeScraper:
         extensions: Optional[List[str]] = None,
         max_file_size: int = 200_000,
         concurrency: int = 6,
+        base_api: str = "https://api.github.com",
+        raw_base: str = "https://raw.githubusercontent.com",
+        output_format: str = "files",
+        sidecars: bool = True,
+        jsonl_text: bool = True,
+        shard_max_mb: float = 256,
     ):
         """
         max_file_size: bytes (default 200 KB)
         extensions: list of extensions to keep; None -> DEFAULT_EXTENSIONS
         concurrency: number of simultaneous downloads
+        base_api / raw_base: API and raw-content roots (override for GitHub Enterprise or a local stand-in)
+        output_format: "files" (<owner>/<repo>/<path> tree) or "shards" (packed under output_dir/shards)
+        sidecars: write a .json metadata file next to each file in "files" mode
+        jsonl_text: include file text in repo_to_jsonl rows; in "shards" mode rows always carry shard/offset/length
         """
         self.token = token or os.getenv("GITHUB_TOKEN")
-        self.base_api = "https://api.github.com"
+        self.base_api = base_api.rstrip("/")
+        self.raw_base = raw_base.rstrip("/")
         self.headers: Dict[str, str] = {
             "Accept": "application/vnd.github+json",
             "User-Agent": "CoineyScraper/1.0",
@@ -66,31 +135,67 @@ class GitHubCodeScraper:
         self.extensions: Set[str] = set(extensions or DEFAULT_EXTENSIONS)
         self.max_file_size = max_file_size
         self.semaphore = asyncio.Semaphore(concurrency)
+        if output_format not in ("files", "shards"):
+            raise ValueError(f"unknown github output_format {output_format!r}")
+        self.sidecars = sidecars
+        self.jsonl_text = jsonl_text
+        self.shards: Optional[CodeShardWriter] = None
+        if output_format == "shards":
+            self.shards = CodeShardWriter(str(self.output_dir / "shards"), shard_max_mb=shard_max_mb)
+
+    async def close(self) -> None:
+        if self.shards is not None:
+            await self.shards.close()
+
+    @staticmethod
+    def _rate_limit_delay(r: httpx.Response) -> Optional[int]:
+        """Seconds to sleep when `r` is a rate-limit rejection, else None."""
+        if r.status_code == 403 and "X-RateLimit-Reset" in r.headers:
+            reset_time = int(r.headers["X-RateLimit-Reset"])
+            sleep_time = max(reset_time - int(time.time()) + 1, 1)
+            logger.warning(f"[GitHub] rate limited; sleeping {sleep_time}s")
+            RATE_LIMIT_SLEEPS.inc()
+            RATE_LIMIT_SLEEP_SECONDS.inc(sleep_time)
+            return sleep_time
+        return None
 
     async def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         async with httpx.AsyncClient(headers=self.headers, timeout=30.0) as client:
-            r = await client.get(url, params=params)
-            if r.status_code == 403 and "X-RateLimit-Reset" in r.headers:
-                reset_time = int(r.headers["X-RateLimit-Reset"])
-                sleep_time = reset_time - int(time.time()) + 1
-                logger.warning(f"[GitHub] rate limited; sleeping {sleep_time}s")
-                await asyncio.sleep(max(sleep_time, 1))
+            with REQUEST_SECONDS.time(endpoint="api"):
+                r = await client.get(url, params=params)
+            REQUESTS.inc(endpoint="api", status=r.status_code)
+            delay = self._rate_limit_delay(r)
+            if delay is not None:
+                await asyncio.sleep(delay)
                 return await self._get_json(url, params=params)
             r.raise_for_status()
             data: Dict[str, Any] = r.json()
             return data
 
-    async def _get_text(self, url: str) -> str:
+    async def _stream_text(self, url: str) -> Tuple[bytes, str]:
+        """
+        Stream a raw file through TextBody, so oversized, binary and
+        non-UTF-8 files are abandoned after the first offending chunk (or on
+        Content-Length alone) instead of after the whole body.
+        """
         async with httpx.AsyncClient(headers=self.headers, timeout=60.0) as client:
-            r = await client.get(url)
-            if r.status_code == 403 and "X-RateLimit-Reset" in r.headers:
-                reset_time = int(r.headers["X-RateLimit-Reset"])
-                sleep_time = reset_time - int(time.time()) + 1
-                logger.warning(f"[GitHub] rate limited; sleeping {sleep_time}s")
-                await asyncio.sleep(max(sleep_time, 1))
-                return await self._get_text(url)
-            r.raise_for_status()
-            return r.text
+            delay = None
+            with REQUEST_SECONDS.time(endpoint="raw"):
+                async with client.stream("GET", url) as r:
+                    REQUESTS.inc(endpoint="raw", status=r.status_code)
+                    delay = self._rate_limit_delay(r)
+                    if delay is None:
+                        r.raise_for_status()
+                        length = r.headers.get("Content-Length")
+                        if length and length.isdigit() and self.max_file_size and int(length) > self.max_file_size:
+                            raise FileRejected("too_large")
+                        body = TextBody(self.max_file_size)
+                        async for chunk in r.aiter_bytes():
+                            body.feed(chunk)
+                        return body.finish()
+            # sleep with the connection released
+            await asyncio.sleep(delay)
+            return await self._stream_text(url)
 
     async def search_repos(
         self,
@@ -131,29 +236,30 @@ class GitHubCodeScraper:
                 return True
         return False
 
-    async def _download_file_raw(self, owner: str, repo: str, branch: str, path: str) -> Optional[str]:
+    async def _download_file_raw(self, owner: str, repo: str, branch: str, path: str) -> Optional[Tuple[bytes, str]]:
         """
         Use raw.githubusercontent.com for direct raw file content retrieval.
+        Returns (utf-8 bytes, text), None on failure, and raises FileRejected
+        for oversized, binary or non-UTF-8 files (from either source).
         """
-        raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{path}"
+        raw_url = f"{self.raw_base}/{owner}/{repo}/{branch}/{path}"
         try:
-            text = await self._get_text(raw_url)
-            return text
+            return await self._stream_text(raw_url)
+        except FileRejected:
+            raise
         except Exception:
             try:
                 contents = await self._get_json(
                     f"{self.base_api}/repos/{owner}/{repo}/contents/{path}",
                     params={"ref": branch},
                 )
-                if contents and contents.get("encoding") == "base64":
-                    raw = base64.b64decode(contents["content"]).decode(
-                        "utf-8",
-                        errors="replace",
-                    )
-                    return raw
-                return None
             except Exception:
                 return None
+            if contents and contents.get("encoding") == "base64":
+                body = TextBody(self.max_file_size)
+                body.feed(base64.b64decode(contents["content"]), final=True)
+                return body.finish()
+            return None
 
     async def download_repo_code(
         self,
@@ -175,40 +281,56 @@ class GitHubCodeScraper:
 
         saved: List[Dict[str, Any]] = []
         dest_root = Path(dest_folder or self.output_dir) / owner / repo
-        dest_root.mkdir(parents=True, exist_ok=True)
+        if self.shards is None:
+            dest_root.mkdir(parents=True, exist_ok=True)
 
         async def worker(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
             async with self.semaphore:
                 path = entry["path"]
                 size = entry.get("size", 0)
                 if size and size > self.max_file_size:
+                    FILES.inc(outcome="too_large")
                     return None
-                text = await self._download_file_raw(owner, repo, branch, path)
-                if not text:
+                try:
+                    got = await self._download_file_raw(owner, repo, branch, path)
+                except FileRejected as e:
+                    FILES.inc(outcome=e.reason)
+                    BYTES_DISCARDED.inc(e.bytes_read)
                     return None
-                if any(ord(c) == 0 for c in text[:2000]):
+                if not got:
+                    FILES.inc(outcome="failed")
                     return None
-                file_path = dest_root / path
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                try:
-                    file_path.write_text(text, encoding="utf-8", errors="replace")
-                except Exception:
-                    file_path.write_bytes(text.encode("utf-8", errors="replace"))
+                if not got[1]:
+                    # a legitimately empty file, not a download error
+                    FILES.inc(outcome="empty")
+                    return None
+                data, text = got
                 meta: Dict[str, Any] = {
                     "repo": f"{owner}/{repo}",
                     "owner": owner,
                     "repo_name": repo,
                     "path": path,
-                    "size": len(text.encode("utf-8")),
+                    "size": len(data),
                     "branch": branch,
-                    "raw_url": f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{path}",
+                    "raw_url": f"{self.raw_base}/{owner}/{repo}/{branch}/{path}",
                     "repo_meta": {
                         "stars": repo_meta.get("stargazers_count"),
                         "license": repo_meta.get("license", {}),
                     },
                 }
-                meta_path = file_path.with_suffix(file_path.suffix + ".json")
-                meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+                if self.shards is not None:
+                    packed = await self.shards.put(data, meta, sha=entry.get("sha"))
+                    meta.update(sha=packed["sha"], shard=packed["shard"], offset=packed["offset"],
+                                length=packed["length"])
+                else:
+                    file_path = dest_root / path
+                    file_path.parent.mkdir(parents=True, exist_ok=True)
+                    file_path.write_bytes(data)
+                    if self.sidecars:
+                        meta_path = file_path.with_suffix(file_path.suffix + ".json")
+                        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+                FILES.inc(outcome="saved")
+                BYTES_DOWNLOADED.inc(meta["size"])
                 return {"meta": meta, "text": text}
 
         coros = [worker(entry) for entry in files]
@@ -243,7 +365,10 @@ class GitHubCodeScraper:
                         "branch": entry["meta"]["branch"],
                         "size": entry["meta"]["size"],
                         "raw_url": entry["meta"]["raw_url"],
-                        "text": entry["text"],
                     }
+                    if "shard" in entry["meta"]:
+                        out.update({k: entry["meta"][k] for k in ("sha", "shard", "offset", "length")})
+                    if self.jsonl_text:
+                        out["text"] = entry["text"]
                     f.write(json.dumps(out, ensure_ascii=False) + "\n")
         return saved
@@ -0,0 +1,399 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Sequence, Set, Union
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "http_cache_requests_total", "Routed browser requests by cache result", ("result", "resource_type")
+)
+CACHE_SAVED_BYTES = REGISTRY.counter("http_cache_saved_bytes_total", "Response bytes served from the disk cache")
+CACHE_SIZE = REGISTRY.gauge("http_cache_size_bytes", "Bytes currently stored in the disk cache")
+
+DEFAULT_RESOURCE_TYPES = ("script", "stylesheet", "font", "image")
+# URL extensions per resource type; only these URLs are routed through the cache (see HttpCache.route_pattern)
+_TYPE_EXTENSIONS = {
+    "script": ("js", "mjs"),
+    "stylesheet": ("css",),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico"),
+    "media": ("mp4", "webm", "mp3", "ogg", "wav"),
+}
+
+# stores between re-reading the total size from the index (see HttpCache._size)
+RESYNC_EVERY = 256
+
+# Not replayed from cache: the body is stored decoded, and cookies must never be shared between contexts.
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie", "connection", "age"}
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def vary_values(names: Iterable[str], request_headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Values of the request headers named by Vary, with whitespace and list spacing normalized."""
+    values: Dict[str, Optional[str]] = {}
+    for name in names:
+        value = request_headers.get(name)
+        values[name] = None if value is None else ",".join(" ".join(p.split()) for p in value.split(","))
+    return values
+
+
+def cache_key(url: str, vary: Dict[str, Optional[str]]) -> str:
+    """Index key of one stored variant: the URL, plus the normalized Vary header values if there are any."""
+    if not vary:
+        return url
+    return f"{url} {json.dumps(vary, sort_keys=True, separators=(',', ':'))}"
+
+
+def freshness_lifetime(
+    headers: Dict[str, str],
+    now: float,
+    default_ttl: float = 0.0,
+    heuristic_max: float = 86400.0,
+) -> Optional[float]:
+    """
+    Seconds a response may be served without revalidation, or None if it
+    must not be stored. Follows the private-cache rules of RFC 9111:
+    max-age, then Expires, then 10% of the Last-Modified age (capped).
+    no-cache responses get 0 (store, but always revalidate).
+    """
+    cc = _parse_cache_control(headers.get("cache-control", ""))
+    if "no-store" in cc or headers.get("vary", "").strip() == "*":
+        return None
+    if "no-cache" in cc:
+        return 0.0
+    try:
+        age = float(headers.get("age") or 0)
+    except ValueError:
+        age = 0.0
+    if cc.get("max-age") is not None:
+        try:
+            return max(0.0, float(cc["max-age"] or 0) - age)
+        except ValueError:
+            return 0.0
+    date = _http_date(headers.get("date")) or now
+    expires = _http_date(headers.get("expires"))
+    if "expires" in headers:
+        # an invalid Expires (e.g. "0") means already expired
+        return max(0.0, expires - date) if expires is not None else 0.0
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified is not None and last_modified < date:
+        return min((date - last_modified) * 0.1, heuristic_max)
+    return default_ttl
+
+
+class HttpCache:
+    """
+    Disk-backed HTTP cache for browser subresources, shared by every browser
+    context and by later runs (and by sharded crawl processes pointing at the
+    same directory).
+
+    Installed as a Playwright route handler (see BrowserDriver). Cacheable
+    GET responses for the configured resource types are stored decoded under
+    blobs/ab/<sha256(key)>.bin with metadata in a SQLite index. Fresh entries
+    are fulfilled from disk; stale ones with validators are revalidated with
+    If-None-Match / If-Modified-Since. Entries are keyed by URL plus the
+    normalized values of the request headers named in the response's Vary,
+    so every variant of a URL is kept. When the total size passes max_bytes
+    the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_object_bytes: int = 5 * 1024 * 1024,
+        resource_types: Sequence[str] = DEFAULT_RESOURCE_TYPES,
+        default_ttl: float = 0.0,
+        heuristic_max: float = 86400.0,
+    ):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.resource_types = set(resource_types)
+        self.default_ttl = default_ttl
+        self.heuristic_max = heuristic_max
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # running total of entry sizes, so stores don't scan the index; re-read from SQLite before
+        # evicting and every RESYNC_EVERY stores, since other shard processes write the same index
+        self._size = 0
+        self._stores = 0
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> Optional["HttpCache"]:
+        hc = cfg.get("http_cache", {}) or {}
+        if not hc.get("enabled", False):
+            return None
+        return cls(
+            hc.get("dir", "exports/http_cache"),
+            max_bytes=int(float(hc.get("max_mb", 512)) * 1024 * 1024),
+            max_object_bytes=int(float(hc.get("max_object_mb", 5)) * 1024 * 1024),
+            resource_types=hc.get("resource_types") or DEFAULT_RESOURCE_TYPES,
+            default_ttl=float(hc.get("default_ttl_seconds", 0)),
+            heuristic_max=float(hc.get("heuristic_max_seconds", 86400)),
+        )
+
+    # --- storage (runs in worker threads) ---
+
+    def _open(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.root / "index.db"), timeout=30, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # under the write lock, so shards opening the same directory migrate it once
+        db.execute("BEGIN IMMEDIATE")
+        if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries'").fetchone():
+            # index from before variants were keyed separately: start over
+            db.execute("DROP TABLE entries")
+            shutil.rmtree(self.blobs_dir, ignore_errors=True)
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS variants (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                blob TEXT,
+                status INTEGER,
+                headers TEXT,
+                vary TEXT,
+                size INTEGER,
+                stored_at REAL,
+                expires_at REAL,
+                last_access REAL
+            )
+            """
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS idx_variants_url ON variants(url)")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_variants_access ON variants(last_access)")
+        db.commit()
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self._db = db
+        self._size = self._total_size()
+        CACHE_SIZE.set(self._size)
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            raise RuntimeError("HttpCache not opened")
+        return self._db
+
+    def _total_size(self) -> int:
+        row = self._conn().execute("SELECT COALESCE(SUM(size), 0) FROM variants").fetchone()
+        return int(row[0])
+
+    def _lookup(self, url: str, request_headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn().execute(
+                "SELECT key, blob, status, headers, vary, expires_at FROM variants WHERE url = ?", (url,)
+            ).fetchall()
+        for key, blob, status, headers, vary, expires_at in rows:
+            stored = json.loads(vary)
+            if vary_values(stored, request_headers) != stored:
+                continue
+            try:
+                body = (self.root / blob).read_bytes()
+            except OSError:
+                return None  # evicted by another process
+            return {
+                "key": key, "status": status, "headers": json.loads(headers), "body": body, "expires_at": expires_at
+            }
+        return None
+
+    def _touch(self, key: str, expires_at: Optional[float] = None) -> None:
+        with self._lock:
+            db = self._conn()
+            if expires_at is None:
+                db.execute("UPDATE variants SET last_access = ? WHERE key = ?", (time.time(), key))
+            else:
+                db.execute(
+                    "UPDATE variants SET last_access = ?, expires_at = ? WHERE key = ?", (time.time(), expires_at, key)
+                )
+            db.commit()
+
+    def _store(
+        self,
+        key: str,
+        url: str,
+        status: int,
+        headers: Dict[str, str],
+        vary: Dict[str, Optional[str]],
+        body: bytes,
+        expires_at: float,
+    ) -> None:
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        rel = f"blobs/{name[:2]}/{name}.bin"
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            old = db.execute("SELECT size FROM variants WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO variants (key, url, blob, status, headers, vary, size, stored_at, expires_at, "
+                "last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, rel, status, json.dumps(headers), json.dumps(vary), len(body), now, expires_at, now),
+            )
+            db.commit()
+            self._size += len(body) - (old[0] if old else 0)
+            self._stores += 1
+            if self._size > self.max_bytes or self._stores % RESYNC_EVERY == 0:
+                self._size = self._total_size()
+            if self._size > self.max_bytes:
+                self._size = self._evict(self._size)
+            total = self._size
+        CACHE_SIZE.set(total)
+
+    def _evict(self, total: int) -> int:
+        """Drop least recently used entries until the cache is back under 90% of max_bytes."""
+        db = self._conn()
+        target = self.max_bytes * 0.9
+        victims: List[str] = []
+        for key, blob, size in db.execute("SELECT key, blob, size FROM variants ORDER BY last_access"):
+            if total <= target:
+                break
+            victims.append(key)
+            total -= size
+            try:
+                (self.root / blob).unlink()
+            except OSError:
+                pass
+        db.executemany("DELETE FROM variants WHERE key = ?", [(k,) for k in victims])
+        db.commit()
+        logger.debug(f"[http_cache] evicted {len(victims)} entries")
+        return total
+
+    async def _safe_touch(self, key: str, expires_at: Optional[float] = None) -> None:
+        try:
+            await asyncio.to_thread(self._touch, key, expires_at)
+        except Exception as e:
+            logger.debug(f"[http_cache] touch failed for {key}: {e}")
+
+    # --- public API ---
+
+    def route_pattern(self) -> Union[str, Pattern[str]]:
+        """
+        URL matcher for the context route. Only URLs with an extension of a
+        cached resource type go through Python; documents, XHR and the rest
+        stay on Chromium's own network stack. A configured type with no known
+        extensions falls back to routing everything.
+        """
+        extensions: Set[str] = set()
+        for rtype in self.resource_types:
+            if rtype not in _TYPE_EXTENSIONS:
+                return "**/*"
+            extensions.update(_TYPE_EXTENSIONS[rtype])
+        return re.compile(r"^https?://[^?#]+\.(?:%s)(?:[?#]|$)" % "|".join(sorted(extensions)), re.IGNORECASE)
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self._open)
+
+    async def close(self) -> None:
+        if self._db is not None:
+            db, self._db = self._db, None
+            await asyncio.to_thread(db.close)
+
+    async def lookup(self, url: str, request_headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._lookup, url, request_headers)
+
+    async def store(
+        self, url: str, status: int, headers: Dict[str, str], request_headers: Dict[str, str], body: bytes
+    ) -> bool:
+        """Store a response if its status, headers and size allow it. Returns True if stored."""
+        if status != 200 or "set-cookie" in headers or len(body) > self.max_object_bytes:
+            return False
+        ttl = freshness_lifetime(headers, time.time(), self.default_ttl, self.heuristic_max)
+        has_validator = "etag" in headers or "last-modified" in headers
+        if ttl is None or (ttl <= 0 and not has_validator):
+            return False
+        vary_names = [v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()]
+        # bodies are stored decoded, so the encoding the browser asked for does not matter
+        vary = vary_values([n for n in vary_names if n != "accept-encoding"], request_headers)
+        kept = {k: v for k, v in headers.items() if k not in _DROP_HEADERS}
+        await asyncio.to_thread(self._store, cache_key(url, vary), url, status, kept, vary, body, time.time() + ttl)
+        return True
+
+    async def handle(self, route) -> None:
+        """Playwright route handler: serve from cache, revalidate, or fetch and store."""
+        request = route.request
+        rtype = request.resource_type
+        if request.method != "GET" or rtype not in self.resource_types or not request.url.startswith("http"):
+            await route.continue_()
+            return
+        url = request.url
+        req_headers = request.headers
+        entry = None
+        try:
+            entry = await self.lookup(url, req_headers)
+        except Exception as e:
+            logger.debug(f"[http_cache] lookup failed for {url}: {e}")
+
+        if entry is not None and entry["expires_at"] > time.time():
+            CACHE_REQUESTS.inc(result="hit", resource_type=rtype)
+            CACHE_SAVED_BYTES.inc(len(entry["body"]))
+            await route.fulfill(status=entry["status"], headers=entry["headers"], body=entry["body"])
+            await self._safe_touch(entry["key"])
+            return
+
+        fetch_headers = dict(req_headers)
+        if entry is not None:
+            if "etag" in entry["headers"]:
+                fetch_headers["if-none-match"] = entry["headers"]["etag"]
+            if "last-modified" in entry["headers"]:
+                fetch_headers["if-modified-since"] = entry["headers"]["last-modified"]
+        try:
+            response = await route.fetch(headers=fetch_headers)
+        except Exception as e:
+            logger.debug(f"[http_cache] fetch failed for {url}: {e}")
+            await route.continue_()
+            return
+
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        if response.status == 304 and entry is not None:
+            ttl = freshness_lifetime({**entry["headers"], **headers}, time.time(), self.default_ttl, self.heuristic_max)
+            CACHE_REQUESTS.inc(result="revalidated", resource_type=rtype)
+            CACHE_SAVED_BYTES.inc(len(entry["body"]))
+            await route.fulfill(status=entry["status"], headers=entry["headers"], body=entry["body"])
+            await self._safe_touch(entry["key"], time.time() + (ttl or 0.0))
+            return
+
+        body = await response.body()
+        # the fetched body is already decoded; keep cookies for the page itself
+        passthrough = {
+            k: v for k, v in headers.items() if k not in ("content-encoding", "content-length", "transfer-encoding")
+        }
+        await route.fulfill(status=response.status, headers=passthrough, body=body)
+        try:
+            stored = await self.store(url, response.status, headers, req_headers, body)
+        except Exception as e:
+            logger.debug(f"[http_cache] store failed for {url}: {e}")
+            stored = False
+        CACHE_REQUESTS.inc(result="stored" if stored else "miss", resource_type=rtype)
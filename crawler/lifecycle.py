@@ -0,0 +1,193 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+RECYCLES = REGISTRY.counter("crawler_page_recycles_total", "Worker contexts replaced, by reason", ("reason",))
+BROWSER_RSS = REGISTRY.gauge("crawler_browser_rss_bytes", "Resident memory of the browser process tree")
+JS_HEAP = REGISTRY.histogram(
+    "crawler_js_heap_bytes",
+    "JS heap of worker pages when sampled",
+    buckets=(16e6, 32e6, 64e6, 128e6, 256e6, 512e6, 1024e6),
+)
+
+# Errors that mean the page/context/browser is gone rather than the site misbehaving.
+_DEAD_MARKERS = (
+    "target closed",
+    "target page, context or browser has been closed",
+    "page crashed",
+    "browser has been closed",
+    "connection closed",
+)
+
+_JS_HEAP = "() => (performance.memory ? performance.memory.usedJSHeapSize : null)"
+
+
+def is_dead_target_error(err: BaseException) -> bool:
+    msg = str(err).lower()
+    return any(marker in msg for marker in _DEAD_MARKERS)
+
+
+def process_tree_rss(root_pid: Optional[int] = None) -> Optional[int]:
+    """
+    Resident bytes of every descendant of root_pid (default: this process),
+    which covers the Playwright driver and all Chromium processes. Reads
+    /proc, so returns None where that isn't available.
+    """
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    root_pid = root_pid or os.getpid()
+    children: Dict[int, List[int]] = {}
+    rss_pages: Dict[int, int] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+            # the comm field may contain spaces; fields after the closing paren are fixed
+            fields = stat[stat.rindex(")") + 2:].split()
+            pid = int(entry.name)
+            children.setdefault(int(fields[1]), []).append(pid)
+            rss_pages[pid] = int(fields[21])
+        except (OSError, ValueError, IndexError):
+            continue
+    total = 0
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        total += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total * os.sysconf("SC_PAGE_SIZE")
+
+
+class PageSlot:
+    """
+    A worker's context and page, recycled after `max_navigations` pages, past
+    `max_js_heap_mb`, on a new memory-guard `generation`, or after a crash.
+    """
+
+    def __init__(
+        self,
+        drv: Any,
+        setup: Callable[[Any], Awaitable[None]],
+        max_navigations: int = 0,
+        max_js_heap_mb: float = 0,
+        heap_check_every: int = 10,
+        generation: Optional[Callable[[], int]] = None,
+    ):
+        self.drv = drv
+        self.setup = setup
+        self.max_navigations = max_navigations
+        self.max_js_heap = max_js_heap_mb * 1024 * 1024
+        self.heap_check_every = max(1, heap_check_every)
+        self.generation = generation
+        self.ctx: Any = None
+        self.page: Any = None
+        self.navigations = 0
+        self._generation = 0
+        self._broken: Optional[str] = None
+
+    def _mark(self, reason: str, page: Any = None) -> None:
+        # events from an already-replaced page must not condemn the new one
+        if page is not None and page is not self.page:
+            return
+        if self._broken is None:
+            self._broken = reason
+
+    async def acquire(self) -> Any:
+        """The page to use for the next URL, replaced first if it is due."""
+        reason = self._broken
+        if reason is None and self.page is not None and self.page.is_closed():
+            reason = "closed"
+        if reason is None and self.generation is not None and self.generation() != self._generation:
+            reason = "memory"
+        if self.page is None or reason is not None:
+            if self.page is not None:
+                await self.recycle(reason or "replace")
+            await self._open()
+        return self.page
+
+    async def _open(self) -> None:
+        if self.generation is not None:
+            self._generation = self.generation()
+        self.ctx = await self.drv.new_context()
+        page = self.page = await self.ctx.new_page()
+        page.on("crash", lambda *_: self._mark("crash", page))
+        page.on("close", lambda *_: self._mark("closed", page))
+        self.navigations = 0
+        self._broken = None
+        await self.setup(self.page)
+
+    async def after_page(self) -> None:
+        """Book-keeping after each URL; schedules a recycle when a limit is reached."""
+        self.navigations += 1
+        if self.max_navigations and self.navigations >= self.max_navigations:
+            self._mark("navigations")
+            return
+        if self.max_js_heap and self.navigations % self.heap_check_every == 0 and self.page is not None:
+            try:
+                heap = await self.page.evaluate(_JS_HEAP)
+            except Exception:
+                return
+            if heap:
+                JS_HEAP.observe(float(heap))
+                if heap > self.max_js_heap:
+                    self._mark("js_heap")
+
+    def report_error(self, err: BaseException) -> None:
+        """Let a navigation/scrape error mark the page dead so the next acquire replaces it."""
+        if is_dead_target_error(err):
+            self._mark("crash")
+
+    async def recycle(self, reason: str) -> None:
+        RECYCLES.inc(reason=reason)
+        logger.debug(f"recycling page/context after {self.navigations} navigations ({reason})")
+        await self.close()
+
+    async def close(self) -> None:
+        ctx, self.ctx, self.page = self.ctx, None, None
+        if ctx is not None:
+            try:
+                await ctx.close()
+            except Exception as e:
+                # a crashed browser takes its contexts with it
+                logger.debug(f"context close failed: {e}")
+
+
+class MemoryGuard:
+    """Bump `generation` (recycling every PageSlot) when the browser tree RSS passes `max_rss_mb`."""
+
+    def __init__(self, max_rss_mb: float = 0, interval: float = 30.0):
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.interval = interval
+        self.generation = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def check(self) -> Optional[int]:
+        rss = process_tree_rss()
+        if rss is None:
+            return None
+        BROWSER_RSS.set(rss)
+        if self.max_rss and rss > self.max_rss:
+            self.generation += 1
+            logger.info(f"[memory] browser RSS {rss / 1e6:.0f}MB over limit; recycling worker contexts")
+        return rss
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.check)
+
+    def start(self) -> None:
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
@@ -0,0 +1,156 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+READY_SECONDS = REGISTRY.histogram(
+    "crawler_readiness_seconds", "Time from DOMContentLoaded until a page was released", ("domain", "outcome")
+)
+
+# Injected before any page script runs: records DOM mutation timing and the
+# XHR/fetch requests currently in flight. Only nodes being added or removed
+# count as mutations: attribute and text churn (carousels, spinners, class
+# animations, clocks) never stops and would keep the page from going quiet.
+READINESS_INIT_SCRIPT = """
+(() => {
+  if (window.__coineyReady) return;
+  const st = { lastMutation: performance.now(), maxGap: 0, mutations: 0, inflight: new Map(), seq: 0 };
+  window.__coineyReady = st;
+  const onMutation = () => {
+    const now = performance.now();
+    if (document.readyState !== 'loading') st.maxGap = Math.max(st.maxGap, now - st.lastMutation);
+    st.lastMutation = now;
+    st.mutations++;
+  };
+  const observe = () => new MutationObserver(onMutation).observe(document.documentElement || document, {
+    subtree: true, childList: true,
+  });
+  if (document.documentElement) observe(); else document.addEventListener('readystatechange', observe, { once: true });
+  const track = () => { const id = ++st.seq; st.inflight.set(id, performance.now()); return id; };
+  const origSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function (...args) {
+    const id = track();
+    this.addEventListener('loadend', () => st.inflight.delete(id), { once: true });
+    return origSend.apply(this, args);
+  };
+  if (window.fetch) {
+    const origFetch = window.fetch;
+    window.fetch = function (...args) {
+      const id = track();
+      return origFetch.apply(this, args).finally(() => st.inflight.delete(id));
+    };
+  }
+})();
+"""
+
+# True once the document is parsed, no short-lived request is pending and the
+# DOM has been quiet for `quiet` ms. Requests older than `longMs` (polling,
+# long-poll, streaming) are ignored so they can't hold the page forever.
+_READY_PREDICATE = """
+([quiet, longMs]) => {
+  const st = window.__coineyReady;
+  if (!st) return document.readyState === 'complete';
+  if (document.readyState === 'loading') return false;
+  const now = performance.now();
+  for (const t of st.inflight.values()) if (now - t < longMs) return false;
+  return now - st.lastMutation >= quiet;
+}
+"""
+
+_STATE_SCRIPT = """
+() => {
+  const st = window.__coineyReady;
+  return st ? { lastMutation: st.lastMutation, maxGap: st.maxGap, mutations: st.mutations } : null;
+}
+"""
+
+
+class ReadinessTracker:
+    """
+    Per-domain page-readiness policy learned from history.
+
+    For each domain we keep EWMAs of the largest gap seen between DOM
+    mutation bursts and of the settle time (time of the last mutation). The
+    quiet window is a margin over the typical gap, so static sites converge to
+    min_quiet_ms while SPAs that render after a slow XHR get a window long
+    enough to see it; the hard cap tracks the settle time but never exceeds
+    max_wait.
+    """
+
+    def __init__(self, cfg: Dict[str, Any]):
+        self.strategy: str = str(cfg.get("strategy", "adaptive"))
+        self.quiet_ms: float = float(cfg.get("quiet_ms", 300))
+        self.min_quiet_ms: float = float(cfg.get("min_quiet_ms", 100))
+        self.max_quiet_ms: float = float(cfg.get("max_quiet_ms", 2000))
+        self.max_wait: float = float(cfg.get("max_wait", 10.0))
+        self.min_wait: float = float(cfg.get("min_wait", 2.0))
+        self.long_request_ms: float = float(cfg.get("long_request_ms", 3000))
+        self.alpha: float = float(cfg.get("learning_rate", 0.3))
+        self._history: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def adaptive(self) -> bool:
+        return self.strategy != "networkidle"
+
+    def params_for(self, domain: str) -> Tuple[float, float]:
+        """Returns (quiet window ms, hard cap seconds) for the next page on domain."""
+        hist = self._history.get(domain)
+        if hist is None:
+            return self.quiet_ms, self.max_wait
+        quiet = min(max(hist["gap_ms"] * 1.5, self.min_quiet_ms), self.max_quiet_ms)
+        cap = (hist["settle_ms"] * 2 + quiet) / 1000.0
+        return quiet, min(max(cap, self.min_wait), self.max_wait)
+
+    def record(self, domain: str, settle_ms: Optional[float], gap_ms: float) -> None:
+        """settle_ms is None for a page released by the hard cap: it never settled, so only its gap counts."""
+        hist = self._history.get(domain)
+        if hist is None:
+            if settle_ms is not None:
+                self._history[domain] = {"settle_ms": settle_ms, "gap_ms": gap_ms, "pages": 1}
+            return
+        a = self.alpha
+        if settle_ms is not None:
+            hist["settle_ms"] = a * settle_ms + (1 - a) * hist["settle_ms"]
+        # widen immediately on a longer gap, shrink slowly: a missed render is worse than a slow page
+        hist["gap_ms"] = gap_ms if gap_ms > hist["gap_ms"] else a * gap_ms + (1 - a) * hist["gap_ms"]
+        hist["pages"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {d: dict(h) for d, h in self._history.items()}
+
+
+async def wait_until_ready(page, tracker: ReadinessTracker, domain: str) -> Dict[str, Any]:
+    """
+    Wait after a domcontentloaded navigation until the DOM goes quiet with no
+    pending XHR/fetch, or the domain's hard cap expires. The page must have
+    READINESS_INIT_SCRIPT installed (see BrowserDriver/worker setup).
+    """
+    quiet_ms, cap = tracker.params_for(domain)
+    start = time.perf_counter()
+    outcome = "quiet"
+    try:
+        await page.wait_for_function(
+            _READY_PREDICATE,
+            arg=[quiet_ms, tracker.long_request_ms],
+            polling=50,
+            timeout=cap * 1000,
+        )
+    except Exception as e:
+        # timeout is the hard cap doing its job; anything else (navigation race) is logged
+        outcome = "cap"
+        if "Timeout" not in type(e).__name__ and "Timeout" not in str(e):
+            logger.debug(f"readiness wait error on {domain}: {e}")
+    elapsed = time.perf_counter() - start
+    READY_SECONDS.observe(elapsed, domain=domain, outcome=outcome)
+
+    try:
+        state = await page.evaluate(_STATE_SCRIPT)
+    except Exception:
+        state = None
+    if state:
+        # the quiet window itself is not settle time; a capped page's last mutation is just the cap
+        settle = None if outcome == "cap" else float(state["lastMutation"])
+        tracker.record(domain, settle, float(state["maxGap"]))
+    return {"outcome": outcome, "seconds": elapsed, "quiet_ms": quiet_ms, "cap": cap}
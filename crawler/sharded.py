@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import multiprocessing as mp
+import queue as queue_mod
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+# Layout of the shared per-shard counters array: [busy, sent, received, pages] * processes
+_FIELDS = 4
+_BUSY, _SENT, _RECEIVED, _PAGES = range(_FIELDS)
+# How often a shard ships its metrics snapshot to the parent
+METRICS_INTERVAL = 2.0
+
+
+def shard_for_url(url: str, processes: int) -> int:
+    """
+    Stable domain -> shard assignment. Python's hash() is salted per process,
+    so a digest is used to keep every process agreeing on ownership.
+    """
+    domain = urlparse(url).netloc.lower()
+    digest = hashlib.blake2b(domain.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % processes
+
+
+class ShardSink:
+    """
+    Stand-in for JSONLWriter/SQLiteStore inside a shard process: records are
+    shipped to the parent, which owns the single storage writer.
+    """
+
+    def __init__(self, link: "ShardLink"):
+        self.link = link
+
+    async def write(self, obj: Dict[str, Any]) -> None:
+        self.link.results.put(("jsonl", obj))
+
+    async def insert(self, obj: Dict[str, Any]) -> None:
+        self.link.results.put(("sqlite", obj))
+        self.link.bump(_PAGES)
+
+
+class ShardLink:
+    """
+    Per-process view of the shard group: ownership checks, routing of links
+    to their owning shard, and distributed idle/termination bookkeeping.
+
+    Termination uses shared counters updated under one lock: a shard marks
+    itself busy in the same critical section that counts a received link, so
+    "every shard idle and sent == received" observed under the lock means no
+    work is running and none is in flight.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        processes: int,
+        inboxes: List[Any],
+        results: Any,
+        counters: Any,
+        stop: Any,
+    ):
+        self.index = index
+        self.processes = processes
+        self.inboxes = inboxes
+        self.results = results
+        self.counters = counters
+        self.stop = stop
+        self.generation = 0
+        self._activity: Optional[asyncio.Event] = None
+
+    def owns(self, url: str) -> bool:
+        return shard_for_url(url, self.processes) == self.index
+
+    def bump(self, field: int, by: int = 1) -> None:
+        with self.counters.get_lock():
+            self.counters[self.index * _FIELDS + field] += by
+
+    def forward(self, url: str, depth: int) -> None:
+        # count before sending so the link is never invisible to the coordinator
+        self.bump(_SENT)
+        self.inboxes[shard_for_url(url, self.processes)].put((url, depth))
+
+    def ship_metrics(self) -> None:
+        self.results.put(("metrics", (self.index, REGISTRY.export())))
+
+    def _set_busy(self, busy: bool) -> None:
+        self.counters[self.index * _FIELDS + _BUSY] = 1 if busy else 0
+
+    async def _pump(self, queue: asyncio.Queue) -> None:
+        inbox = self.inboxes[self.index]
+        while True:
+            try:
+                item = await asyncio.to_thread(inbox.get, True, 0.2)
+            except queue_mod.Empty:
+                continue
+            with self.counters.get_lock():
+                self.counters[self.index * _FIELDS + _RECEIVED] += 1
+                self._set_busy(True)
+            self.generation += 1
+            queue.put_nowait(item)
+            if self._activity is not None:
+                self._activity.set()
+
+    async def _ship_metrics_periodically(self) -> None:
+        # its own task: queue.join() below can block for as long as the shard stays busy
+        while True:
+            self.ship_metrics()
+            await asyncio.sleep(METRICS_INTERVAL)
+
+    async def run_until_stopped(self, queue: asyncio.Queue) -> None:
+        """
+        Replaces queue.join() for a shard: keep accepting routed links until
+        the coordinator decides the whole group is done.
+        """
+        self._activity = asyncio.Event()
+        tasks = [asyncio.create_task(self._pump(queue)), asyncio.create_task(self._ship_metrics_periodically())]
+        try:
+            while not self.stop.is_set():
+                gen = self.generation
+                await queue.join()
+                if gen != self.generation:
+                    continue
+                with self.counters.get_lock():
+                    self._set_busy(False)
+                self._activity.clear()
+                try:
+                    await asyncio.wait_for(self._activity.wait(), timeout=0.2)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _shard_main(
+    index: int,
+    processes: int,
+    cfg: Dict[str, Any],
+    inboxes: List[Any],
+    results: Any,
+    counters: Any,
+    stop: Any,
+) -> None:
+    from crawler.frontend_scraper import run_crawl
+
+    link = ShardLink(index, processes, inboxes, results, counters, stop)
+    sink = ShardSink(link)
+    try:
+        asyncio.run(run_crawl(cfg, sink, sink, shard=link))
+    except Exception as e:
+        logger.error(f"[shard {index}] crashed: {e}")
+    finally:
+        with counters.get_lock():
+            counters[index * _FIELDS + _BUSY] = 0
+        link.ship_metrics()
+        results.put(("done", index))
+
+
+def _snapshot(counters: Any, processes: int) -> List[Tuple[int, ...]]:
+    with counters.get_lock():
+        return [tuple(counters[i * _FIELDS:(i + 1) * _FIELDS]) for i in range(processes)]
+
+
+def group_idle(counters: Any, processes: int) -> bool:
+    """True once every shard is idle and every routed link has been received."""
+    snap = _snapshot(counters, processes)
+    in_flight = sum(s[_SENT] for s in snap) - sum(s[_RECEIVED] for s in snap)
+    return all(s[_BUSY] == 0 for s in snap) and in_flight == 0
+
+
+async def run_sharded_crawl(
+    cfg: Dict[str, Any],
+    processes: int,
+    json_writer,
+    sqlite_store,
+    progress_interval: float = 10.0,
+) -> None:
+    """
+    Crawl with `processes` worker processes, each owning the domains that
+    hash to it and running its own BrowserDriver and workers. Links found for
+    another shard's domain are routed over multiprocessing queues; records
+    flow back here and are written through the single json_writer/sqlite_store.
+    """
+    if not cfg.get("start_urls"):
+        logger.warning("No start_urls configured; skipping crawl")
+        return
+
+    ctx = mp.get_context("spawn")
+    inboxes = [ctx.Queue() for _ in range(processes)]
+    results = ctx.Queue()
+    counters = ctx.Array("q", [1 if f == _BUSY else 0 for _ in range(processes) for f in range(_FIELDS)])
+    stop = ctx.Event()
+
+    procs = [
+        ctx.Process(
+            target=_shard_main,
+            args=(i, processes, cfg, inboxes, results, counters, stop),
+            name=f"crawl-shard-{i}",
+            # not daemonic: shards may run their own process pools (cleaner.workers)
+            daemon=False,
+        )
+        for i in range(processes)
+    ]
+    for p in procs:
+        p.start()
+    logger.info(f"Started {processes} crawl shards")
+    try:
+        written = await _coordinate(procs, processes, results, counters, stop, json_writer, sqlite_store,
+                                    progress_interval)
+    finally:
+        # non-daemonic children would otherwise keep the parent alive after an error
+        stop.set()
+        for p in procs:
+            await asyncio.to_thread(p.join, 30)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+    logger.info(f"Sharded crawl finished: {written} pages from {processes} processes")
+
+
+async def _coordinate(
+    procs: List[Any],
+    processes: int,
+    results: Any,
+    counters: Any,
+    stop: Any,
+    json_writer,
+    sqlite_store,
+    progress_interval: float,
+) -> int:
+    """Drain shard results into storage until every shard reported done; returns the page count."""
+    done: set = set()
+    written = 0
+    last_progress = time.monotonic()
+    while len(done) < processes:
+        try:
+            kind, payload = await asyncio.to_thread(results.get, True, 0.2)
+        except queue_mod.Empty:
+            kind, payload = None, None
+
+        if kind == "jsonl":
+            await json_writer.write(payload)
+        elif kind == "sqlite":
+            await sqlite_store.insert(payload)
+            written += 1
+        elif kind == "metrics":
+            shard_index, exported = payload
+            REGISTRY.merge_remote(str(shard_index), exported)
+        elif kind == "done":
+            done.add(payload)
+
+        dead = [i for i, p in enumerate(procs) if i not in done and not p.is_alive() and results.empty()]
+        if dead:
+            logger.error(f"crawl shards {dead} exited unexpectedly; stopping")
+            done.update(dead)
+            stop.set()
+        if not stop.is_set() and group_idle(counters, processes):
+            logger.info("All shards idle; stopping")
+            stop.set()
+
+        now = time.monotonic()
+        if now - last_progress >= progress_interval:
+            last_progress = now
+            snap = _snapshot(counters, processes)
+            per_shard = ", ".join(f"s{i}={s[_PAGES]}" for i, s in enumerate(snap))
+            routed = sum(s[_SENT] for s in snap)
+            busy = sum(s[_BUSY] for s in snap)
+            logger.info(f"[progress] pages={written} routed={routed} busy_shards={busy}/{processes} ({per_shard})")
+    return written
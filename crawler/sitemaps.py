@@ -0,0 +1,92 @@
+import gzip
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """W3C datetime ("2024-05-01", "2024-05-01T10:00:00+00:00", "...Z") to unix time."""
+    if not value:
+        return None
+    value = value.strip().replace("Z", "+00:00")
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def parse_sitemap(xml: bytes) -> Tuple[List[Tuple[str, Optional[float]]], List[str]]:
+    """Returns ([(loc, lastmod)], [child sitemap URLs]) for a urlset or sitemapindex document."""
+    root = ET.fromstring(xml)
+    urls: List[Tuple[str, Optional[float]]] = []
+    children: List[str] = []
+    for el in root:
+        loc = el.findtext(f"{_NS}loc") or el.findtext("loc")
+        if not loc:
+            continue
+        if el.tag in (f"{_NS}sitemap", "sitemap"):
+            children.append(loc.strip())
+        else:
+            urls.append((loc.strip(), parse_lastmod(el.findtext(f"{_NS}lastmod") or el.findtext("lastmod"))))
+    return urls, children
+
+
+async def fetch_sitemap_urls(
+    start_url: str,
+    sitemap_urls: Optional[List[str]] = None,
+    max_urls: int = 5000,
+    max_files: int = 20,
+    user_agent: Optional[str] = None,
+) -> List[Tuple[str, Optional[float]]]:
+    """
+    Collect (url, lastmod) from a site's sitemaps. Without explicit
+    `sitemap_urls` the Sitemap: lines of robots.txt are used, falling back to
+    /sitemap.xml. Sitemap indexes are followed up to `max_files` documents.
+    """
+    parts = urlsplit(start_url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    out: List[Tuple[str, Optional[float]]] = []
+    headers = {"User-Agent": user_agent} if user_agent else {}
+    async with httpx.AsyncClient(timeout=15.0, follow_redirects=True, headers=headers) as client:
+        pending = list(sitemap_urls or [])
+        if not pending:
+            try:
+                r = await client.get(f"{origin}/robots.txt")
+                if r.status_code < 400:
+                    pending = [
+                        line.split(":", 1)[1].strip()
+                        for line in r.text.splitlines()
+                        if line.lower().startswith("sitemap:")
+                    ]
+            except httpx.HTTPError as e:
+                logger.debug(f"robots.txt fetch failed for {origin}: {e}")
+            pending = pending or [f"{origin}/sitemap.xml"]
+        fetched = 0
+        while pending and fetched < max_files and len(out) < max_urls:
+            url = pending.pop(0)
+            fetched += 1
+            try:
+                r = await client.get(url)
+                if r.status_code >= 400:
+                    continue
+                body = r.content
+                if body[:2] == b"\x1f\x8b":  # sitemap.xml.gz served without Content-Encoding
+                    body = gzip.decompress(body)
+                urls, children = parse_sitemap(body)
+            except (httpx.HTTPError, ET.ParseError, OSError) as e:
+                logger.debug(f"sitemap {url} skipped: {e}")
+                continue
+            out.extend(urls[: max_urls - len(out)])
+            pending.extend(children)
+    logger.info(f"[sitemap] {len(out)} URLs from {fetched} sitemap file(s) for {origin}")
+    return out
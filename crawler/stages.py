@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+QUEUE_DEPTH = REGISTRY.gauge("crawler_pipeline_queue_depth", "Items waiting in front of a pipeline stage", ("stage",))
+BACKPRESSURE_SECONDS = REGISTRY.histogram(
+    "crawler_pipeline_backpressure_seconds", "Time producers waited for room in a stage queue", ("stage",)
+)
+STAGE_ITEMS = REGISTRY.counter("crawler_pipeline_items_total", "Items handled per stage", ("stage", "outcome"))
+
+_STOP = object()
+
+
+class Stage:
+    """Bounded queue drained by `workers` tasks; put() blocks while the queue is full."""
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[None]], workers: int, maxsize: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run(f"{self.name}{i}")) for i in range(self.workers)]
+
+    async def put(self, item: Any) -> None:
+        if self.queue.full():
+            start = time.perf_counter()
+            await self.queue.put(item)
+            BACKPRESSURE_SECONDS.observe(time.perf_counter() - start, stage=self.name)
+        else:
+            self.queue.put_nowait(item)
+        QUEUE_DEPTH.set(self.queue.qsize(), stage=self.name)
+
+    async def _run(self, worker_name: str) -> None:
+        while True:
+            item = await self.queue.get()
+            QUEUE_DEPTH.set(self.queue.qsize(), stage=self.name)
+            if item is _STOP:
+                self.queue.task_done()
+                return
+            try:
+                await self.handler(item)
+                STAGE_ITEMS.inc(stage=self.name, outcome="ok")
+            except Exception as e:
+                STAGE_ITEMS.inc(stage=self.name, outcome="error")
+                logger.error(f"[{worker_name}] {self.name} stage error: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """Drain the queue, then stop the workers."""
+        await asyncio.wait_for(self.queue.join(), timeout)
+        for _ in self._tasks:
+            await self.queue.put(_STOP)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class BatchStage(Stage):
+    """Stage whose handler takes batches of up to `batch_size` items, waiting at most `max_wait` for a batch."""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any]], Awaitable[None]],
+        workers: int,
+        maxsize: int,
+        batch_size: int = 32,
+        max_wait: float = 0.05,
+    ):
+        super().__init__(name, handler, workers, maxsize)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+
+    async def _collect(self) -> Tuple[List[Any], bool]:
+        """Next batch, and whether a stop sentinel was taken while collecting."""
+        item = await self.queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self, worker_name: str) -> None:
+        while True:
+            batch, stop = await self._collect()
+            QUEUE_DEPTH.set(self.queue.qsize(), stage=self.name)
+            if batch:
+                try:
+                    await self.handler(batch)
+                    STAGE_ITEMS.inc(len(batch), stage=self.name, outcome="ok")
+                except Exception as e:
+                    STAGE_ITEMS.inc(len(batch), stage=self.name, outcome="error")
+                    logger.error(f"[{worker_name}] {self.name} stage error on a batch of {len(batch)}: {e}")
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+            if stop:
+                self.queue.task_done()
+                return
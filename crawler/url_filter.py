@@ -0,0 +1,199 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+from urllib.parse import SplitResult, urldefrag, urljoin, urlsplit
+from crawler.robots import RobotsCache
+from utils.metrics import REGISTRY
+
+LINKS_SEEN = REGISTRY.counter("crawler_links_seen_total", "Links extracted from crawled pages")
+LINKS_REJECTED = REGISTRY.counter("crawler_links_rejected_total", "Links dropped by the URL filter", ("reason",))
+
+DEFAULT_DENY_EXTENSIONS = [
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico",
+    ".pdf", ".zip", ".gz", ".tar", ".rar", ".7z", ".mp3", ".mp4",
+]
+
+_WILDCARD = "*"
+_END = ""
+
+
+class DomainTrie:
+    """
+    Domain rules stored by reversed label ("www.example.com" -> com, example,
+    www). "example.com" matches that host only; "*.example.com" matches any
+    subdomain of it. Rules carrying a port ("localhost:8000") match the
+    netloc exactly.
+    """
+
+    def __init__(self, rules: Iterable[str] = ()):
+        self._root: Dict[str, Any] = {}
+        self._netlocs: Set[str] = set()
+        self.empty = True
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: str) -> None:
+        rule = rule.strip().lower()
+        if not rule:
+            return
+        self.empty = False
+        if ":" in rule:
+            self._netlocs.add(rule)
+            return
+        labels = rule.split(".")
+        wildcard = labels[0] == _WILDCARD
+        if wildcard:
+            labels = labels[1:]
+        node = self._root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+        node[_WILDCARD if wildcard else _END] = True
+
+    def matches(self, host: str, netloc: str = "") -> bool:
+        if netloc and netloc in self._netlocs:
+            return True
+        node = self._root
+        labels = host.split(".")
+        for i in range(len(labels) - 1, -1, -1):
+            child = node.get(labels[i])
+            if child is None:
+                return False
+            node = child
+            if i > 0 and _WILDCARD in node:
+                return True
+        return _END in node
+
+
+def _combine(patterns: Iterable[str]) -> Optional[Pattern[str]]:
+    patterns = [p for p in patterns if p]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
+class UrlFilter:
+    """
+    Link admission rules compiled once from config.
+
+    check_target() holds the rules every visited URL must pass (domains,
+    extensions); check_link() adds the rules for discovered links (same-site,
+    URL length, include/exclude path patterns). Both return the rejection
+    reason or None and work on a URL that has already been split, so each
+    link is parsed once.
+    """
+
+    def __init__(
+        self,
+        allow_domains: Iterable[str] = (),
+        deny_domains: Iterable[str] = (),
+        deny_extensions: Iterable[str] = DEFAULT_DENY_EXTENSIONS,
+        include_patterns: Iterable[str] = (),
+        exclude_patterns: Iterable[str] = (),
+        max_url_length: int = 0,
+        follow_external: bool = False,
+    ):
+        self.allow_rules: List[str] = []
+        self.deny_rules: List[str] = []
+        self.allow = self.deny = DomainTrie()
+        self.set_domains(allow_domains, deny_domains)
+        self.extensions: Tuple[str, ...] = tuple(e.lower() for e in deny_extensions if e)
+        self.include = _combine(include_patterns)
+        self.exclude = _combine(exclude_patterns)
+        self.max_url_length = max_url_length
+        self.follow_external = follow_external
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "UrlFilter":
+        crawl = cfg.get("crawl", {}) or {}
+        return cls(
+            allow_domains=crawl.get("allow_domains", []) or [],
+            deny_domains=crawl.get("deny_domains", []) or [],
+            deny_extensions=crawl.get("deny_extensions", DEFAULT_DENY_EXTENSIONS) or [],
+            include_patterns=crawl.get("include_patterns", []) or [],
+            exclude_patterns=crawl.get("exclude_patterns", []) or [],
+            max_url_length=int(crawl.get("max_url_length", 0) or 0),
+            follow_external=bool(crawl.get("follow_external", False)),
+        )
+
+    def set_domains(self, allow: Optional[Iterable[str]] = None, deny: Optional[Iterable[str]] = None) -> None:
+        """Replace the allow and/or deny domain rules; also used to change them during a crawl."""
+        if allow is not None:
+            self.allow_rules = [r for r in allow if r]
+            self.allow = DomainTrie(self.allow_rules)
+        if deny is not None:
+            self.deny_rules = [r for r in deny if r]
+            self.deny = DomainTrie(self.deny_rules)
+
+    def check_target(self, parts: SplitResult) -> Optional[str]:
+        netloc = parts.netloc.lower()
+        host = parts.hostname or ""
+        if not self.allow.empty and not self.allow.matches(host, netloc):
+            return "not_allowed"
+        if not self.deny.empty and self.deny.matches(host, netloc):
+            return "denied_domain"
+        if self.extensions and parts.path.lower().endswith(self.extensions):
+            return "extension"
+        return None
+
+    def check_link(self, url: str, parts: SplitResult, base_netloc: str) -> Optional[str]:
+        if self.max_url_length and len(url) > self.max_url_length:
+            return "too_long"
+        if not self.follow_external and parts.netloc != base_netloc:
+            return "external"
+        reason = self.check_target(parts)
+        if reason is not None:
+            return reason
+        if self.include is not None or self.exclude is not None:
+            target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+            if self.include is not None and not self.include.search(target):
+                return "not_included"
+            if self.exclude is not None and self.exclude.search(target):
+                return "excluded"
+        return None
+
+    def admit(self, url: str) -> bool:
+        """True if `url` may be visited (seeds, forwarded and queued URLs)."""
+        try:
+            return self.check_target(urlsplit(url)) is None
+        except ValueError:
+            return False
+
+    def filter_links(self, links: Iterable[str], base_url: str, robots: Optional[RobotsCache] = None) -> List[str]:
+        """
+        Resolve, defragment and filter one page's links in a single pass.
+        Returns the admitted absolute URLs, de-duplicated, in page order.
+        """
+        base_netloc = urlsplit(base_url).netloc
+        seen: Set[str] = set()
+        out: List[str] = []
+        rejected: Dict[str, int] = {}
+        total = 0
+        for href in links:
+            total += 1
+            href = href.strip()
+            if href.startswith("javascript:") or href.startswith("mailto:"):
+                reason: Optional[str] = "scheme"
+            else:
+                try:
+                    url = urljoin(base_url, href)
+                    if "#" in url:
+                        url = urldefrag(url)[0]
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                    reason = self.check_link(url, urlsplit(url), base_netloc)
+                except ValueError:
+                    reason = "invalid"
+                if reason is None and robots is not None:
+                    try:
+                        if not robots.is_allowed(url):
+                            reason = "robots"
+                    except Exception:
+                        reason = "robots"
+            if reason is None:
+                out.append(url)
+            else:
+                rejected[reason] = rejected.get(reason, 0) + 1
+        LINKS_SEEN.inc(total)
+        for reason, n in rejected.items():
+            LINKS_REJECTED.inc(n, reason=reason)
+        return out
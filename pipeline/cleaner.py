@@ -1,17 +1,234 @@
+import asyncio
+import json
+import multiprocessing as mp
 import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence, Tuple, Union
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+CLEANED = REGISTRY.counter("pipeline_cleaner_records_total", "Records through the cleaner chain", ("outcome",))
+BATCH_SECONDS = REGISTRY.histogram("pipeline_cleaner_batch_seconds", "Time to clean one batch of records")
+
+# C0 controls that are not whitespace; \x0b, \x0c and \x1c-\x1f are already
+# folded into spaces by the whitespace pass, so leaving them out keeps the
+# single pass equal to the original two re.sub calls.
+_CONTROLS = re.compile(r"[\x00-\x08\x0E-\x1B]+")
+
+Record = Dict[str, Any]
+Normalizer = Callable[[Record], Optional[Record]]
+NormalizerSpec = Union[str, Dict[str, Dict[str, Any]]]
+
+DEFAULT_CHAIN: List[NormalizerSpec] = ["whitespace"]
 
 
 def clean_text(text):
     if not text:
         return ""
-    # remove excessive whitespace
-    t = re.sub(r'\s+', ' ', text)
+    # str.split() breaks on exactly the characters \s matches, so this is re.sub(r'\s+', ' ', text).strip()
+    t = " ".join(text.split())
     # remove long gibberish control chars
-    t = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F]+', ' ', t)
-    return t.strip()
+    if _CONTROLS.search(t):
+        t = _CONTROLS.sub(" ", t).strip()
+    return t
 
 
 def normalize_parsed(parsed):
     parsed["text"] = clean_text(parsed.get("text", ""))
     parsed["title"] = (parsed.get("title") or "").strip()
     return parsed
+
+
+def _whitespace() -> Normalizer:
+    return normalize_parsed
+
+
+def _unicode(form: Literal["NFC", "NFD", "NFKC", "NFKD"] = "NFC") -> Normalizer:
+    def run(record: Record) -> Record:
+        for key in ("title", "text"):
+            value = record.get(key)
+            if value and not unicodedata.is_normalized(form, value):
+                record[key] = unicodedata.normalize(form, value)
+        return record
+
+    return run
+
+
+def _boilerplate(patterns: Sequence[str] = (), min_line_chars: int = 0) -> Normalizer:
+    """Drop whole text lines matching any pattern (or shorter than min_line_chars). Runs before whitespace."""
+    combined = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+
+    def run(record: Record) -> Record:
+        text = record.get("text") or ""
+        kept = []
+        for line in text.split("\n"):
+            stripped = line.strip()
+            if min_line_chars and len(stripped) < min_line_chars:
+                continue
+            if combined is not None and combined.fullmatch(stripped):
+                continue
+            kept.append(line)
+        record["text"] = "\n".join(kept)
+        return record
+
+    return run
+
+
+def _length(min_chars: int = 0, max_chars: int = 0) -> Normalizer:
+    def run(record: Record) -> Optional[Record]:
+        n = len(record.get("text") or "")
+        if n < min_chars or (max_chars and n > max_chars):
+            return None
+        return record
+
+    return run
+
+
+_LANG_META = ("language", "content-language", "og:locale", "dc.language")
+
+
+def _language(allow: Sequence[str] = (), keep_unknown: bool = True) -> Normalizer:
+    """Keep records whose declared language (meta tags) starts with an allowed code, e.g. ["en", "de"]."""
+    prefixes = tuple(a.lower() for a in allow)
+
+    def run(record: Record) -> Optional[Record]:
+        meta = record.get("meta") or {}
+        declared = next((str(meta[k]) for k in _LANG_META if meta.get(k)), "")
+        if not declared:
+            return record if keep_unknown else None
+        code = declared.lower().replace("_", "-")
+        return record if not prefixes or code.startswith(prefixes) else None
+
+    return run
+
+
+NORMALIZERS: Dict[str, Callable[..., Normalizer]] = {
+    "whitespace": _whitespace,
+    "unicode": _unicode,
+    "boilerplate": _boilerplate,
+    "length": _length,
+    "language": _language,
+}
+
+
+def register_normalizer(name: str, factory: Callable[..., Normalizer]) -> None:
+    """Make a normalizer available to cleaner.normalizers by name."""
+    NORMALIZERS[name] = factory
+
+
+class CleanerChain:
+    """
+    Ordered normalizers applied to each record. A normalizer returns the
+    (possibly modified) record or None to drop it, which ends the chain.
+    The default chain is exactly normalize_parsed.
+    """
+
+    def __init__(self, steps: List[Tuple[str, Normalizer]]):
+        self.steps = steps
+
+    @classmethod
+    def from_spec(cls, spec: Optional[Sequence[NormalizerSpec]] = None) -> "CleanerChain":
+        """spec: names or {name: {options}} mappings, e.g. ["unicode", {"length": {"min_chars": 200}}]."""
+        steps: List[Tuple[str, Normalizer]] = []
+        for item in spec if spec is not None else DEFAULT_CHAIN:
+            options: Optional[Dict[str, Any]] = {}
+            if isinstance(item, str):
+                name = item
+            else:
+                ((name, options),) = item.items()
+            if name not in NORMALIZERS:
+                raise ValueError(f"unknown normalizer {name!r}; known: {', '.join(sorted(NORMALIZERS))}")
+            steps.append((name, NORMALIZERS[name](**(options or {}))))
+        return cls(steps)
+
+    def __call__(self, record: Record) -> Optional[Record]:
+        out: Optional[Record] = record
+        for _, step in self.steps:
+            out = step(record)
+            if out is None:
+                return None
+            record = out
+        return record
+
+    def clean_batch(self, records: List[Record]) -> List[Optional[Record]]:
+        """Same length as `records`; dropped records are None."""
+        return [self(r) for r in records]
+
+
+_worker_chains: Dict[str, CleanerChain] = {}
+
+
+def clean_batch_in_worker(spec_json: str, records: List[Record]) -> List[Optional[Record]]:
+    """Process-pool entry point; the chain is built once per worker process."""
+    chain = _worker_chains.get(spec_json)
+    if chain is None:
+        chain = _worker_chains[spec_json] = CleanerChain.from_spec(json.loads(spec_json))
+    return chain.clean_batch(records)
+
+
+class BatchCleaner:
+    """
+    Runs a CleanerChain over batches of records off the event loop: in a
+    thread, or with `workers` > 0 across a process pool (spawn, like the
+    sharded crawl), where batches of `batch_size` records are cleaned in
+    parallel. Custom normalizers must be registered at import time of a
+    module the workers import to be usable with a pool. Daemonic processes
+    may not have children, so there the pool is skipped for the thread.
+    """
+
+    def __init__(self, spec: Optional[Sequence[NormalizerSpec]] = None, batch_size: int = 64, workers: int = 0):
+        self.spec = list(spec) if spec is not None else list(DEFAULT_CHAIN)
+        self.chain = CleanerChain.from_spec(self.spec)
+        self.batch_size = max(1, batch_size)
+        self.workers = workers
+        self._spec_json = json.dumps(self.spec, sort_keys=True)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "BatchCleaner":
+        ccfg = cfg.get("cleaner", {}) or {}
+        return cls(
+            spec=ccfg.get("normalizers"),
+            batch_size=int(ccfg.get("batch_size", 64)),
+            workers=int(ccfg.get("workers", 0) or 0),
+        )
+
+    def _clean(self, records: List[Record]) -> List[Optional[Record]]:
+        start = time.perf_counter()
+        out = self.chain.clean_batch(records)
+        BATCH_SECONDS.observe(time.perf_counter() - start)
+        return out
+
+    async def clean(self, records: List[Record]) -> List[Optional[Record]]:
+        """Clean `records` in batches; returns one entry per record, None where dropped."""
+        if not records:
+            return []
+        batches = [records[i:i + self.batch_size] for i in range(0, len(records), self.batch_size)]
+        if self.workers > 0 and mp.current_process().daemon:
+            logger.warning("cleaner.workers ignored inside a daemonic process; cleaning in a thread")
+            self.workers = 0
+        if self.workers > 0:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("spawn"))
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(loop.run_in_executor(self._pool, clean_batch_in_worker, self._spec_json, b) for b in batches)
+            )
+            BATCH_SECONDS.observe(time.perf_counter() - start)
+        else:
+            results = [await asyncio.to_thread(self._clean, b) for b in batches]
+        out = [r for batch in results for r in batch]
+        dropped = sum(1 for r in out if r is None)
+        CLEANED.inc(len(out) - dropped, outcome="kept")
+        CLEANED.inc(dropped, outcome="dropped")
+        return out
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
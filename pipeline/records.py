@@ -0,0 +1,42 @@
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+from parser.html_parser import parse_html
+from pipeline.cleaner import normalize_parsed
+from utils.metrics import Histogram
+
+SCHEMA_VERSION = "1.0"
+
+
+def build_record(
+    url: str,
+    html: str,
+    depth: int,
+    fetched_at: float,
+    api_hits: Optional[List[Any]] = None,
+    expansion: Optional[Dict[str, Any]] = None,
+    timer: Optional[Histogram] = None,
+    domain: str = "",
+    normalize: bool = True,
+) -> Dict[str, Any]:
+    """
+    Turn one captured page into a dataset record (parse -> scrape_meta ->
+    clean). Shared by the live crawl and offline reprocessing so both produce
+    the same records. `timer`, when given, gets parse_html/normalize stages.
+    With normalize=False cleaning is left to a cleaner chain (pipeline.cleaner).
+    """
+    with timer.time(stage="parse_html", domain=domain) if timer is not None else nullcontext():
+        parsed: Dict[str, Any] = parse_html(url, html)
+    parsed["scrape_meta"] = {
+        "url": url,
+        "depth": depth,
+        "timestamp": int(fetched_at),
+        "api_hits": api_hits or [],
+        "schema_version": SCHEMA_VERSION,
+    }
+    if expansion:
+        parsed["scrape_meta"]["expansion"] = expansion
+    if not normalize:
+        return parsed
+    with timer.time(stage="normalize", domain=domain) if timer is not None else nullcontext():
+        record: Dict[str, Any] = normalize_parsed(parsed)
+    return record
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from storage.json_saver import JSONLWriter
+from storage.snapshot_store import SnapshotStore
+from storage.sqlite_db import SQLiteStore
+from pipeline.cleaner import DEFAULT_CHAIN, clean_batch_in_worker
+from pipeline.records import build_record
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+REPROCESSED = REGISTRY.counter("reprocess_pages_total", "Snapshots re-run through parse/clean", ("outcome",))
+
+
+def latest_html_entries(store: SnapshotStore) -> List[Dict[str, Any]]:
+    """Newest HTML capture per URL, in first-seen order."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for entry in store.iter_index():
+        if entry.get("kind") != "html":
+            continue
+        url = entry["url"]
+        prev = latest.get(url)
+        if prev is None or float(entry.get("fetched_at", 0)) >= float(prev.get("fetched_at", 0)):
+            latest[url] = entry
+    return list(latest.values())
+
+
+def _batches(entries: List[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    for i in range(0, len(entries), size):
+        yield entries[i:i + size]
+
+
+def process_batch(
+    root: str, entries: List[Dict[str, Any]], normalizers: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Worker-process entry point: rebuild records for a batch of index entries
+    and run them through the cleaner chain (`normalizers` is its JSON spec;
+    None means the default chain). Returns (kept records, failures, filtered).
+    """
+    store = SnapshotStore(root)
+    records: List[Dict[str, Any]] = []
+    failures = 0
+    for entry in entries:
+        try:
+            html = store.read_blob(entry).decode("utf-8", errors="replace")
+            api_hits: List[Any] = []
+            if entry.get("api_blob"):
+                # snapshots from before api_encoding was recorded: put_api always compressed
+                encoding = entry.get("api_encoding", "gzip")
+                api_hits = json.loads(store.read_blob({"blob": entry["api_blob"], "encoding": encoding}))
+            records.append(build_record(
+                entry["url"],
+                html,
+                int(entry.get("depth", 0)),
+                float(entry.get("fetched_at", 0)),
+                api_hits,
+                entry.get("expansion"),
+                normalize=False,
+            ))
+        except Exception as e:
+            failures += 1
+            logger.warning(f"reprocess failed for {entry.get('url')}: {e}")
+    cleaned = clean_batch_in_worker(normalizers or json.dumps(DEFAULT_CHAIN), records)
+    kept = [r for r in cleaned if r is not None]
+    return kept, failures, len(records) - len(kept)
+
+
+async def run_reprocess(
+    snapshots_dir: str,
+    out_dir: str,
+    processes: Optional[int] = None,
+    batch_size: int = 200,
+    normalizers: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Rebuild the dataset from stored snapshots with the current parse/clean
+    code: no browser, no network. Batches are parsed in a process pool while
+    the parent writes fresh dataset.jsonl / dataset.db files under out_dir
+    in snapshot order. At most 2 batches per process are in flight, so a slow
+    disk throttles the pool instead of buffering the whole dataset.
+    """
+    out = Path(out_dir)
+    if out.exists() and any(out.iterdir()):
+        raise FileExistsError(f"reprocess output directory {out} is not empty")
+    out.mkdir(parents=True, exist_ok=True)
+
+    store = SnapshotStore(snapshots_dir)
+    entries = latest_html_entries(store)
+    spec = json.dumps(normalizers if normalizers is not None else DEFAULT_CHAIN, sort_keys=True)
+    processes = processes or os.cpu_count() or 1
+    logger.info(f"Reprocessing {len(entries)} snapshots from {snapshots_dir} with {processes} processes")
+
+    json_writer = JSONLWriter(str(out / "dataset.jsonl"))
+    sqlite_store = SQLiteStore(str(out / "dataset.db"))
+    await sqlite_store.initialize()
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    written = failed = filtered = 0
+    pending: Deque[asyncio.Future] = deque()
+    try:
+        # spawn, like the sharded crawl: never fork a process that has a live event loop and sqlite thread
+        with ProcessPoolExecutor(max_workers=processes, mp_context=mp.get_context("spawn")) as pool:
+            batches = _batches(entries, batch_size)
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < processes * 2:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                        break
+                    pending.append(loop.run_in_executor(pool, process_batch, snapshots_dir, batch, spec))
+                if not pending:
+                    break
+                records, failures, dropped = await pending.popleft()
+                await json_writer.write_many(records)
+                await sqlite_store.insert_many(records)
+                written += len(records)
+                failed += failures
+                filtered += dropped
+                REPROCESSED.inc(len(records), outcome="ok")
+                REPROCESSED.inc(failures, outcome="error")
+                REPROCESSED.inc(dropped, outcome="filtered")
+    finally:
+        for fut in pending:
+            fut.cancel()
+        await sqlite_store.close()
+    elapsed = time.perf_counter() - start
+    stats = {
+        "snapshots": len(entries),
+        "written": written,
+        "failed": failed,
+        "filtered": filtered,
+        "seconds": round(elapsed, 2),
+        "pages_per_s": round(written / elapsed, 1) if elapsed else None,
+        "out_dir": str(out),
+    }
+    logger.info(f"Reprocess finished: {stats}")
+    return stats
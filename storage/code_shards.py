@@ -0,0 +1,125 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import mmap
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+from storage.json_saver import iter_jsonl
+
+
+def git_blob_sha(data: bytes) -> str:
+    """The sha GitHub's tree API reports for a blob."""
+    return hashlib.sha1(b"blob %d\x00" % len(data) + data).hexdigest()
+
+
+class CodeShardWriter:
+    """
+    Packed output for the GitHub code dataset.
+
+    Each file is gzip-compressed on its own and appended to the current
+    shard (shards/shard-00000.gz, ...), which rolls over past
+    `shard_max_mb`. Every member is a complete gzip stream, so a record is
+    read back from (shard, offset, length) alone and `gzip -dc` on a shard
+    yields all of its files back to back. index.jsonl holds one compact
+    line per file with repo, path, sha, shard, offset, length and metadata.
+    Identical blobs (same git sha) are stored once and indexed per path.
+    """
+
+    def __init__(self, root: str, shard_max_mb: float = 256, compression_level: int = 6):
+        self.root = Path(root)
+        self.index_path = self.root / "index.jsonl"
+        self.shard_max_bytes = int(shard_max_mb * 1024 * 1024)
+        self.compression_level = compression_level
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = asyncio.Lock()
+        self._known: Dict[str, Tuple[str, int, int]] = {}
+        for entry in iter_jsonl(self.index_path):
+            self._known[entry["sha"]] = (entry["shard"], entry["offset"], entry["length"])
+        shards = sorted(self.root.glob("shard-*.gz"))
+        self._shard_no = int(shards[-1].stem.split("-")[1]) if shards else 0
+        self._shard: Optional[BinaryIO] = None
+        self._index: Optional[Any] = None
+
+    def _shard_name(self) -> str:
+        return f"shard-{self._shard_no:05d}.gz"
+
+    def _append(self, payload: bytes, entry: Dict[str, Any]) -> None:
+        if self._shard is None:
+            self._shard = open(self.root / self._shard_name(), "ab")
+            self._index = open(self.index_path, "a", encoding="utf-8")
+        if payload and self._shard.tell() and self._shard.tell() + len(payload) > self.shard_max_bytes:
+            self._shard.close()
+            self._shard_no += 1
+            self._shard = open(self.root / self._shard_name(), "ab")
+        if payload:
+            entry["shard"] = self._shard_name()
+            entry["offset"] = self._shard.tell()
+            entry["length"] = len(payload)
+            self._shard.write(payload)
+            # the member is on disk before its index line, so the index never points past the data
+            self._shard.flush()
+        assert self._index is not None
+        self._index.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._index.flush()
+
+    async def put(self, data: bytes, meta: Dict[str, Any], sha: Optional[str] = None) -> Dict[str, Any]:
+        """Append one file; returns its index entry (meta plus sha/shard/offset/length)."""
+        entry: Dict[str, Any] = dict(meta)
+        entry["sha"] = sha or git_blob_sha(data)
+        entry["size"] = len(data)
+        payload = b""
+        if entry["sha"] not in self._known:
+            payload = await asyncio.to_thread(gzip.compress, data, self.compression_level, mtime=0)
+        async with self._lock:
+            known = self._known.get(entry["sha"])
+            if known is not None:
+                entry["shard"], entry["offset"], entry["length"] = known
+                payload = b""
+            await asyncio.to_thread(self._append, payload, entry)
+            self._known[entry["sha"]] = (entry["shard"], entry["offset"], entry["length"])
+        return entry
+
+    async def close(self) -> None:
+        async with self._lock:
+            for f in (self._shard, self._index):
+                if f is not None:
+                    await asyncio.to_thread(f.close)
+            self._shard = self._index = None
+
+
+class CodeShardReader:
+    """Random access into a CodeShardWriter directory; shards are memory-mapped on first use."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._maps: Dict[str, mmap.mmap] = {}
+
+    def iter_index(self) -> Iterator[Dict[str, Any]]:
+        return iter_jsonl(self.root / "index.jsonl")
+
+    def _map(self, shard: str) -> mmap.mmap:
+        mm = self._maps.get(shard)
+        if mm is None:
+            with open(self.root / shard, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[shard] = mm
+        return mm
+
+    def read(self, entry: Dict[str, Any]) -> bytes:
+        offset, length = int(entry["offset"]), int(entry["length"])
+        mm = self._map(str(entry["shard"]))
+        if offset + length > len(mm):
+            # the shard grew since it was mapped
+            mm.close()
+            del self._maps[str(entry["shard"])]
+            mm = self._map(str(entry["shard"]))
+        return gzip.decompress(mm[offset:offset + length])
+
+    def read_text(self, entry: Dict[str, Any]) -> str:
+        return self.read(entry).decode("utf-8")
+
+    def close(self) -> None:
+        for mm in self._maps.values():
+            mm.close()
+        self._maps.clear()
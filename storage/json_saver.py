@@ -1,6 +1,32 @@
 import json
 import aiofiles
 import asyncio
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+WRITE_SECONDS = REGISTRY.histogram("storage_write_seconds", "Time spent writing one record", ("sink",))
+RECORDS = REGISTRY.counter("storage_records_total", "Records written", ("sink",))
+
+
+def iter_jsonl(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Objects of an append-only JSONL file (e.g. an index); a missing file yields nothing."""
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # a torn trailing line from an interrupted run
+                logger.debug(f"skipping malformed line in {path}")
 
 
 class JSONLWriter:
@@ -11,6 +37,19 @@ class JSONLWriter:
         open(self.path, "a").close()
 
     async def write(self, obj):
-        async with self.lock:
-            async with aiofiles.open(self.path, "a") as f:
-                await f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        with WRITE_SECONDS.time(sink="jsonl"):
+            async with self.lock:
+                async with aiofiles.open(self.path, "a") as f:
+                    await f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        RECORDS.inc(sink="jsonl")
+
+    async def write_many(self, objs):
+        """Append a batch of records with one file open and one write."""
+        if not objs:
+            return
+        payload = "".join(json.dumps(obj, ensure_ascii=False) + "\n" for obj in objs)
+        with WRITE_SECONDS.time(sink="jsonl"):
+            async with self.lock:
+                async with aiofiles.open(self.path, "a") as f:
+                    await f.write(payload)
+        RECORDS.inc(len(objs), sink="jsonl")
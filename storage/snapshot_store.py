@@ -0,0 +1,131 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+from storage.json_saver import iter_jsonl
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Kinds whose payload is already compressed; gzip would only burn CPU on these.
+PRECOMPRESSED_KINDS = {"png", "jpeg"}
+
+
+class SnapshotStore:
+    """
+    Content-addressed snapshot storage.
+
+    Blobs are keyed by the sha256 of their raw content, gzip-compressed and
+    written to sharded directories (blobs/ab/cd/<digest>.gz), so identical
+    snapshots are stored once. An append-only index.jsonl maps each
+    (url, fetched_at, kind) capture to its blob. All disk I/O runs in worker
+    threads so the event loop never blocks on it.
+
+    Each crawl shard process appends to its own index.<shard>.jsonl, since
+    appends from several processes to one file can interleave; iter_index
+    reads them all.
+    """
+
+    def __init__(self, root: str, compression_level: int = 6, shard_depth: int = 2, shard: Optional[int] = None):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.index_path = self.root / ("index.jsonl" if shard is None else f"index.{shard}.jsonl")
+        self.compression_level = compression_level
+        self.shard_depth = shard_depth
+        self._index_lock = asyncio.Lock()
+        self._known: Set[str] = set()
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+
+    def _blob_path(self, digest: str, compressed: bool) -> Path:
+        parts = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        suffix = ".gz" if compressed else ".bin"
+        return self.blobs_dir.joinpath(*parts) / f"{digest}{suffix}"
+
+    def _write_blob(self, digest: str, data: bytes, compressed: bool) -> bool:
+        path = self._blob_path(digest, compressed)
+        if path.exists():
+            return False
+        payload = gzip.compress(data, compresslevel=self.compression_level, mtime=0) if compressed else data
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{id(data)}.tmp")
+        tmp.write_bytes(payload)
+        # atomic publish; a concurrent writer of the same digest produces identical bytes
+        os.replace(tmp, path)
+        return True
+
+    def _append_index(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    async def put(
+        self,
+        url: str,
+        data: bytes,
+        kind: str,
+        fetched_at: Optional[float] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Store one capture and record it in the index. Returns the index entry.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        compressed = kind not in PRECOMPRESSED_KINDS
+        created = False
+        if digest not in self._known:
+            created = await asyncio.to_thread(self._write_blob, digest, data, compressed)
+            self._known.add(digest)
+        entry: Dict[str, Any] = {
+            "url": url,
+            "fetched_at": fetched_at if fetched_at is not None else time.time(),
+            "kind": kind,
+            "sha256": digest,
+            "size": len(data),
+            "blob": self._blob_path(digest, compressed).relative_to(self.root).as_posix(),
+            "encoding": "gzip" if compressed else "identity",
+        }
+        if extra:
+            entry.update(extra)
+        async with self._index_lock:
+            await asyncio.to_thread(self._append_index, entry)
+        if not created:
+            logger.debug(f"snapshot dedup hit for {url} ({kind} {digest[:12]})")
+        return entry
+
+    async def put_html(
+        self,
+        url: str,
+        html: str,
+        fetched_at: Optional[float] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        return await self.put(url, html.encode("utf-8"), "html", fetched_at, extra)
+
+    async def put_api(self, url: str, api_hits: List[Any], fetched_at: Optional[float] = None) -> Dict[str, Any]:
+        """Store the XHR/fetch payloads captured on a page as one JSON blob."""
+        data = json.dumps(api_hits, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        return await self.put(url, data, "api", fetched_at)
+
+    async def put_screenshot(self, url: str, png: bytes, fetched_at: Optional[float] = None) -> Dict[str, Any]:
+        return await self.put(url, png, "png", fetched_at)
+
+    def read_blob(self, entry: Dict[str, Any]) -> bytes:
+        data: bytes = (self.root / str(entry["blob"])).read_bytes()
+        if entry.get("encoding") == "gzip":
+            return gzip.decompress(data)
+        return data
+
+    def index_paths(self) -> List[Path]:
+        """index.jsonl, then every shard's index.<n>.jsonl."""
+        shards = [p for p in self.root.glob("index.*.jsonl") if p.name.split(".")[1].isdigit()]
+        shards.sort(key=lambda p: int(p.name.split(".")[1]))
+        return [p for p in [self.root / "index.jsonl", *shards] if p.exists()]
+
+    def iter_index(self) -> Iterator[Dict[str, Any]]:
+        """Entries of every index file; within one file they are in write order."""
+        for path in self.index_paths():
+            yield from iter_jsonl(path)
@@ -1,10 +1,21 @@
 import aiosqlite
 import json
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from utils.logger import get_logger
+from utils.metrics import REGISTRY
 
 logger = get_logger(__name__)
 
+WRITE_SECONDS = REGISTRY.histogram("storage_write_seconds", "Time spent writing one record", ("sink",))
+RECORDS = REGISTRY.counter("storage_records_total", "Records written", ("sink",))
+ERRORS = REGISTRY.counter("storage_errors_total", "Failed record writes", ("sink",))
+
+_INSERT_SQL = """
+    INSERT OR IGNORE INTO pages (url, domain, title, text, meta, scrape_meta)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
 
 class SQLiteStore:
     def __init__(self, path: str):
@@ -34,27 +45,47 @@ class SQLiteStore:
         )
         await self.db.commit()
 
+    @staticmethod
+    def _row(parsed: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (
+            parsed.get("url"),
+            parsed.get("domain"),
+            parsed.get("title"),
+            parsed.get("text"),
+            json.dumps(parsed.get("meta") or {}),
+            json.dumps(parsed.get("scrape_meta") or {}),
+        )
+
     async def insert(self, parsed: Dict[str, Any]) -> None:
         if self.db is None:
             raise RuntimeError("SQLiteStore not initialized")
+        start = time.perf_counter()
         try:
-            await self.db.execute(
-                """
-                INSERT OR IGNORE INTO pages (url, domain, title, text, meta, scrape_meta)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    parsed.get("url"),
-                    parsed.get("domain"),
-                    parsed.get("title"),
-                    parsed.get("text"),
-                    json.dumps(parsed.get("meta") or {}),
-                    json.dumps(parsed.get("scrape_meta") or {}),
-                ),
-            )
+            await self.db.execute(_INSERT_SQL, self._row(parsed))
             await self.db.commit()
+            RECORDS.inc(sink="sqlite")
         except Exception as e:
+            ERRORS.inc(sink="sqlite")
             logger.error(f"sqlite insert error: {e}")
+        finally:
+            WRITE_SECONDS.observe(time.perf_counter() - start, sink="sqlite")
+
+    async def insert_many(self, records: List[Dict[str, Any]]) -> None:
+        """Insert a batch in one transaction."""
+        if self.db is None:
+            raise RuntimeError("SQLiteStore not initialized")
+        if not records:
+            return
+        start = time.perf_counter()
+        try:
+            await self.db.executemany(_INSERT_SQL, [self._row(r) for r in records])
+            await self.db.commit()
+            RECORDS.inc(len(records), sink="sqlite")
+        except Exception as e:
+            ERRORS.inc(sink="sqlite")
+            logger.error(f"sqlite batch insert error: {e}")
+        finally:
+            WRITE_SECONDS.observe(time.perf_counter() - start, sink="sqlite")
 
     async def close(self) -> None:
         if self.db is not None:
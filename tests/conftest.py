@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+
+class FakeHandle:
+    def __init__(self, value):
+        self.value = value
+
+    async def json_value(self):
+        return self.value
+
+
+class FakeResponse:
+    status = 200
+
+
+class FakePage:
+    def __init__(self, evaluate_result=None):
+        self.url = None
+        self.handlers = {}
+        self.closed = False
+        self.evaluate_result = evaluate_result
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def is_closed(self):
+        return self.closed
+
+    def emit(self, event):
+        self.handlers[event](self)
+
+    async def evaluate(self, script, arg=None):
+        return self.evaluate_result
+
+    async def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        return FakeHandle(True)
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def add_init_script(self, script):
+        pass
+
+    async def goto(self, url, wait_until=None):
+        self.url = url
+        await asyncio.sleep(0)
+        return FakeResponse()
+
+
+class FakeContext:
+    def __init__(self, new_page, log):
+        self._new_page = new_page
+        self.log = log
+
+    async def new_page(self):
+        page = self._new_page()
+        self.log.append(page)
+        return page
+
+    async def close(self):
+        pass
+
+
+class FakeDriver:
+    def __init__(self, new_page=FakePage):
+        self.new_page = new_page
+        self.pages = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def new_context(self):
+        return FakeContext(self.new_page, self.pages)
+
+
+@pytest.fixture
+def fake_driver():
+    """FakeDriver factory; pass a page factory to control the pages it hands out."""
+    return FakeDriver
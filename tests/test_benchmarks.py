@@ -0,0 +1,78 @@
+import asyncio
+import sys
+
+import httpx
+import pytest
+
+from benchmarks.fake_github import make_repos, serve_github
+from benchmarks.run import peak_rss_mb, reset_peak_rss, sample_children_rss
+from benchmarks.synthetic_site import SiteSpec, serve_site
+from crawler.github_code_scraper import GitHubCodeScraper
+from crawler.lifecycle import process_tree_rss
+
+
+def test_synthetic_site_is_deterministic():
+    spec = SiteSpec(pages=20, fanout=3, page_size=500, seed=7)
+    assert spec.render_page(5) == SiteSpec(pages=20, fanout=3, page_size=500, seed=7).render_page(5)
+    with serve_site(spec) as srv:
+        r = httpx.get(f"{srv.base_url}/page/5")
+        assert r.status_code == 200
+        assert "Synthetic page 5" in r.text
+        assert httpx.get(f"{srv.base_url}/page/99").status_code == 404
+        assert srv.stats.to_dict()["requests"] == 2
+
+
+def test_synthetic_site_serves_shared_static_assets():
+    spec = SiteSpec(pages=5, fanout=2, page_size=200, assets=2)
+    assert "/static/asset0.js" in spec.render_page(1) and "/static/asset1.css" in spec.render_page(3)
+    with serve_site(spec) as srv:
+        r = httpx.get(f"{srv.base_url}/static/asset1.css")
+        assert r.status_code == 200 and r.headers["cache-control"] == "max-age=3600"
+        assert httpx.get(f"{srv.base_url}/static/asset2.js").status_code == 404
+        assert srv.stats.to_dict()["bytes_by_kind"]["static"] == len(r.content)
+
+
+def test_github_scraper_against_fake_server(tmp_path):
+    repos = make_repos(repos=1, files_per_repo=4, file_size=300, oversized_size=300_000)
+    with serve_github(repos) as srv:
+        scraper = GitHubCodeScraper(
+            output_dir=str(tmp_path / "code"),
+            extensions=[".py"],
+            max_file_size=100_000,
+            base_api=srv.base_url,
+            raw_base=srv.raw_base,
+        )
+        saved = asyncio.run(scraper.repo_to_jsonl("bench", "repo0", jsonl_path=str(tmp_path / "code.jsonl")))
+
+    paths = sorted(s["meta"]["path"] for s in saved)
+    assert paths == [f"pkg{i}/mod_{i}.py" for i in range(4)]
+    assert saved[0]["text"].encode("utf-8") == repos[0].files[saved[0]["meta"]["path"]]
+    assert len((tmp_path / "code.jsonl").read_text().splitlines()) == 4
+
+
+def test_peak_rss_is_reset_between_suites():
+    if not reset_peak_rss():
+        pytest.skip("peak RSS can only be reset on Linux")
+    block = bytearray(64 * 1024 * 1024)
+    block[::4096] = b"x" * len(block[::4096])
+    high = peak_rss_mb()
+    del block
+    assert reset_peak_rss()
+    assert peak_rss_mb() < high - 32
+
+
+def test_children_rss_sampler_sees_subprocesses():
+    if process_tree_rss() is None:
+        pytest.skip("needs /proc")
+
+    async def scenario():
+        child = await asyncio.create_subprocess_exec(sys.executable, "-c", "import time; time.sleep(2)")
+        peak = [0]
+        sampler = asyncio.create_task(sample_children_rss(peak, interval=0.05))
+        await asyncio.sleep(0.3)
+        sampler.cancel()
+        child.kill()
+        await child.wait()
+        return peak[0]
+
+    assert asyncio.run(scenario()) > 1024 * 1024
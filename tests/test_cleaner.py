@@ -1,4 +1,11 @@
-from pipeline.cleaner import clean_text, normalize_parsed
+import asyncio
+import multiprocessing as mp
+import random
+import re
+
+import pytest
+
+from pipeline.cleaner import BatchCleaner, CleanerChain, clean_text, normalize_parsed
 
 
 def test_clean_text_basic():
@@ -15,3 +22,77 @@ def test_normalize_parsed():
     out = normalize_parsed(parsed)
     assert out["text"] == "hello world"
     assert out["title"] == "Title"
+
+
+def test_clean_text_matches_regex_version():
+    # the original implementation, verbatim
+    def legacy(text):
+        if not text:
+            return ""
+        # remove excessive whitespace
+        t = re.sub(r'\s+', ' ', text)
+        # remove long gibberish control chars
+        t = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F]+', ' ', t)
+        return t.strip()
+
+    rng = random.Random(7)
+    # every C0 control plus unicode whitespace and ordinary letters
+    alphabet = "".join(map(chr, range(0x21))) + "ab\x7f\x85\xa0\u2028\u3000é"
+    for _ in range(5000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert clean_text(text) == legacy(text), repr(text)
+
+
+def test_default_chain_equals_normalize_parsed():
+    parsed = {"text": " a \n b\x00 ", "title": " T ", "meta": {}}
+    assert CleanerChain.from_spec()(dict(parsed)) == normalize_parsed(dict(parsed))
+
+
+def test_chain_filters_and_boilerplate():
+    chain = CleanerChain.from_spec([
+        {"boilerplate": {"patterns": ["Share on .*", "Cookie settings"]}},
+        {"unicode": {"form": "NFKC"}},
+        "whitespace",
+        {"length": {"min_chars": 5}},
+        {"language": {"allow": ["en"], "keep_unknown": False}},
+    ])
+    rec = {"title": "ﬁ", "text": "Body text\nShare on X\n  Cookie settings \nmore", "meta": {"language": "en-US"}}
+    out = chain(rec)
+    assert out is not None
+    assert out["text"] == "Body text more" and out["title"] == "fi"
+    assert chain({"text": "long enough", "meta": {"og:locale": "de_DE"}}) is None
+    assert chain({"text": "long enough", "meta": {}}) is None
+    assert chain({"text": "tiny", "meta": {"language": "en"}}) is None
+    with pytest.raises(ValueError):
+        CleanerChain.from_spec(["nope"])
+
+
+def test_batch_cleaner_keeps_order_and_drops():
+    cleaner = BatchCleaner([{"length": {"min_chars": 2}}, "whitespace"], batch_size=2)
+    records = [{"text": t, "title": ""} for t in (" a  b ", "x", "c\td", " e ", "ff")]
+    out = asyncio.run(cleaner.clean(records))
+    assert [r and r["text"] for r in out] == ["a b", None, "c d", "e", "ff"]
+    cleaner.close()
+
+
+def _clean_in_daemon(out):
+    cleaner = BatchCleaner(["whitespace"], workers=2)
+    try:
+        result = asyncio.run(cleaner.clean([{"text": " a  b ", "title": ""}]))
+        out.put(("ok", [r and r["text"] for r in result]))
+    except Exception as e:
+        out.put(("error", repr(e)))
+    finally:
+        cleaner.close()
+
+
+def test_batch_cleaner_workers_inside_daemon_process():
+    # shard processes used to be daemonic, where starting a pool raises
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_clean_in_daemon, args=(out,), daemon=True)
+    proc.start()
+    try:
+        assert out.get(timeout=60) == ("ok", ["a b"])
+    finally:
+        proc.join(10)
@@ -0,0 +1,72 @@
+import asyncio
+import gzip
+import os
+
+from benchmarks.fake_github import make_repos, serve_github
+from crawler.github_code_scraper import GitHubCodeScraper
+from storage.code_shards import CodeShardReader, CodeShardWriter, git_blob_sha
+
+
+def test_shards_roll_over_dedupe_and_read_back(tmp_path):
+    blobs = [(f"f{i}.py", f"x = '{os.urandom(200).hex()}'\n".encode("ascii")) for i in range(6)]
+
+    async def run():
+        writer = CodeShardWriter(str(tmp_path), shard_max_mb=0.0005)
+        entries = [await writer.put(data, {"repo": "o/r", "path": path}) for path, data in blobs]
+        dup = await writer.put(blobs[0][1], {"repo": "o/fork", "path": "f0.py"})
+        await writer.close()
+        return entries, dup
+
+    entries, dup = asyncio.run(run())
+    assert len({e["shard"] for e in entries}) > 1
+    assert (dup["shard"], dup["offset"]) == (entries[0]["shard"], entries[0]["offset"])
+    assert entries[0]["sha"] == git_blob_sha(blobs[0][1])
+
+    reader = CodeShardReader(str(tmp_path))
+    index = list(reader.iter_index())
+    assert [e["path"] for e in index] == [p for p, _ in blobs] + ["f0.py"]
+    assert [reader.read(e) for e in index] == [d for _, d in blobs] + [blobs[0][1]]
+    reader.close()
+    # each shard is a plain multi-member gzip file
+    first = tmp_path / entries[0]["shard"]
+    assert gzip.decompress(first.read_bytes()).startswith(blobs[0][1])
+
+    # reopening appends after the existing data and keeps dedupe
+    async def reopen():
+        writer = CodeShardWriter(str(tmp_path), shard_max_mb=0.0005)
+        again = await writer.put(blobs[1][1], {"repo": "o/r2", "path": "f1.py"})
+        await writer.close()
+        return again
+
+    assert asyncio.run(reopen())["offset"] == entries[1]["offset"]
+
+
+def test_scraper_shards_mode_writes_no_file_tree(tmp_path):
+    repos = make_repos(repos=1, files_per_repo=3, file_size=300, oversized_size=300_000)
+    with serve_github(repos) as srv:
+        scraper = GitHubCodeScraper(
+            output_dir=str(tmp_path / "code"),
+            extensions=[".py"],
+            max_file_size=100_000,
+            base_api=srv.base_url,
+            raw_base=srv.raw_base,
+            output_format="shards",
+            jsonl_text=False,
+        )
+
+        async def run():
+            try:
+                return await scraper.repo_to_jsonl("bench", "repo0", jsonl_path=str(tmp_path / "code.jsonl"))
+            finally:
+                await scraper.close()
+
+        saved = asyncio.run(run())
+
+    assert len(saved) == 3
+    assert not (tmp_path / "code" / "bench").exists()
+    reader = CodeShardReader(str(tmp_path / "code" / "shards"))
+    for entry in reader.iter_index():
+        assert reader.read(entry) == repos[0].files[entry["path"]]
+    reader.close()
+    rows = (tmp_path / "code.jsonl").read_text().splitlines()
+    assert len(rows) == 3 and all('"shard"' in r and '"text"' not in r for r in rows)
@@ -0,0 +1,77 @@
+import asyncio
+
+from crawler.concurrency import AdjustableSemaphore, AIMDController
+
+
+def test_adjustable_semaphore_resizes_without_preempting():
+    async def scenario():
+        sem = AdjustableSemaphore(2)
+        await sem.acquire()
+        await sem.acquire()
+        waiter = asyncio.create_task(sem.acquire())
+        await asyncio.sleep(0)
+        assert sem.waiting == 1
+
+        sem.set_limit(3)
+        await waiter
+        assert sem.active == 3
+
+        sem.set_limit(1)
+        sem.release()
+        late = asyncio.create_task(sem.acquire())
+        await asyncio.sleep(0)
+        assert not late.done()  # still 2 active > limit 1
+        sem.release()
+        sem.release()
+        await late
+        assert sem.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_aimd_grows_on_healthy_window_and_respects_ceiling():
+    aimd = AIMDController(max_limit=3, initial=1, cooldown=0)
+    aimd.record("a.com", 0.1, status=200)
+    assert aimd.limit("a.com") == 2
+    aimd.record("a.com", 0.1, status=200)
+    assert aimd.limit("a.com") == 2  # window is `limit` responses
+    aimd.record("a.com", 0.1, status=200)
+    assert aimd.limit("a.com") == 3
+    for _ in range(10):
+        aimd.record("a.com", 0.1, status=200)
+    assert aimd.limit("a.com") == 3
+    assert aimd.limit("b.com") == 1
+
+
+def test_aimd_backs_off_on_congestion_with_cooldown():
+    aimd = AIMDController(max_limit=8, initial=8, cooldown=60)
+    aimd.record("a.com", 0.1, status=429)
+    assert aimd.limit("a.com") == 4
+    # burst of failures inside the cooldown counts once
+    aimd.record("a.com", 0.1, status=503)
+    aimd.record("a.com", 0.1, error=TimeoutError("Timeout 30000ms exceeded"))
+    assert aimd.limit("a.com") == 4
+
+    fast = AIMDController(max_limit=8, initial=8, cooldown=0, latency_target=1.0)
+    fast.record("a.com", 0.1, error=TimeoutError("Navigation timeout of 30000 ms exceeded"))
+    fast.record("a.com", 5.0, status=200)
+    fast.record("a.com", 0.1, status=500)
+    fast.record("a.com", 0.1, status=500)
+    assert fast.limit("a.com") == 1  # floored at min_limit
+    assert fast.snapshot()["a.com"]["failures"] == 4
+
+
+def test_aimd_ignores_errors_that_are_not_congestion():
+    aimd = AIMDController(max_limit=8, cooldown=0)
+    assert aimd.initial == 8  # starts at the ceiling
+    for err in ("net::ERR_NAME_NOT_RESOLVED", "net::ERR_ABORTED", "net::ERR_CONNECTION_REFUSED", "Page crashed"):
+        aimd.record("a.com", 0.1, error=RuntimeError(err))
+    assert aimd.limit("a.com") == 8
+    assert aimd.snapshot()["a.com"]["failures"] == 0
+
+
+def test_aimd_from_config_uses_domain_ceiling():
+    cfg = {"concurrency": 6, "rate_limit": {"per_domain_concurrency": 3, "adaptive": {"initial_concurrency": 5}}}
+    aimd = AIMDController.from_config(cfg)
+    assert aimd.max_limit == 3 and aimd.initial == 3
+    assert AIMDController.from_config({"concurrency": 6}).max_limit == 6
@@ -0,0 +1,194 @@
+import asyncio
+import json
+
+from crawler.concurrency import AIMDController
+from crawler.control import CrawlControl, start_control_server
+from crawler.frontier import PriorityFrontier
+from crawler.url_filter import UrlFilter
+
+
+def _control(aimd=None):
+    frontier = PriorityFrontier(strategy="fifo")
+    return frontier, CrawlControl(frontier, UrlFilter(), aimd=aimd, per_domain_concurrency=2)
+
+
+def test_paused_domain_is_parked_and_requeued():
+    async def scenario():
+        frontier, control = _control()
+        for url in ("http://a.com/1", "http://b.com/1", "http://a.com/2"):
+            await frontier.put((url, 0))
+        control.pause("a.com")
+        visited = []
+
+        async def worker(name):
+            while True:
+                item = await frontier.get()
+                if item[0] is None:
+                    frontier.task_done()
+                    return
+                if control.park(item):
+                    continue
+                visited.append(item[0])
+                frontier.task_done()
+
+        async def seed(url, depth):
+            await frontier.put((url, depth))
+
+        control.start_workers(worker, seed, 1)
+        await asyncio.sleep(0.01)
+        assert visited == ["http://b.com/1"]
+        assert control.domain_state("a.com")["parked"] == 2
+        assert control.resume("a.com") == 2
+        await asyncio.wait_for(frontier.join(), 1)
+        await control.stop_workers()
+        return visited
+
+    assert asyncio.run(scenario()) == ["http://b.com/1", "http://a.com/1", "http://a.com/2"]
+
+
+def test_workers_added_and_retired():
+    async def scenario():
+        frontier, control = _control()
+        names = []
+
+        async def worker(name):
+            names.append(name)
+            while True:
+                url, _ = await frontier.get()
+                frontier.task_done()
+                if url is None:
+                    return
+
+        async def seed(url, depth):
+            pass
+
+        control.start_workers(worker, seed, 2)
+        assert control.add_workers(2) == 4
+        assert await control.set_workers(1) == 1
+        await frontier.join()
+        assert control.snapshot()["workers"] == {"target": 1, "running": 1}
+        # at least one worker is always kept
+        assert await control.remove_workers(5) == 1
+        await control.stop_workers()
+        assert all(t.done() for t in control.tasks)
+        return names
+
+    assert asyncio.run(scenario()) == ["w0", "w1", "w2", "w3"]
+
+
+def test_domain_limits_delay_and_filters():
+    async def scenario():
+        aimd = AIMDController(max_limit=4, initial=2)
+        _, control = _control(aimd)
+        control.set_domain("a.com", delay=1.5, concurrency=8)
+        assert control.delay_for("a.com") == 1.5 and control.delay_for("b.com") == 0.0
+        assert aimd.limit("a.com") == 8
+        control.set_domain("a.com", reset=True)
+        assert aimd.limit("a.com") == 4 and control.delay_for("a.com") == 0.0
+
+        _, plain = _control()
+        sem = plain.semaphore("c.com")
+        assert sem.limit == 2
+        plain.set_domain("c.com", concurrency=5)
+        assert sem.limit == 5
+        plain.set_domain("*", concurrency=0)
+        assert plain.semaphore("d.com").limit > 1000
+        assert plain.domain_state("d.com")["limit"] is None
+
+        plain.set_filters(deny=["*.spam.com"])
+        assert not plain.url_filter.admit("http://x.spam.com/")
+        plain.set_filters(deny=[])
+        assert plain.url_filter.admit("http://x.spam.com/")
+
+    asyncio.run(scenario())
+
+
+async def _request(port, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    return await _raw_request(port, f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+
+
+async def _raw_request(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_control_server_routes():
+    async def scenario():
+        frontier, control = _control()
+        seeded = []
+
+        async def worker(name):
+            while (await frontier.get())[0] is not None:
+                frontier.task_done()
+            frontier.task_done()
+
+        async def seed(url, depth):
+            seeded.append((url, depth))
+            return len(seeded) == 1
+
+        control.start_workers(worker, seed, 1)
+        server = await start_control_server(control, 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            status, state = await _request(port, "GET", "/state")
+            assert status == 200 and state["workers"]["target"] == 1
+            status, dom = await _request(port, "POST", "/domains/a.com", {"delay": 2, "paused": True})
+            assert dom["delay"] == 2 and dom["paused"]
+            status, out = await _request(port, "POST", "/seeds", {"urls": ["http://a.com/x", "ftp://a.com/"]})
+            assert out == {"accepted": 1, "dropped": 0, "forwarded": 0, "rejected": 1}
+            assert seeded == [("http://a.com/x", 0)]
+            # the frontier already had it
+            status, out = await _request(port, "POST", "/seeds", {"urls": ["http://a.com/x"]})
+            assert out["accepted"] == 0 and out["dropped"] == 1
+            status, out = await _request(port, "POST", "/workers", {"add": 2})
+            assert out == {"target": 3}
+            assert (await _request(port, "POST", "/seeds", {"urls": "http://a.com"}))[0] == 400
+            assert (await _request(port, "GET", "/nope"))[0] == 404
+            assert (await _raw_request(port, b"POST /seeds HTTP/1.1\r\nContent-Length: x\r\n\r\n"))[0] == 400
+        finally:
+            server.close()
+            await server.wait_closed()
+            await control.stop_workers()
+
+    asyncio.run(scenario())
+
+
+def test_lowering_global_ceiling_applies_to_domains_holding_slots():
+    async def scenario():
+        aimd = AIMDController(max_limit=4, initial=4)
+        _, control = _control(aimd)
+        for _ in range(4):
+            await aimd.acquire("a.com")
+        await aimd.acquire("b.com")
+        control.set_domain("b.com", concurrency=6)
+        control.set_domain("*", concurrency=2)
+        assert aimd.limit("a.com") == 2
+        # a domain with its own ceiling keeps it
+        assert aimd.limit("b.com") == 6
+
+        waiter = asyncio.create_task(aimd.acquire("a.com"))
+        aimd.release("a.com")
+        aimd.release("a.com")
+        await asyncio.sleep(0)
+        assert not waiter.done()  # still 2 active, at the new limit
+        aimd.release("a.com")
+        await asyncio.wait_for(waiter, 1)
+        assert aimd.snapshot()["a.com"]["active"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_domain_delay_reserves_start_times_per_domain():
+    _, control = _control()
+    control.set_domain("slow.com", delay=10)
+    assert control.reserve_start("slow.com") == 0
+    assert 9.9 < control.reserve_start("slow.com") <= 10
+    assert 19.9 < control.reserve_start("slow.com") <= 20
+    # other domains are not held up by slow.com's schedule
+    assert control.reserve_start("fast.com") == 0
@@ -0,0 +1,210 @@
+import asyncio
+
+from crawler import expanders
+from crawler.expanders import ExpansionBudget, infinite_scroll
+
+from conftest import FakeHandle, FakePage
+
+
+class FakeFeedPage(FakePage):
+    """Each scroll appends the next batch from `batches` to the feed."""
+
+    def __init__(self, batches):
+        super().__init__()
+        self.batches = list(batches)
+        self.items = 10
+        self.scrolls = 0
+
+    async def evaluate(self, script, arg=None):
+        if script == expanders._MEASURE:
+            return {"height": self.items * 100, "items": self.items}
+        self.scrolls += 1
+        if self.batches:
+            self.items += self.batches.pop(0)
+
+    async def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        if script == expanders._CHANGED and arg[1] == self.items:
+            raise TimeoutError("Timeout exceeded")
+        return FakeHandle("items")
+
+
+def test_infinite_scroll_stops_when_page_stops_growing():
+    page = FakeFeedPage([20, 20, 0, 5])
+    report = asyncio.run(infinite_scroll(page, max_iterations=10, wait_seconds=0.01))
+    assert report["gains"] == [20, 20, 0]
+    assert report["stopped"] == "no_growth"
+
+
+def test_infinite_scroll_stops_on_diminishing_returns():
+    page = FakeFeedPage([30, 1, 1, 1, 30])
+    report = asyncio.run(infinite_scroll(page, max_iterations=10, wait_seconds=0.01, min_gain=5, patience=2))
+    assert report["gains"] == [30, 1, 1]
+    assert report["stopped"] == "diminishing"
+
+
+def test_infinite_scroll_respects_budget():
+    page = FakeFeedPage([10] * 10)
+    report = asyncio.run(infinite_scroll(page, max_iterations=10, wait_seconds=0.01, budget=ExpansionBudget(0)))
+    assert report == {"iterations": 0, "gains": [], "stopped": "budget"}
+
+
+class SlowFeedPage(FakeFeedPage):
+    """The next batch renders `delay` seconds after a scroll, while background XHRs keep answering."""
+
+    def __init__(self, batches, activity, delay=0.1):
+        super().__init__(batches)
+        self.activity = activity
+        self.delay = delay
+        self.pending = 0
+
+    async def evaluate(self, script, arg=None):
+        if script == expanders._MEASURE:
+            return await super().evaluate(script, arg)
+        self.scrolls += 1
+        self.pending = self.batches.pop(0) if self.batches else 0
+
+    async def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        if script != expanders._CHANGED:
+            return FakeHandle(True)
+        # a poll that was already in flight, and a beacon fired after the scroll, answer before the feed does
+        self.activity.notify("/poll")
+        self.activity.request_issued("/beacon")
+        self.activity.notify("/beacon")
+        await asyncio.sleep(self.delay)
+        if not self.pending:
+            await asyncio.sleep(timeout / 1000 - self.delay)
+            raise TimeoutError("Timeout exceeded")
+        self.items += self.pending
+        self.pending = 0
+        return FakeHandle("items")
+
+
+def test_background_xhr_does_not_stop_infinite_scroll():
+    async def run():
+        activity = expanders.ApiActivity()
+        activity.request_issued("/poll")
+        page = SlowFeedPage([20, 20, 0], activity)
+        return await infinite_scroll(page, max_iterations=10, wait_seconds=0.5, activity=activity, api_grace=0.01)
+
+    report = asyncio.run(run())
+    assert report["gains"] == [20, 20, 0]
+    assert report["stopped"] == "no_growth"
+
+
+def test_api_activity_counts_only_requests_issued_after_the_action():
+    activity = expanders.ApiActivity()
+    activity.request_issued("/a")
+    mark = expanders.time.monotonic()
+    activity.request_issued("/a")
+    activity.notify("/a")
+    activity.notify("/unknown")
+    assert activity.answered_since(mark) == 0
+    activity.notify("/a")
+    assert activity.answered_since(mark) == 1
+
+
+class _Button:
+    def __init__(self, page):
+        self.page = page
+
+    async def is_visible(self):
+        return self.page.clicks_left > 0
+
+    async def is_enabled(self):
+        return True
+
+    async def click(self, timeout=None):
+        self.page.clicks_left -= 1
+        self.page.items += 5
+
+
+class _Locator:
+    def __init__(self, page):
+        self.first = _Button(page)
+
+
+class LoadMorePage(FakePage):
+    def __init__(self, clicks):
+        super().__init__()
+        self.items = 10
+        self.clicks_left = clicks
+
+    def locator(self, selector):
+        return _Locator(self)
+
+    async def evaluate(self, script, arg=None):
+        return {"height": self.items * 100, "items": self.items}
+
+    async def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        if script == expanders._CHANGED and self.clicks_left == 0:
+            return FakeHandle("button_gone")
+        return FakeHandle("items")
+
+
+def test_click_more_until_button_gone():
+    report = asyncio.run(expanders.click_more(LoadMorePage(3), ["button.more"], max_clicks=10, wait_seconds=0.1))
+    assert report == {"iterations": 3, "gains": [5, 5, 5], "stopped": "exhausted"}
+    report = asyncio.run(expanders.click_more(LoadMorePage(30), ["button.more"], max_clicks=4, wait_seconds=0.1))
+    assert report["iterations"] == 4 and report["stopped"] == "max_clicks"
+
+
+class _Field:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+
+    async def fill(self, value):
+        self.page.filled[self.selector] = value
+
+    async def click(self):
+        # the search XHR goes out with the submit and renders its results later
+        self.page.activity.request_issued("/api/search")
+        self.page.submitted = True
+
+
+class SearchFormPage(FakePage):
+    def __init__(self, activity, renders):
+        super().__init__()
+        self.activity = activity
+        self.renders = renders
+        self.filled = {}
+        self.submitted = False
+        self.items = 0
+
+    async def wait_for_selector(self, selector, timeout=None):
+        return _Field(self, selector)
+
+    async def query_selector(self, selector):
+        return _Field(self, selector)
+
+    async def evaluate(self, script, arg=None):
+        return {"height": 100 + self.items, "items": self.items}
+
+    async def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        if script != expanders._CHANGED:
+            return FakeHandle(True)
+        await asyncio.sleep(0.02)
+        self.activity.notify("/api/search")
+        if not self.renders:
+            await asyncio.sleep(timeout / 1000)
+            raise TimeoutError("Timeout exceeded")
+        await asyncio.sleep(0.05)
+        self.items = 12
+        return FakeHandle("items")
+
+
+def test_submit_form_waits_for_results_after_the_search_xhr():
+    async def run(renders):
+        activity = expanders.ApiActivity()
+        page = SearchFormPage(activity, renders)
+        signal = await expanders.submit_form(
+            page, {"input[name=q]": "shoes"}, "button[type=submit]", 0.3, activity=activity, api_grace=0.01
+        )
+        return page, signal
+
+    page, signal = asyncio.run(run(True))
+    assert signal == "items" and page.items == 12
+    assert page.filled == {"input[name=q]": "shoes"} and page.submitted
+    # the XHR answered but nothing rendered: the wait runs to the timeout and reports it
+    _, signal = asyncio.run(run(False))
+    assert signal == "api"
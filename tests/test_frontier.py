@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from crawler.frontier import PriorityFrontier
+from crawler.sitemaps import parse_sitemap
+
+
+def _drain(frontier):
+    out = []
+    while not frontier.empty():
+        out.append(frontier.get_nowait()[0])
+        frontier.task_done()
+    return out
+
+
+def test_best_first_order_and_dedupe():
+    async def scenario():
+        f = PriorityFrontier(max_depth=3, patterns={r"/article/": 2.0, r"/tag/": -1.0})
+        f.put_nowait(("https://s.com/tag/a", 1))
+        f.put_nowait(("https://s.com/about", 1))
+        f.put_nowait(("https://s.com/article/1", 2))
+        f.put_nowait(("https://s.com/deep", 4))  # beyond max_depth
+        # rediscovered links gain inlinks and move ahead of equally deep pages
+        f.put_nowait(("https://s.com/contact", 1))
+        f.put_nowait(("https://s.com/contact", 1))
+        f.put_nowait(("https://s.com/contact", 1))
+        assert f.qsize() == 4
+        return _drain(f), f
+
+    order, f = asyncio.run(scenario())
+    assert order == ["https://s.com/article/1", "https://s.com/contact", "https://s.com/about", "https://s.com/tag/a"]
+    asyncio.run(f.join())  # every admitted item was task_done'd once
+
+
+def test_fairness_and_lastmod():
+    async def scenario():
+        f = PriorityFrontier(fairness_weight=1.0, inlink_weight=0)
+        for i in range(3):
+            f.put_nowait((f"https://big.com/{i}", 1))
+        f.put_nowait(("https://small.com/x", 1))
+        f.hint_lastmod("https://big.com/fresh", time.time())
+        f.put_nowait(("https://big.com/fresh", 1))
+        return _drain(f)
+
+    order = asyncio.run(scenario())
+    assert order.index("https://small.com/x") < order.index("https://big.com/2")
+    assert order[0] == "https://big.com/0"
+
+
+def test_budgets_and_stop_sentinel():
+    async def scenario():
+        f = PriorityFrontier(strategy="fifo", max_pages=3, max_pages_per_domain=2)
+        for url in ["https://a.com/1", "https://a.com/2", "https://a.com/3", "https://b.com/1", "https://b.com/2"]:
+            f.put_nowait((url, 0))
+        f.put_nowait((None, None))
+        assert f.get_nowait() == (None, None)
+        f.task_done()
+        visited = []
+        for url in _drain(f):
+            if f.charge(url):
+                visited.append(url)
+        f.put_nowait(("https://c.com/new", 0))  # global budget spent: not admitted
+        return visited, f.qsize()
+
+    visited, left = asyncio.run(scenario())
+    assert visited == ["https://a.com/1", "https://a.com/2", "https://b.com/1"]
+    assert left == 0
+
+
+def test_parse_sitemap():
+    xml = b"""<?xml version="1.0"?>
+    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <url><loc>https://s.com/a</loc><lastmod>2024-01-02</lastmod></url>
+      <url><loc> https://s.com/b </loc></url>
+    </urlset>"""
+    urls, children = parse_sitemap(xml)
+    assert urls[0][0] == "https://s.com/a" and urls[0][1] is not None
+    assert urls[1] == ("https://s.com/b", None) and children == []
+    index = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <sitemap><loc>https://s.com/sm1.xml</loc></sitemap></sitemapindex>"""
+    assert parse_sitemap(index) == ([], ["https://s.com/sm1.xml"])
+
+
+def test_fairness_counts_served_and_queued_pages():
+    f = PriorityFrontier(fairness_weight=1.0, depth_weight=0, inlink_weight=0)
+    for i in range(3):
+        f.put_nowait((f"https://a.com/{i}", 0))
+    assert f.score("https://a.com/x", 0, "a.com") == 3
+    urls = _drain(f)
+    f.charge(urls[0])
+    # dequeued pages stop counting as queued; only the one visited counts as served
+    assert f.score("https://a.com/x", 0, "a.com") == 1
+
+
+def test_form_seeds_do_not_use_the_page_budget():
+    f = PriorityFrontier(strategy="fifo", max_pages=1, max_pages_per_domain=1)
+    assert f.charge("https://a.com/search#coiney-form=0.0", page=False)
+    assert f.charge("https://a.com/search#coiney-form=0.1", page=False)
+    assert f.pages == 0
+    assert f.charge("https://a.com/1") and not f.charge("https://a.com/2")
+    assert f.charge("https://a.com/search#coiney-form=0.2", page=False)
+    f.deadline = time.monotonic() - 1
+    assert not f.charge("https://a.com/search#coiney-form=0.3", page=False)
@@ -1,7 +1,79 @@
-from crawler.github_code_scraper import GitHubCodeScraper
+import asyncio
+
+import pytest
+
+from benchmarks.fake_github import FakeRepo, serve_github
+from crawler.github_code_scraper import FILES, FileRejected, GitHubCodeScraper, TextBody
 
 
 def test_is_code_file_extensions():
     s = GitHubCodeScraper()
     assert s._is_code_file("foo.py") is True
     assert s._is_code_file("foo.txt") is False
+
+
+def test_text_body_rejects_early():
+    body = TextBody(max_bytes=10)
+    body.feed(b"x = 1\n")
+    with pytest.raises(FileRejected) as exc:
+        body.feed(b"y = 22222\n")
+    assert exc.value.reason == "too_large"
+
+    with pytest.raises(FileRejected) as exc:
+        TextBody().feed(b"\x89PNG\r\n\x1a\n\x00\x00")
+    assert exc.value.reason == "binary"
+
+    with pytest.raises(FileRejected) as exc:
+        TextBody().feed("café = 1\n".encode("latin-1"))
+    assert exc.value.reason == "encoding"
+
+    body = TextBody()
+    snowman = "s = '☃'\n".encode("utf-8")
+    # a multi-byte character split across chunks is fine
+    body.feed(snowman[:6])
+    body.feed(snowman[6:])
+    assert body.finish() == (snowman, "s = '☃'\n")
+
+
+def test_download_rejects_by_content_without_tree_size(tmp_path):
+    files = {
+        "ok.py": "print('hé')\n".encode("utf-8"),
+        "blob.py": b"\x00" * 50,
+        "latin.py": "x = 'café'\n".encode("latin-1"),
+        "big.py": b"x = 1\n" * 1000,
+    }
+    with serve_github([FakeRepo("o", "r", files)]) as srv:
+        scraper = GitHubCodeScraper(
+            output_dir=str(tmp_path), max_file_size=1000, base_api=srv.base_url, raw_base=srv.raw_base
+        )
+
+        async def run():
+            out = {}
+            for path in files:
+                try:
+                    out[path] = await scraper._download_file_raw("o", "r", "main", path)
+                except FileRejected as e:
+                    out[path] = e.reason
+            return out
+
+        out = asyncio.run(run())
+    assert out["ok.py"] == (files["ok.py"], "print('hé')\n")
+    assert out["blob.py"] == "binary"
+    assert out["latin.py"] == "encoding"
+    assert out["big.py"] == "too_large"
+
+
+def _file_outcomes():
+    return {k[0]: v for k, v in FILES.export()["values"]}
+
+
+def test_empty_files_are_not_counted_as_failures(tmp_path):
+    files = {"ok.py": b"x = 1\n", "empty.py": b""}
+    before = _file_outcomes()
+    with serve_github([FakeRepo("o", "r", files)]) as srv:
+        scraper = GitHubCodeScraper(output_dir=str(tmp_path), base_api=srv.base_url, raw_base=srv.raw_base)
+        saved = asyncio.run(scraper.repo_to_jsonl("o", "r", jsonl_path=str(tmp_path / "code.jsonl")))
+    after = _file_outcomes()
+    assert [s["meta"]["path"] for s in saved] == ["ok.py"]
+    assert after.get("empty", 0) - before.get("empty", 0) == 1
+    assert after.get("failed", 0) == before.get("failed", 0)
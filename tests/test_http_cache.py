@@ -0,0 +1,180 @@
+import asyncio
+import sqlite3
+
+from crawler.http_cache import HttpCache, freshness_lifetime
+
+
+class FakeResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type="script"):
+        self.url = url
+        self.method = "GET"
+        self.resource_type = resource_type
+        self.headers = {"accept": "*/*"}
+
+
+class FakeRoute:
+    def __init__(self, url, origin, resource_type="script"):
+        self.request = FakeRequest(url, resource_type)
+        self.origin = origin
+        self.fulfilled = None
+        self.continued = False
+
+    async def fetch(self, headers=None):
+        self.origin["fetches"].append(headers or {})
+        return self.origin["respond"](headers or {})
+
+    async def fulfill(self, status=200, headers=None, body=b""):
+        self.fulfilled = (status, headers, body)
+
+    async def continue_(self):
+        self.continued = True
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"cache-control": "public, max-age=600", "age": "100"}, 0) == 500
+    assert freshness_lifetime({"cache-control": "no-store"}, 0) is None
+    assert freshness_lifetime({"cache-control": "no-cache"}, 0) == 0
+    assert freshness_lifetime({"expires": "0"}, 0) == 0
+    hdrs = {"date": "Tue, 11 Jun 2024 10:00:00 GMT", "last-modified": "Wed, 01 May 2024 10:00:00 GMT"}
+    assert freshness_lifetime(hdrs, 0, heuristic_max=3600) == 3600
+    assert freshness_lifetime({}, 0, default_ttl=60) == 60
+
+
+def test_cache_shared_across_instances_and_revalidates(tmp_path):
+    origin = {"fetches": [], "respond": lambda h: FakeResponse(
+        200, {"cache-control": "max-age=3600", "content-encoding": "gzip", "etag": '"v1"'}, b"console.log(1)"
+    )}
+
+    async def scenario():
+        first = HttpCache(str(tmp_path))
+        await first.open()
+        r1 = FakeRoute("https://s.com/app.js", origin)
+        await first.handle(r1)
+        await first.close()
+
+        # a new context / run opens the same directory and is served from disk
+        second = HttpCache(str(tmp_path))
+        await second.open()
+        r2 = FakeRoute("https://s.com/app.js", origin)
+        await second.handle(r2)
+        assert len(origin["fetches"]) == 1
+        assert r2.fulfilled[2] == b"console.log(1)" and "content-encoding" not in r2.fulfilled[1]
+
+        # documents are not cached
+        r3 = FakeRoute("https://s.com/", origin, resource_type="document")
+        await second.handle(r3)
+        assert r3.continued
+
+        # stale entry with a validator: revalidated with If-None-Match, body reused on 304
+        await asyncio.to_thread(second._touch, "https://s.com/app.js", 0.0)
+        origin["respond"] = lambda h: FakeResponse(304, {"cache-control": "max-age=60"}, b"")
+        r4 = FakeRoute("https://s.com/app.js", origin)
+        await second.handle(r4)
+        assert origin["fetches"][-1]["if-none-match"] == '"v1"'
+        assert r4.fulfilled[2] == b"console.log(1)"
+        await second.close()
+
+    asyncio.run(scenario())
+
+
+def test_lru_eviction_and_uncacheable(tmp_path):
+    async def scenario():
+        cache = HttpCache(str(tmp_path), max_bytes=2500)
+        await cache.open()
+        req = {"accept": "*/*"}
+        ok = {"cache-control": "max-age=60"}
+        assert not await cache.store("https://s.com/x", 200, {"cache-control": "no-store"}, req, b"x")
+        assert not await cache.store("https://s.com/c", 200, {**ok, "set-cookie": "a=b"}, req, b"x")
+        assert not await cache.store("https://s.com/n", 200, {}, req, b"x")  # no freshness, no validator
+        for i in range(3):
+            assert await cache.store(f"https://s.com/{i}", 200, ok, req, b"a" * 1000)
+            await asyncio.sleep(0.01)
+        assert await cache.lookup("https://s.com/0", req) is None
+        assert (await cache.lookup("https://s.com/2", req))["body"] == b"a" * 1000
+        # Vary: entries only match requests with the same header values
+        await cache.store("https://s.com/v", 200, {**ok, "vary": "Accept-Language"}, {"accept-language": "en"}, b"en")
+        assert await cache.lookup("https://s.com/v", {"accept-language": "de"}) is None
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_store_tracks_size_without_scanning_the_index(tmp_path):
+    async def scenario():
+        cache = HttpCache(str(tmp_path), max_bytes=10_000)
+        await cache.open()
+        scans = []
+        full_scan = cache._total_size
+        cache._total_size = lambda: scans.append(1) or full_scan()
+        req = {"accept": "*/*"}
+        ok = {"cache-control": "max-age=60"}
+        await cache.store("https://s.com/a", 200, ok, req, b"a" * 1000)
+        await cache.store("https://s.com/b", 200, ok, req, b"b" * 2000)
+        await cache.store("https://s.com/a", 200, ok, req, b"a" * 500)  # replacing counts the new size only
+        assert scans == []
+        assert cache._size == full_scan() == 2500
+        # another instance on the same directory starts from what is on disk
+        other = HttpCache(str(tmp_path), max_bytes=10_000)
+        await other.open()
+        assert other._size == 2500
+        await other.close()
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_vary_variants_are_stored_side_by_side(tmp_path):
+    async def scenario():
+        cache = HttpCache(str(tmp_path))
+        await cache.open()
+        ok = {"cache-control": "max-age=60", "vary": "Accept-Language, Accept-Encoding"}
+        await cache.store("https://s.com/v", 200, ok, {"accept-language": "en, de", "accept-encoding": "gzip"}, b"en")
+        await cache.store("https://s.com/v", 200, ok, {"accept-language": "fr"}, b"fr")
+        # spacing inside the value and Accept-Encoding don't split variants
+        en = await cache.lookup("https://s.com/v", {"accept-language": "en,de", "accept-encoding": "br"})
+        assert en["body"] == b"en"
+        assert (await cache.lookup("https://s.com/v", {"accept-language": "fr"}))["body"] == b"fr"
+        assert await cache.lookup("https://s.com/v", {}) is None
+        assert cache._size == 4
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_index_without_variants_is_replaced(tmp_path):
+    db = sqlite3.connect(str(tmp_path / "index.db"))
+    db.execute("CREATE TABLE entries (url TEXT PRIMARY KEY, blob TEXT, size INTEGER)")
+    db.execute("INSERT INTO entries VALUES ('https://s.com/a.js', 'blobs/aa/old.bin', 3)")
+    db.commit()
+    db.close()
+    (tmp_path / "blobs" / "aa").mkdir(parents=True)
+    (tmp_path / "blobs" / "aa" / "old.bin").write_bytes(b"old")
+
+    async def scenario():
+        cache = HttpCache(str(tmp_path))
+        await cache.open()
+        assert cache._size == 0
+        assert not (tmp_path / "blobs" / "aa").exists()
+        assert await cache.store("https://s.com/a.js", 200, {"cache-control": "max-age=60"}, {}, b"new")
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_route_pattern_only_matches_cached_types():
+    pattern = HttpCache("unused").route_pattern()
+    assert pattern.match("https://s.com/static/app.js?v=3")
+    assert pattern.match("https://s.com/font.WOFF2")
+    assert not pattern.match("https://s.com/page.html")
+    assert not pattern.match("https://s.com/api/items?format=.js")
+    assert HttpCache("unused", resource_types=["document"]).route_pattern() == "**/*"
@@ -0,0 +1,127 @@
+import asyncio
+
+from crawler import browser_driver, lifecycle
+from crawler.browser_driver import BrowserDriver
+from crawler.lifecycle import MemoryGuard, PageSlot, is_dead_target_error, process_tree_rss
+
+from conftest import FakeContext, FakePage
+
+
+def _slot(drv, **kwargs):
+    setups = []
+
+    async def setup(page):
+        setups.append(page)
+
+    return PageSlot(drv, setup, **kwargs), setups
+
+
+def test_recycles_after_max_navigations(fake_driver):
+    async def run():
+        drv = fake_driver()
+        slot, setups = _slot(drv, max_navigations=2)
+        first = await slot.acquire()
+        await slot.after_page()
+        assert await slot.acquire() is first
+        await slot.after_page()
+        second = await slot.acquire()
+        assert second is not first
+        assert setups == [first, second]
+
+    asyncio.run(run())
+
+
+def test_crashed_or_closed_page_is_replaced(fake_driver):
+    async def run():
+        slot, _ = _slot(fake_driver())
+        first = await slot.acquire()
+        first.emit("crash")
+        second = await slot.acquire()
+        assert second is not first
+        # late events from the old page don't condemn the new one
+        first.emit("close")
+        assert await slot.acquire() is second
+        second.closed = True
+        assert await slot.acquire() is not second
+
+    asyncio.run(run())
+
+
+def test_dead_target_error_and_heap_limit(fake_driver):
+    async def run():
+        slot, _ = _slot(fake_driver(lambda: FakePage(300 * 1024 * 1024)), max_js_heap_mb=256, heap_check_every=1)
+        first = await slot.acquire()
+        await slot.after_page()
+        second = await slot.acquire()
+        assert second is not first
+        slot.report_error(RuntimeError("Page.goto: net::ERR_NAME_NOT_RESOLVED"))
+        assert await slot.acquire() is second
+        slot.report_error(RuntimeError("Target page, context or browser has been closed"))
+        assert await slot.acquire() is not second
+
+    asyncio.run(run())
+    assert not is_dead_target_error(TimeoutError("Timeout 30000ms exceeded"))
+
+
+def test_memory_guard_generation_recycles_slots(monkeypatch, fake_driver):
+    assert isinstance(process_tree_rss(), int)
+    monkeypatch.setattr(lifecycle, "process_tree_rss", lambda: 2 * 1024 * 1024)
+
+    async def run():
+        guard = MemoryGuard(max_rss_mb=1)
+        slot, _ = _slot(fake_driver(), generation=lambda: guard.generation)
+        first = await slot.acquire()
+        guard.check()
+        assert guard.generation == 1
+        assert await slot.acquire() is not first
+
+    asyncio.run(run())
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        return FakeContext(FakePage, [])
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeChromium:
+    def __init__(self):
+        self.launched = []
+
+    async def launch(self, **kwargs):
+        self.launched.append(FakeBrowser())
+        return self.launched[-1]
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+def test_browser_driver_relaunches_dead_browser(monkeypatch):
+    pw = FakePlaywright()
+    monkeypatch.setattr(browser_driver, "async_playwright", lambda: pw)
+
+    async def run():
+        async with BrowserDriver() as drv:
+            await drv.new_context()
+            pw.chromium.launched[0].connected = False
+            await asyncio.gather(drv.new_context(), drv.new_context())
+            assert drv.restarts == 1
+            assert len(pw.chromium.launched) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,29 @@
+from utils.metrics import MetricsRegistry, quantile_from_buckets
+
+
+def test_render_prometheus_text():
+    reg = MetricsRegistry()
+    reg.counter("pages_total", "Pages", ("domain",)).inc(domain="a.com")
+    reg.counter("pages_total", "Pages", ("domain",)).inc(2, domain="a.com")
+    h = reg.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    h.observe(0.05, stage="parse")
+    h.observe(0.5, stage="parse")
+    text = reg.render()
+    assert '# TYPE pages_total counter' in text
+    assert 'pages_total{domain="a.com"} 3' in text
+    assert 'stage_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 2' in text
+    assert 'stage_seconds_count{stage="parse"} 2' in text
+
+
+def test_remote_snapshots_get_shard_label():
+    local, remote = MetricsRegistry(), MetricsRegistry()
+    remote.gauge("frontier_size", "Frontier").set(7)
+    local.merge_remote("1", remote.export())
+    assert 'frontier_size{shard="1"} 7' in local.render()
+    assert "frontier_size: 7" in local.summary()
+
+
+def test_quantile_from_buckets():
+    assert quantile_from_buckets((1.0, 2.0), [0, 10, 0], 0.5) == 1.5
+    assert quantile_from_buckets((1.0, 2.0), [0, 0, 0], 0.5) == 0.0
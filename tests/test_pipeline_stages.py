@@ -0,0 +1,135 @@
+import asyncio
+
+from crawler import frontend_scraper
+from crawler.stages import BatchStage, Stage
+
+from conftest import FakeHandle, FakePage
+
+SITE = {
+    "http://site.test/": ["/a", "/b"],
+    "http://site.test/a": ["/", "/c", "http://other.test/x"],
+    "http://site.test/b": ["/c#frag"],
+    "http://site.test/c": [],
+}
+SEARCH_RESULTS = {"http://site.test/search?q=ai": ["/a", "/b"]}
+
+
+class _Element:
+    def __init__(self, page):
+        self.page = page
+
+    async def fill(self, value):
+        self.page.query = value
+
+    async def click(self):
+        self.page.url = f"http://site.test/search?q={self.page.query}"
+
+
+class SitePage(FakePage):
+    def __init__(self):
+        super().__init__({"height": 0, "items": 0})
+        self.query = ""
+
+    async def wait_for_selector(self, selector, timeout=None):
+        return _Element(self)
+
+    async def query_selector(self, selector):
+        return _Element(self)
+
+    async def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        return FakeHandle("items")
+
+    async def content(self):
+        hrefs = SITE.get(self.url) or SEARCH_RESULTS.get(self.url, [])
+        links = "".join(f'<a href="{href}">{href}</a>' for href in hrefs)
+        return f"<html><head><title>{self.url}</title></head><body><p>page</p>{links}</body></html>"
+
+
+class SlowSink:
+    def __init__(self):
+        self.records = []
+
+    async def write(self, obj):
+        await asyncio.sleep(0.01)
+        self.records.append(obj)
+
+    async def insert(self, obj):
+        pass
+
+
+def test_stage_backpressure_and_drain():
+    async def scenario():
+        seen = []
+
+        async def handler(item):
+            await asyncio.sleep(0.01)
+            seen.append(item)
+
+        stage = Stage("t", handler, workers=2, maxsize=1)
+        stage.start()
+        for i in range(6):
+            await stage.put(i)
+            assert stage.queue.qsize() <= 1
+        await stage.close()
+        return seen
+
+    assert sorted(asyncio.run(scenario())) == list(range(6))
+
+
+def test_run_crawl_pipeline_with_fake_browser(monkeypatch, fake_driver):
+    monkeypatch.setattr(frontend_scraper, "BrowserDriver", lambda **kwargs: fake_driver(SitePage))
+    cfg = {
+        "start_urls": ["http://site.test/"],
+        "max_depth": 3,
+        "concurrency": 2,
+        "crawl": {"respect_robots": False, "intercept_api": False, "readiness": {"strategy": "networkidle"},
+                  "wait_after_load": 0},
+        "rate_limit": {"delay_seconds": 0},
+        "pipeline": {"parse_workers": 2, "store_workers": 1, "parse_queue_size": 1, "store_queue_size": 1},
+    }
+    sink = SlowSink()
+    asyncio.run(frontend_scraper.run_crawl(cfg, sink, sink))
+    urls = sorted(r["scrape_meta"]["url"] for r in sink.records)
+    assert urls == sorted(SITE)
+    depth = {r["scrape_meta"]["url"]: r["scrape_meta"]["depth"] for r in sink.records}
+    assert depth["http://site.test/c"] == 2
+
+
+def test_form_seeds_run_as_frontier_items(monkeypatch, fake_driver):
+    monkeypatch.setattr(frontend_scraper, "BrowserDriver", lambda **kwargs: fake_driver(SitePage))
+    cfg = {
+        "start_urls": ["http://site.test/c"],
+        "max_depth": 0,
+        "concurrency": 2,
+        "crawl": {"respect_robots": False, "intercept_api": False, "readiness": {"strategy": "networkidle"},
+                  "wait_after_load": 0},
+        "rate_limit": {"delay_seconds": 0},
+        "deep_crawl": {"forms": [{
+            "url": "http://site.test/",
+            "queries": ["ai", "nothing"],
+            "fields": {"input[name=q]": "{query}"},
+            "submit_selector": "button",
+            "max_results_per_query": 1,
+        }]},
+    }
+    sink = SlowSink()
+    asyncio.run(frontend_scraper.run_crawl(cfg, sink, sink))
+    # the first result of the "ai" query is crawled at depth 0; the form pages themselves are not stored
+    assert sorted(r["scrape_meta"]["url"] for r in sink.records) == ["http://site.test/a", "http://site.test/c"]
+
+
+def test_batch_stage_groups_items():
+    async def scenario():
+        batches = []
+
+        async def handler(batch):
+            batches.append(list(batch))
+
+        stage = BatchStage("b", handler, workers=1, maxsize=10, batch_size=3, max_wait=0.05)
+        for i in range(7):
+            await stage.put(i)
+        stage.start()
+        await stage.close()
+        return batches
+
+    assert asyncio.run(scenario()) == [[0, 1, 2], [3, 4, 5], [6]]
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from utils.profiling import LoopProfiler, call_site, percentiles
+
+
+async def _blocking_step():
+    time.sleep(0.12)
+    await asyncio.sleep(0.06)
+
+
+def test_profiler_reports_slow_callbacks_and_loop_lag(tmp_path):
+    async def run():
+        prof = LoopProfiler(profiler="sampling", slow_callback_ms=50, lag_interval_ms=10, report_dir=str(tmp_path))
+        prof.start()
+        await asyncio.sleep(0.03)
+        await _blocking_step()
+        await prof.stop()
+        return prof
+
+    prof = asyncio.run(run())
+    sites = list(prof.slow)
+    assert any("_blocking_step" in site for site in sites)
+    assert max(prof.lags) >= 0.05
+    path = prof.write_report()
+    text = path.read_text()
+    assert "Event-loop lag" in text and "Slow callbacks" in text and "Stack samples" in text
+
+
+def test_call_site_and_percentiles():
+    handle = "<TimerHandle when=12.5 RobotsCache._save() at /srv/crawler/robots.py:88>"
+    assert call_site(handle) == "RobotsCache._save (/srv/crawler/robots.py:88)"
+    stats = percentiles([float(i) for i in range(1, 101)])
+    assert stats["p50"] == 51.0 and stats["p99"] == 100.0 and stats["max"] == 100.0
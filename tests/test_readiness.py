@@ -0,0 +1,35 @@
+from crawler.readiness import ReadinessTracker
+
+
+def test_readiness_learns_per_domain():
+    t = ReadinessTracker({"quiet_ms": 300, "min_quiet_ms": 100, "max_quiet_ms": 2000, "min_wait": 1, "max_wait": 10})
+    assert t.params_for("static.com") == (300, 10)
+
+    t.record("static.com", settle_ms=50, gap_ms=0)
+    quiet, cap = t.params_for("static.com")
+    assert quiet == 100 and cap == 1
+
+    t.record("spa.com", settle_ms=1500, gap_ms=800)
+    quiet, cap = t.params_for("spa.com")
+    assert quiet == 1200 and cap == (1500 * 2 + 1200) / 1000
+
+    # a longer gap widens the window at once; shorter ones shrink it gradually
+    t.record("spa.com", settle_ms=1500, gap_ms=1200)
+    assert t.params_for("spa.com")[0] == 1800
+    t.record("spa.com", settle_ms=1500, gap_ms=0)
+    assert 100 < t.params_for("spa.com")[0] < 1800
+
+
+def test_capped_pages_do_not_teach_settle_time():
+    t = ReadinessTracker({"quiet_ms": 300, "min_quiet_ms": 100, "min_wait": 1, "max_wait": 10})
+    t.record("carousel.com", settle_ms=None, gap_ms=200)
+    assert t.params_for("carousel.com") == (300, 10)  # nothing learned from a page that never settled
+    t.record("carousel.com", settle_ms=400, gap_ms=100)
+    t.record("carousel.com", settle_ms=None, gap_ms=200)
+    quiet, cap = t.params_for("carousel.com")
+    assert quiet == 300 and cap == (400 * 2 + 300) / 1000
+
+
+def test_networkidle_strategy_disables_adaptive():
+    assert ReadinessTracker({"strategy": "networkidle"}).adaptive is False
+    assert ReadinessTracker({}).adaptive is True
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from pipeline.records import build_record
+from pipeline.reprocess import latest_html_entries, run_reprocess
+from storage.snapshot_store import SnapshotStore
+
+PAGE = "<html><head><title> {t} </title></head><body><p>hello   {t}</p><a href='/x'>x</a></body></html>"
+
+
+def test_reprocess_rebuilds_dataset_from_snapshots(tmp_path):
+    snaps = tmp_path / "snaps"
+    store = SnapshotStore(str(snaps))
+    hits = [{"url": "https://s.com/api/items", "status": 200, "response_text": "[1,2]"}]
+
+    async def capture():
+        await store.put_html("https://s.com/a", PAGE.format(t="old"), 1.0, {"depth": 0})
+        api = await store.put_api("https://s.com/a", hits, 2.0)
+        extra = {"depth": 0, "api_blob": api["blob"], "api_encoding": api["encoding"]}
+        await store.put_html("https://s.com/a", PAGE.format(t="new"), 2.0, extra)
+        await store.put_html("https://s.com/b", PAGE.format(t="b"), 3.0, {"depth": 1})
+        await store.put_screenshot("https://s.com/b", b"\x89PNG", 3.0)
+
+    asyncio.run(capture())
+    assert [e["url"] for e in latest_html_entries(store)] == ["https://s.com/a", "https://s.com/b"]
+
+    out = tmp_path / "out"
+    stats = asyncio.run(run_reprocess(str(snaps), str(out), processes=2, batch_size=1))
+    assert stats["written"] == 2 and stats["failed"] == 0
+
+    records = [json.loads(line) for line in (out / "dataset.jsonl").read_text().splitlines()]
+    assert records[0] == build_record("https://s.com/a", PAGE.format(t="new"), 0, 2.0, hits)
+    assert records[1]["scrape_meta"]["depth"] == 1
+    with sqlite3.connect(out / "dataset.db") as db:
+        assert db.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 2
+
+    # outputs are always fresh
+    with pytest.raises(FileExistsError):
+        asyncio.run(run_reprocess(str(snaps), str(out), processes=1))
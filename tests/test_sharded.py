@@ -0,0 +1,95 @@
+import asyncio
+import multiprocessing as mp
+import queue as queue_mod
+import threading
+
+from crawler import sharded
+from crawler.frontier import PriorityFrontier
+from crawler.sharded import ShardLink, group_idle, shard_for_url
+
+
+def test_shard_for_url_is_per_domain_and_stable():
+    a = shard_for_url("https://example.com/a", 4)
+    assert a == shard_for_url("https://EXAMPLE.com/b?x=1", 4)
+    assert 0 <= a < 4
+    assert {shard_for_url(f"https://host{i}.com/", 4) for i in range(50)} == {0, 1, 2, 3}
+
+
+def _domain_for(shard, processes):
+    return next(f"d{i}.test" for i in range(100) if shard_for_url(f"http://d{i}.test/", processes) == shard)
+
+
+def test_links_are_forwarded_and_group_stops_when_idle():
+    processes = 2
+    inboxes = [queue_mod.Queue() for _ in range(processes)]
+    results = queue_mod.Queue()
+    counters = mp.Array("q", [1 if f == sharded._BUSY else 0 for _ in range(processes) for f in range(sharded._FIELDS)])
+    stop = threading.Event()
+    links = [ShardLink(i, processes, inboxes, results, counters, stop) for i in range(processes)]
+    home, away = _domain_for(0, processes), _domain_for(1, processes)
+    # each page links to the next one, alternating between the two shards' domains
+    pages = {f"http://{home}/1": f"http://{away}/2", f"http://{away}/2": f"http://{home}/3"}
+    visited = {0: [], 1: []}
+
+    async def shard(link):
+        frontier = PriorityFrontier(strategy="fifo")
+
+        async def worker():
+            while True:
+                url, depth = await frontier.get()
+                if url is None:
+                    frontier.task_done()
+                    return
+                visited[link.index].append((url, depth))
+                nxt = pages.get(url)
+                if nxt is not None:
+                    if link.owns(nxt):
+                        await frontier.put((nxt, depth + 1))
+                    else:
+                        link.forward(nxt, depth + 1)
+                frontier.task_done()
+
+        if link.index == 0:
+            await frontier.put((f"http://{home}/1", 0))
+        task = asyncio.create_task(worker())
+        await link.run_until_stopped(frontier)
+        await frontier.put((None, None))
+        await task
+
+    async def coordinator():
+        while not stop.is_set():
+            await asyncio.sleep(0.05)
+            if group_idle(counters, processes):
+                stop.set()
+
+    async def run():
+        await asyncio.wait_for(asyncio.gather(coordinator(), *(shard(link) for link in links)), 10)
+
+    asyncio.run(run())
+    assert visited[0] == [(f"http://{home}/1", 0), (f"http://{home}/3", 2)]
+    assert visited[1] == [(f"http://{away}/2", 1)]
+    snap = sharded._snapshot(counters, processes)
+    assert sum(s[sharded._SENT] for s in snap) == sum(s[sharded._RECEIVED] for s in snap) == 2
+    assert all(s[sharded._BUSY] == 0 for s in snap)
+
+
+def test_busy_shard_keeps_shipping_metrics(monkeypatch):
+    monkeypatch.setattr(sharded, "METRICS_INTERVAL", 0.02)
+    results = queue_mod.Queue()
+    counters = mp.Array("q", [0] * sharded._FIELDS)
+    stop = threading.Event()
+    link = ShardLink(0, 1, [queue_mod.Queue()], results, counters, stop)
+
+    async def scenario():
+        frontier = PriorityFrontier(strategy="fifo")
+        await frontier.put(("http://a.test/slow", 0))
+        await frontier.get()  # a page still being fetched: queue.join() blocks meanwhile
+        runner = asyncio.create_task(link.run_until_stopped(frontier))
+        await asyncio.sleep(0.2)
+        stop.set()
+        frontier.task_done()
+        await asyncio.wait_for(runner, 2)
+
+    asyncio.run(scenario())
+    kinds = [results.get_nowait()[0] for _ in range(results.qsize())]
+    assert kinds.count("metrics") >= 3
@@ -0,0 +1,52 @@
+import asyncio
+
+from storage.snapshot_store import SnapshotStore
+
+
+def test_snapshot_store_dedups_and_indexes(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snaps"))
+
+    async def run():
+        a = await store.put_html("https://example.com/a", "<html>same</html>", 1.0)
+        b = await store.put_html("https://example.com/b", "<html>same</html>", 1.0)
+        c = await store.put_screenshot("https://example.com/a", b"\x89PNG fake", 2.0)
+        return a, b, c
+
+    a, b, c = asyncio.run(run())
+    assert a["blob"] == b["blob"]
+    assert a["encoding"] == "gzip" and c["encoding"] == "identity"
+    assert len(list((tmp_path / "snaps" / "blobs").rglob("*.gz"))) == 1
+
+    entries = list(store.iter_index())
+    assert [(e["url"], e["kind"]) for e in entries] == [
+        ("https://example.com/a", "html"),
+        ("https://example.com/b", "html"),
+        ("https://example.com/a", "png"),
+    ]
+    assert store.read_blob(entries[1]) == b"<html>same</html>"
+    assert store.read_blob(entries[2]) == b"\x89PNG fake"
+
+
+def test_shard_processes_write_separate_indexes(tmp_path):
+    root = str(tmp_path / "snaps")
+    shards = [SnapshotStore(root, shard=i) for i in range(2)]
+
+    async def run():
+        await SnapshotStore(root).put_html("https://a.com/", "<html>a</html>", 1.0)
+        await shards[1].put_html("https://c.com/", "<html>c</html>", 3.0)
+        await shards[0].put_html("https://b.com/", "<html>b</html>", 2.0)
+
+    asyncio.run(run())
+    assert sorted(p.name for p in (tmp_path / "snaps").glob("index*.jsonl")) == [
+        "index.0.jsonl", "index.1.jsonl", "index.jsonl"
+    ]
+    urls = [e["url"] for e in SnapshotStore(root).iter_index()]
+    assert urls == ["https://a.com/", "https://b.com/", "https://c.com/"]
+
+
+def test_index_skips_a_torn_trailing_line(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snaps"))
+    asyncio.run(store.put_html("https://a.com/", "<html>a</html>", 1.0))
+    with open(store.index_path, "a", encoding="utf-8") as f:
+        f.write('{"url": "https://b.com/", "ki')
+    assert [e["url"] for e in store.iter_index()] == ["https://a.com/"]
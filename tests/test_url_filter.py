@@ -0,0 +1,35 @@
+from crawler.url_filter import DomainTrie, UrlFilter
+
+
+def test_domain_trie_exact_and_wildcard():
+    trie = DomainTrie(["example.com", "*.cdn.net", "localhost:8000"])
+    assert trie.matches("example.com")
+    assert not trie.matches("www.example.com")
+    assert trie.matches("img.cdn.net") and trie.matches("a.b.cdn.net")
+    assert not trie.matches("cdn.net")
+    assert trie.matches("localhost", "localhost:8000")
+    assert not trie.matches("localhost", "localhost:9000")
+
+
+def test_filter_links_single_pass():
+    f = UrlFilter(
+        follow_external=True,
+        allow_domains=["good.com", "*.good.com"],
+        deny_domains=["ads.good.com"],
+        exclude_patterns=[r"^/login", r"[?&]sessionid="],
+        max_url_length=60,
+    )
+    links = [
+        "/a#top", "/a", "mailto:x@good.com", "https://blog.good.com/post",
+        "https://ads.good.com/x", "https://other.com/", "/img/logo.PNG",
+        "/login?next=/", "/b?sessionid=1", "/" + "x" * 80,
+    ]
+    assert f.filter_links(links, "https://good.com/index") == ["https://good.com/a", "https://blog.good.com/post"]
+
+
+def test_include_patterns_and_same_site():
+    f = UrlFilter.from_config({"crawl": {"include_patterns": ["^/docs/"]}})
+    out = f.filter_links(["/docs/intro", "/blog/x", "https://elsewhere.com/docs/a"], "https://site.com/")
+    assert out == ["https://site.com/docs/intro"]
+    # seeds/queued URLs only need to pass domain and extension rules
+    assert f.admit("https://site.com/") and not f.admit("https://site.com/file.zip")
@@ -0,0 +1,273 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from utils.logger import get_logger
+from utils.sidecar import start_sidecar_server
+
+logger = get_logger(__name__)
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def export(self) -> Dict[str, Any]:
+        with self._lock:
+            values = [[list(k), _copy_value(v)] for k, v in self._values.items()]
+        return {"type": self.kind, "help": self.help, "labelnames": list(self.labelnames), "values": values}
+
+
+def _copy_value(v: Any) -> Any:
+    if isinstance(v, list):
+        return [list(v[0]), v[1], v[2]]
+    return v
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (last slot is +Inf), sum, count]
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[key] = state
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def export(self) -> Dict[str, Any]:
+        data = super().export()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class MetricsRegistry:
+    """
+    Process-wide metric registry. Metrics are created on first use and
+    shared by name, so modules can declare the same family independently.
+    Snapshots from other processes (crawl shards) can be merged in and are
+    rendered with an extra `shard` label.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._remote: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: Any, name: str, help: str, labelnames: Sequence[str], **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric: Counter = self._get_or_create(Counter, name, help, labelnames)
+        return metric
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        metric: Gauge = self._get_or_create(Gauge, name, help, labelnames)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric: Histogram = self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+        return metric
+
+    def export(self) -> Dict[str, Any]:
+        """Picklable snapshot of every local metric."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: m.export() for m in metrics}
+
+    def merge_remote(self, source: str, exported: Dict[str, Any]) -> None:
+        self._remote[source] = exported
+
+    def _families(self) -> Dict[str, Dict[str, Any]]:
+        families: Dict[str, Dict[str, Any]] = {}
+        sources: List[Tuple[Optional[str], Dict[str, Any]]] = [(None, self.export())]
+        sources.extend(self._remote.items())
+        for source, exported in sources:
+            for name, data in exported.items():
+                fam = families.setdefault(
+                    name,
+                    {"type": data["type"], "help": data["help"], "buckets": data.get("buckets"), "samples": []},
+                )
+                for labelvalues, value in data["values"]:
+                    labels = list(zip(data["labelnames"], labelvalues))
+                    if source is not None:
+                        labels.append(("shard", source))
+                    fam["samples"].append((labels, value))
+        return families
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for name, fam in sorted(self._families().items()):
+            lines.append(f"# HELP {name} {fam['help']}")
+            lines.append(f"# TYPE {name} {fam['type']}")
+            for labels, value in fam["samples"]:
+                if fam["type"] != "histogram":
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_num(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, c in zip(list(fam["buckets"]) + [float("inf")], counts):
+                    cumulative += c
+                    le = "+Inf" if bound == float("inf") else _fmt_num(bound)
+                    lines.append(f"{name}_bucket{_fmt_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_num(total)}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        Human-readable end-of-run digest: counter/gauge totals and, for each
+        histogram, count/total/p50/p99 grouped by its first label.
+        """
+        lines: List[str] = []
+        for name, fam in sorted(self._families().items()):
+            if not fam["samples"]:
+                continue
+            if fam["type"] != "histogram":
+                total = sum(v for _, v in fam["samples"])
+                lines.append(f"  {name}: {_fmt_num(total)}")
+                continue
+            groups: Dict[str, List[Any]] = {}
+            for labels, (counts, total, count) in fam["samples"]:
+                group = labels[0][1] if labels else ""
+                agg = groups.setdefault(group, [[0] * len(counts), 0.0, 0])
+                agg[0] = [a + b for a, b in zip(agg[0], counts)]
+                agg[1] += total
+                agg[2] += count
+            for group, (counts, total, count) in sorted(groups.items()):
+                p50 = quantile_from_buckets(fam["buckets"], counts, 0.5)
+                p99 = quantile_from_buckets(fam["buckets"], counts, 0.99)
+                lines.append(
+                    f"  {name}[{group}]: n={count} total={total:.2f}s mean={total / max(count, 1):.3f}s "
+                    f"p50={p50:.3f}s p99={p99:.3f}s"
+                )
+        return "Metrics summary:\n" + ("\n".join(lines) if lines else "  (no samples)")
+
+
+def quantile_from_buckets(buckets: Sequence[float], counts: Sequence[int], q: float) -> float:
+    """Linear interpolation inside the bucket holding the q-th observation."""
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for i, c in enumerate(counts):
+        upper = buckets[i] if i < len(buckets) else buckets[-1]
+        if c and cumulative + c >= rank:
+            return lower + (upper - lower) * ((rank - cumulative) / c)
+        cumulative += c
+        lower = upper
+    return float(buckets[-1])
+
+
+def _fmt_num(v: float) -> str:
+    if v == int(v) and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v))
+
+
+def _fmt_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+REGISTRY = MetricsRegistry()
+
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+    """
+    Minimal sidecar HTTP server exposing GET /metrics in Prometheus text format.
+    Returns the asyncio server; close it with server.close().
+    """
+    async def handle(method: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        if path == "/metrics":
+            return 200, registry.render().encode("utf-8")
+        return 404, b"not found\n"
+
+    server = await start_sidecar_server(
+        handle, port, host=host, content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,298 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+LOOP_LAG = REGISTRY.histogram(
+    "asyncio_loop_lag_seconds",
+    "How late the event loop woke a sleeping sampler (time the loop was blocked)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+SLOW_CALLBACKS = REGISTRY.counter("asyncio_slow_callbacks_total", "Loop callbacks over the slow-callback threshold")
+
+PROFILERS = ("loop", "sampling", "cprofile")
+
+_ADDR = re.compile(r" at 0x[0-9a-f]+|id=0x[0-9a-f]+|name='[^']*'")
+_CORO = re.compile(r"coro=<(\S+?)\(\) (?:running|done, defined) at ([^>]+)>")
+_HANDLE = re.compile(r"<(?:Timer)?Handle (?:cancelled |when=\S+ )*(\S+?)\(.*?\) at ([^>\s]+)")
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+_TASK_NAME = re.compile(r"<Task \w+ name='([^']*)'")
+
+
+def call_site(handle: str) -> str:
+    """
+    Collapse asyncio's description of a callback to a stable key:
+    "coroutine (file:line)" for task steps, "callback (file:line)" for
+    plain handles, otherwise the description without addresses.
+    """
+    m = _CORO.search(handle) or _HANDLE.search(handle)
+    if m:
+        site = f"{m.group(1)} ({_short_path(m.group(2))})"
+        inner = _innermost_await(handle)
+        return f"{site} -> {inner}" if inner and inner != site else site
+    return _ADDR.sub("", handle)[:200]
+
+
+def _innermost_await(handle: str) -> Optional[str]:
+    """
+    For a task step, where the task is suspended now: the repr only names
+    the outermost coroutine, but the blocking code ran just before the
+    innermost await. Only valid while the loop is still inside that step.
+    """
+    m = _TASK_NAME.search(handle)
+    if m is None:
+        return None
+    try:
+        tasks = asyncio.all_tasks()
+    except RuntimeError:
+        return None
+    for task in tasks:
+        if task.get_name() != m.group(1):
+            continue
+        coro: Any = task.get_coro()
+        frame = None
+        while getattr(coro, "cr_frame", None) is not None:
+            # skip asyncio's own helpers (sleep, wait_for, ...) at the bottom of the chain
+            if not coro.cr_frame.f_code.co_filename.startswith(_ASYNCIO_DIR):
+                frame = coro.cr_frame
+            coro = coro.cr_await
+        if frame is None:
+            return None
+        return f"{frame.f_code.co_name} ({_short_path(frame.f_code.co_filename)}:{frame.f_lineno})"
+    return None
+
+
+def _short_path(path: str) -> str:
+    cwd = os.getcwd() + os.sep
+    return path[len(cwd):] if path.startswith(cwd) else path
+
+
+def percentiles(samples: List[float], qs: Tuple[float, ...] = (0.5, 0.9, 0.99)) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    out = {f"p{int(q * 100)}": ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in qs}
+    out["max"] = ordered[-1]
+    return out
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Receives asyncio's debug-mode "Executing <handle> took N seconds" warnings."""
+
+    def __init__(self, sink: Dict[str, List[float]]):
+        super().__init__(logging.WARNING)
+        self.sink = sink
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not record.msg.startswith("Executing") or not isinstance(record.args, tuple) or len(record.args) != 2:
+            return
+        handle, seconds = record.args
+        if not isinstance(seconds, (int, float)):
+            return
+        stats = self.sink.setdefault(call_site(str(handle)), [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        SLOW_CALLBACKS.inc()
+
+
+class _StackSampler(threading.Thread):
+    """
+    Samples the event-loop thread's Python stack every `interval` seconds.
+    Samples taken while the loop waits in its selector are counted as idle,
+    the rest are attributed to the innermost frame ("self") and to every
+    function on the stack ("inclusive").
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.idle = 0
+        self.own: Dict[str, int] = {}
+        self.inclusive: Dict[str, int] = {}
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            keys: List[str] = []
+            idle = False
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename.endswith("selectors.py"):
+                    idle = True
+                    break
+                keys.append(f"{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if idle or not keys:
+                self.idle += 1
+                continue
+            self.own[keys[0]] = self.own.get(keys[0], 0) + 1
+            for key in set(keys):
+                self.inclusive[key] = self.inclusive.get(key, 0) + 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class LoopProfiler:
+    """
+    Profiling for `--profile`: asyncio debug mode with slow-callback capture,
+    a loop-lag sampler, and optionally a stack sampler ("sampling") or
+    cProfile ("cprofile") around the run. `report()` renders the worst call
+    sites and loop-lag percentiles; `write_report()` saves it to disk.
+    Only the calling process is profiled (not crawl shards or reprocess workers).
+    """
+
+    def __init__(
+        self,
+        profiler: str = "loop",
+        slow_callback_ms: float = 100.0,
+        lag_interval_ms: float = 50.0,
+        sample_interval_ms: float = 5.0,
+        report_dir: str = "exports/profiles",
+        top: int = 25,
+    ):
+        if profiler not in PROFILERS:
+            raise ValueError(f"unknown profiler {profiler!r}; expected one of {', '.join(PROFILERS)}")
+        self.profiler = profiler
+        self.slow_callback = slow_callback_ms / 1000.0
+        self.lag_interval = lag_interval_ms / 1000.0
+        self.sample_interval = sample_interval_ms / 1000.0
+        self.report_dir = report_dir
+        self.top = top
+        self.slow: Dict[str, List[float]] = {}
+        self.lags: Deque[float] = deque(maxlen=200_000)
+        self._handler = _SlowCallbackHandler(self.slow)
+        self._lag_task: Optional[asyncio.Task] = None
+        self._sampler: Optional[_StackSampler] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._loop_debug = False
+        self._started = 0.0
+        self.elapsed = 0.0
+
+    @classmethod
+    def from_config(
+        cls, cfg: Dict[str, Any], profiler: str = "loop", slow_callback_ms: Optional[float] = None
+    ) -> "LoopProfiler":
+        pcfg = cfg.get("profile", {}) or {}
+        return cls(
+            profiler=profiler,
+            slow_callback_ms=float(
+                slow_callback_ms if slow_callback_ms is not None else pcfg.get("slow_callback_ms", 100)
+            ),
+            lag_interval_ms=float(pcfg.get("lag_interval_ms", 50)),
+            sample_interval_ms=float(pcfg.get("sample_interval_ms", 5)),
+            report_dir=str(pcfg.get("report_dir", "exports/profiles")),
+            top=int(pcfg.get("top", 25)),
+        )
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lags.append(lag)
+            LOOP_LAG.observe(lag)
+
+    def start(self) -> None:
+        """Call from inside the running loop that should be profiled."""
+        loop = asyncio.get_running_loop()
+        self._loop_debug = loop.get_debug()
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.slow_callback
+        logging.getLogger("asyncio").addHandler(self._handler)
+        self._lag_task = asyncio.create_task(self._sample_lag())
+        if self.profiler == "sampling":
+            self._sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+            self._sampler.start()
+        elif self.profiler == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._started = time.perf_counter()
+        logger.info(
+            f"[profile] {self.profiler} profiling on; "
+            f"slow callbacks over {self.slow_callback * 1000:.0f}ms are recorded"
+        )
+
+    async def stop(self) -> None:
+        self.elapsed = time.perf_counter() - self._started
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+        logging.getLogger("asyncio").removeHandler(self._handler)
+        asyncio.get_running_loop().set_debug(self._loop_debug)
+
+    def report(self) -> str:
+        lines = [f"Profile report ({self.profiler}), {self.elapsed:.1f}s wall clock", ""]
+        lags = percentiles(list(self.lags))
+        lines.append(f"Event-loop lag ({len(self.lags)} samples every {self.lag_interval * 1000:.0f}ms):")
+        if lags:
+            lines.append("  " + "  ".join(f"{k}={v * 1000:.1f}ms" for k, v in lags.items()))
+        else:
+            lines.append("  (no samples)")
+
+        lines += ["", f"Slow callbacks (> {self.slow_callback * 1000:.0f}ms), worst total time first:"]
+        worst = sorted(self.slow.items(), key=lambda kv: kv[1][1], reverse=True)[: self.top]
+        if not worst:
+            lines.append("  (none)")
+        for site, (count, total, peak) in worst:
+            lines.append(f"  {total:8.3f}s total  {int(count):6d}x  max {peak * 1000:8.1f}ms  {site}")
+
+        if self._sampler is not None:
+            sampler = self._sampler
+            busy = sampler.samples - sampler.idle
+            lines += [
+                "",
+                f"Stack samples every {self.sample_interval * 1000:.0f}ms: {sampler.samples} total, "
+                f"{busy} with the loop busy ({100.0 * busy / max(sampler.samples, 1):.1f}%)",
+                "  self (innermost frame):",
+            ]
+            for key, n in sorted(sampler.own.items(), key=lambda kv: kv[1], reverse=True)[: self.top]:
+                lines.append(f"  {100.0 * n / max(busy, 1):6.1f}%  {key}")
+            lines.append("  inclusive:")
+            for key, n in sorted(sampler.inclusive.items(), key=lambda kv: kv[1], reverse=True)[: self.top]:
+                lines.append(f"  {100.0 * n / max(busy, 1):6.1f}%  {key}")
+
+        if self._cprofile is not None:
+            buf = io.StringIO()
+            stats = pstats.Stats(self._cprofile, stream=buf)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            lines += ["", "cProfile (event-loop thread, cumulative):", buf.getvalue()]
+        return "\n".join(lines) + "\n"
+
+    def write_report(self) -> Path:
+        out = Path(self.report_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        stamp = int(time.time())
+        path = out / f"profile-{stamp}.txt"
+        path.write_text(self.report(), encoding="utf-8")
+        if self._cprofile is not None:
+            # loadable with `python -m pstats` or snakeviz
+            self._cprofile.dump_stats(str(out / f"profile-{stamp}.pstats"))
+        logger.info(f"[profile] report written to {path}")
+        return path
@@ -0,0 +1,74 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Tuple
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found"}
+
+# (method, path without query, body) -> (status, response body)
+Handler = Callable[[str, str, bytes], Awaitable[Tuple[int, bytes]]]
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[str, str, str]:
+    """Read the request line and headers; returns (method, path, raw Content-Length value)."""
+    request_line = await reader.readline()
+    content_length = ""
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = value.strip()
+    parts = request_line.decode("latin-1").split()
+    method = parts[0] if parts else "GET"
+    path = (parts[1] if len(parts) > 1 else "/").split("?")[0]
+    return method, path, content_length
+
+
+def _error_body(content_type: str, message: str) -> bytes:
+    if "json" in content_type:
+        return (json.dumps({"error": message}, indent=2) + "\n").encode("utf-8")
+    return f"{message}\n".encode("utf-8")
+
+
+async def start_sidecar_server(
+    handler: Handler,
+    port: int,
+    host: str = "127.0.0.1",
+    content_type: str = "text/plain; charset=utf-8",
+    max_body: int = 1024 * 1024,
+):
+    """
+    One-request-per-connection HTTP/1.1 server for the metrics and control
+    sidecars. A malformed or oversized body, or a ValueError/TypeError from
+    the handler, is answered with 400. Returns the asyncio server; close it
+    with server.close().
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, content_length = await _read_head(reader)
+            try:
+                length = int(content_length or 0)
+                if length < 0:
+                    raise ValueError(f"invalid Content-Length: {content_length}")
+                if length > max_body:
+                    raise ValueError("request body too large")
+                body = await reader.readexactly(length) if length else b""
+                status, data = await handler(method, path, body)
+            except (ValueError, TypeError) as e:
+                status, data = 400, _error_body(content_type, str(e))
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug(f"sidecar server error on port {port}: {e}")
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)